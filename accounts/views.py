@@ -6,6 +6,7 @@ from django.db.models import Count
 from .models import User, Cadet, Officer
 from .forms import LoginForm, CadetRegistrationForm
 from .decorators import role_required, officer_required, admin_required
+from search.services import search
 
 
 def login_view(request):
@@ -122,20 +123,18 @@ def cadet_dashboard_view(request):
     
     cadet = request.user.cadet_profile
     
-    from attendance.models import Attendance
+    from attendance.services import cadet_attendance_totals
     from events.models import EventRegistration
     from certificates.models import Certificate
     
-    # Calculate attendance statistics
-    total_attendance = Attendance.objects.filter(cadet=cadet).count()
-    present_count = Attendance.objects.filter(cadet=cadet, status='PRESENT').count()
-    attendance_percentage = (present_count / total_attendance * 100) if total_attendance > 0 else 0
+    # Attendance statistics from the cadet's summaries
+    totals = cadet_attendance_totals(cadet)
     
     context = {
         'cadet': cadet,
-        'attendance_percentage': round(attendance_percentage, 2),
-        'total_sessions': total_attendance,
-        'present_count': present_count,
+        'attendance_percentage': totals['percentage'],
+        'total_sessions': totals['total'],
+        'present_count': totals['present'],
         'registered_events': EventRegistration.objects.filter(cadet=cadet).count(),
         'certificates_count': Certificate.objects.filter(cadet=cadet).count(),
     }
@@ -157,13 +156,7 @@ def cadet_list_view(request):
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        cadets = cadets.filter(
-            user__first_name__icontains=search_query
-        ) | cadets.filter(
-            user__last_name__icontains=search_query
-        ) | cadets.filter(
-            enrollment_number__icontains=search_query
-        )
+        cadets = search(cadets, search_query).order_by('search_rank', 'enrollment_number')
     
     return render(request, 'accounts/cadet_list.html', {
         'cadets': cadets,
@@ -212,16 +205,14 @@ def cadet_detail_view(request, pk):
     is_readonly = user.role == 'CADET'
     
     # Get attendance statistics
-    from attendance.models import Attendance
-    total_attendance = Attendance.objects.filter(cadet=cadet).count()
-    present_count = Attendance.objects.filter(cadet=cadet, status='PRESENT').count()
-    attendance_percentage = (present_count / total_attendance * 100) if total_attendance > 0 else 0
+    from attendance.services import cadet_attendance_totals
+    totals = cadet_attendance_totals(cadet)
     
     return render(request, 'accounts/cadet_detail.html', {
         'cadet': cadet,
         'is_readonly': is_readonly,
-        'attendance_percentage': round(attendance_percentage, 2),
-        'total_sessions': total_attendance,
+        'attendance_percentage': totals['percentage'],
+        'total_sessions': totals['total'],
     })
 
 
@@ -1,5 +1,10 @@
-from django.contrib import admin
+import zipfile
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
 from .models import AttendanceSession, Attendance
+from .forms import FaceArchiveImportForm
+from .face_recognition.models import FaceEncoding, FaceAttendanceLog
 
 @admin.register(AttendanceSession)
 class AttendanceSessionAdmin(admin.ModelAdmin):
@@ -8,12 +13,79 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
     search_fields = ['title', 'location']
     date_hierarchy = 'date'
     raw_id_fields = ['unit', 'created_by']
+    actions = ['close_sessions']
+
+    @admin.action(description='Close selected sessions and mark missing cadets absent')
+    def close_sessions(self, request, queryset):
+        from .services import close_session
+
+        officer = getattr(request.user, 'officer_profile', None)
+        absent = sum(close_session(session, marked_by=officer) for session in queryset)
+        self.message_user(request, f'Closed {queryset.count()} sessions; {absent} cadets were marked absent.')
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ['cadet', 'session', 'status', 'marked_by', 'marked_at']
-    list_filter = ['status', 'session__date']
+    list_filter = ['status', 'session_date']
     search_fields = ['cadet__user__first_name', 'cadet__user__last_name', 
                     'cadet__enrollment_number']
     date_hierarchy = 'marked_at'
-    raw_id_fields = ['session', 'cadet', 'marked_by']
\ No newline at end of file
+    raw_id_fields = ['session', 'cadet', 'marked_by']
+
+@admin.register(FaceEncoding)
+class FaceEncodingAdmin(admin.ModelAdmin):
+    list_display = ['cadet', 'is_active', 'created_at', 'updated_at']
+    list_filter = ['is_active', 'cadet__unit']
+    search_fields = ['cadet__user__first_name', 'cadet__user__last_name',
+                    'cadet__enrollment_number']
+    raw_id_fields = ['cadet']
+    exclude = ['encoding']
+    change_list_template = 'admin/attendance/faceencoding/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import-archive/', self.admin_site.admin_view(self.import_archive_view),
+                 name='attendance_faceencoding_import_archive'),
+        ]
+        return urls + super().get_urls()
+
+    def import_archive_view(self, request):
+        """Register faces from an uploaded zip archive without extracting it"""
+        # Imported here so the admin does not load OpenCV and NumPy at startup
+        from .face_recognition.enrollment import import_face_archive
+
+        if not self.has_add_permission(request):
+            return redirect('admin:attendance_faceencoding_changelist')
+
+        results = None
+        if request.method == 'POST':
+            form = FaceArchiveImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                try:
+                    results = import_face_archive(
+                        form.cleaned_data['archive'],
+                        replace=form.cleaned_data['replace']
+                    )
+                except zipfile.BadZipFile as e:
+                    form.add_error('archive', f'Invalid zip archive: {e}')
+                else:
+                    registered = sum(1 for result in results if result.success)
+                    messages.success(request, f'Registered {registered} out of {len(results)} faces.')
+        else:
+            form = FaceArchiveImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import faces from archive',
+            'form': form,
+            'results': results,
+        }
+        return render(request, 'admin/attendance/faceencoding/import_archive.html', context)
+
+@admin.register(FaceAttendanceLog)
+class FaceAttendanceLogAdmin(admin.ModelAdmin):
+    list_display = ['session', 'cadet', 'status', 'confidence', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['cadet__enrollment_number', 'capture_id']
+    raw_id_fields = ['session', 'cadet']
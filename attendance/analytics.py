@@ -0,0 +1,150 @@
+"""
+Attendance analytics for a unit.
+
+All attendance of the unit is read with one ``values_list`` query into a
+pandas DataFrame, and the weekly trend, session type breakdown and per
+cadet rollups are computed from it with vectorized group-bys and pivots.
+Results are cached per unit under a key derived from the unit's latest
+attendance write, so any write makes the next request recompute them.
+"""
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import Attendance, AttendanceSession
+
+AT_RISK_THRESHOLD = 75.0
+ROLLING_WEEKS = 4
+CACHE_TIMEOUT = 60 * 60
+
+COLUMNS = [
+    'cadet_id', 'enrollment_number', 'first_name', 'last_name',
+    'session_id', 'date', 'session_type', 'status',
+]
+STATUSES = [status for status, _ in Attendance.STATUS_CHOICES]
+
+
+def load_unit_frame(unit):
+    """Return a DataFrame with one row per attendance record of the unit"""
+    rows = Attendance.objects.filter(session__unit=unit).order_by().values_list(
+        'cadet_id', 'cadet__enrollment_number', 'cadet__user__first_name', 'cadet__user__last_name',
+        'session_id', 'session_date', 'session__session_type', 'status',
+    ).iterator(chunk_size=5000)
+    frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame
+
+
+def _percentage(present, total):
+    return (present / total.where(total > 0) * 100).fillna(0).round(2)
+
+
+def _status_pivot(frame, index):
+    """Counts per status for each value of ``index``, plus total and percentage"""
+    pivot = frame.pivot_table(index=index, columns='status', values='session_id', aggfunc='count', fill_value=0)
+    pivot = pivot.reindex(columns=STATUSES, fill_value=0)
+    pivot['total'] = pivot[STATUSES].sum(axis=1)
+    pivot['percentage'] = _percentage(pivot['PRESENT'], pivot['total'])
+    return pivot
+
+
+def compute_unit_analytics(frame, at_risk_threshold=AT_RISK_THRESHOLD, rolling_weeks=ROLLING_WEEKS):
+    """
+    Compute the unit's attendance rollups from a frame built by load_unit_frame()
+
+    Returns:
+        dict: JSON-serializable ``overall``, ``weekly``, ``by_session_type``,
+        ``cadets`` and ``at_risk`` sections
+    """
+    if frame.empty:
+        return {
+            'overall': {'total': 0, 'present': 0, 'percentage': 0.0, 'sessions': 0, 'cadets': 0},
+            'weekly': [],
+            'by_session_type': [],
+            'cadets': [],
+            'at_risk': [],
+            'at_risk_threshold': at_risk_threshold,
+        }
+
+    frame = frame.assign(
+        present=(frame['status'] == 'PRESENT').astype(int),
+        week=frame['date'] - pd.to_timedelta(frame['date'].dt.weekday, unit='D'),
+    )
+
+    weekly = frame.groupby('week').agg(total=('present', 'size'), present=('present', 'sum')).sort_index()
+    weekly['percentage'] = _percentage(weekly['present'], weekly['total'])
+    rolling = weekly[['present', 'total']].rolling(rolling_weeks, min_periods=1).sum()
+    weekly['rolling_percentage'] = _percentage(rolling['present'], rolling['total'])
+
+    by_type = _status_pivot(frame, 'session_type')
+
+    cadets = _status_pivot(frame, 'cadet_id')
+    names = frame.drop_duplicates('cadet_id').set_index('cadet_id')[['enrollment_number', 'first_name', 'last_name']]
+    cadets = cadets.join(names).sort_values(['percentage', 'enrollment_number'])
+    cadets['at_risk'] = cadets['percentage'] < at_risk_threshold
+
+    cadet_rows = [
+        {
+            'cadet_id': int(cadet_id),
+            'enrollment_number': row['enrollment_number'],
+            'name': f"{row['first_name']} {row['last_name']}".strip(),
+            'total': int(row['total']),
+            'counts': {status: int(row[status]) for status in STATUSES},
+            'percentage': float(row['percentage']),
+            'at_risk': bool(row['at_risk']),
+        }
+        for cadet_id, row in cadets.iterrows()
+    ]
+    total = len(frame)
+    present = int(frame['present'].sum())
+    return {
+        'overall': {
+            'total': total,
+            'present': present,
+            'percentage': round(present / total * 100, 2),
+            'sessions': int(frame['session_id'].nunique()),
+            'cadets': len(cadet_rows),
+        },
+        'weekly': [
+            {
+                'week': week.date().isoformat(),
+                'total': int(row['total']),
+                'present': int(row['present']),
+                'percentage': float(row['percentage']),
+                'rolling_percentage': float(row['rolling_percentage']),
+            }
+            for week, row in weekly.iterrows()
+        ],
+        'by_session_type': [
+            {
+                'session_type': session_type,
+                'label': dict(AttendanceSession.SESSION_TYPE_CHOICES).get(session_type, session_type),
+                'total': int(row['total']),
+                'counts': {status: int(row[status]) for status in STATUSES},
+                'percentage': float(row['percentage']),
+            }
+            for session_type, row in by_type.iterrows()
+        ],
+        'cadets': cadet_rows,
+        'at_risk': [row for row in cadet_rows if row['at_risk']],
+        'at_risk_threshold': at_risk_threshold,
+    }
+
+
+def analytics_cache_key(unit):
+    """Cache key that changes whenever attendance of the unit is written or deleted"""
+    latest = Attendance.objects.filter(session__unit=unit).aggregate(
+        updated=Max('updated_at'), rows=Count('id')
+    )
+    version = latest['updated'].timestamp() if latest['updated'] else 0
+    return f"unit-attendance-analytics:{unit.pk}:{version}:{latest['rows']}"
+
+
+def get_unit_analytics(unit):
+    """Return the unit's analytics, recomputing them only after new attendance writes"""
+    key = analytics_cache_key(unit)
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_unit_analytics(load_unit_frame(unit))
+        cache.set(key, analytics, CACHE_TIMEOUT)
+    return analytics
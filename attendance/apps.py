@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        
+        if getattr(settings, 'FACE_RECOG_PROBE_AT_STARTUP', False):
+            from .face_recognition.capabilities import start_background_probe
+            start_background_probe()
@@ -0,0 +1,115 @@
+"""
+Streaming attendance exports.
+
+Rows are read with ``values_list(...).iterator()`` so the cadet, user,
+session and unit columns are joined in SQL and only one chunk of rows is
+in memory at a time. CSV is written straight into a StreamingHttpResponse.
+XLSX needs openpyxl, which is optional; its write-only workbook spools rows
+to a temporary file that is then streamed back.
+"""
+import csv
+import datetime
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Attendance
+
+CHUNK_SIZE = 2000
+
+# (header, values_list lookup)
+EXPORT_COLUMNS = (
+    ('Date', 'session_date'),
+    ('Start Time', 'session__start_time'),
+    ('Session', 'session__title'),
+    ('Session Type', 'session__session_type'),
+    ('Unit', 'session__unit__unit_code'),
+    ('Enrollment Number', 'cadet__enrollment_number'),
+    ('First Name', 'cadet__user__first_name'),
+    ('Last Name', 'cadet__user__last_name'),
+    ('Status', 'status'),
+    ('Check-in Time', 'check_in_time'),
+    ('Remarks', 'remarks'),
+    ('Marked At', 'marked_at'),
+)
+
+
+class ExportUnavailable(Exception):
+    """Raised when the requested export format needs a package that is not installed"""
+    pass
+
+
+def export_rows(sessions=None, unit=None, date_from=None, date_to=None):
+    """
+    Yield attendance rows as tuples in EXPORT_COLUMNS order
+
+    Args:
+        sessions: Only export these sessions (iterable of sessions or ids)
+        unit: Only export sessions of this unit
+        date_from: First session date to include
+        date_to: Last session date to include
+    """
+    attendances = Attendance.objects.all()
+    if sessions:
+        attendances = attendances.filter(session__in=sessions)
+    if unit is not None:
+        attendances = attendances.filter(session__unit=unit)
+    if date_from:
+        attendances = attendances.filter(session_date__gte=date_from)
+    if date_to:
+        attendances = attendances.filter(session_date__lte=date_to)
+    attendances = attendances.order_by('session_date', 'session__start_time', 'session_id', 'cadet__enrollment_number')
+    return attendances.values_list(*(lookup for _, lookup in EXPORT_COLUMNS)).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def csv_response(rows, filename):
+    """Stream rows as a CSV attachment"""
+    response = StreamingHttpResponse(_csv_lines(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_value(value):
+    """Excel has no time zones; write aware datetimes as naive local (TIME_ZONE) values"""
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def xlsx_response(rows, filename):
+    """Write rows to a write-only XLSX workbook and stream the file"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportUnavailable('XLSX export requires the openpyxl package; use CSV instead.')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Attendance')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        sheet.append([xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
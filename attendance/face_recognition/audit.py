@@ -0,0 +1,124 @@
+"""
+Audit of face registrations that look like the same person.
+
+Two cadets sharing a face usually means proxy attendance or a data entry
+mistake. The audit computes cosine similarity between encodings in tiles of
+``block_size`` x ``block_size`` so memory stays bounded for large galleries,
+and after the first run it only compares encodings created or changed since
+the previous audit against the rest of the gallery.
+"""
+import logging
+import pickle
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .face_utils import FaceGallery
+from .models import FaceDuplicateAudit, FaceDuplicateMatch, FaceEncoding
+
+logger = logging.getLogger(__name__)
+
+# DeepFace verifies Facenet512 pairs at a cosine distance of 0.30
+DUPLICATE_SIMILARITY_THRESHOLD = 0.7
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def iter_similar_pairs(query, candidates, threshold, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield (query_row, candidate_row, similarity) for rows at or above threshold
+
+    Both matrices must hold L2-normalized rows. Only one
+    ``block_size`` x ``block_size`` tile of similarities exists at a time.
+    """
+    for q_start in range(0, len(query), block_size):
+        q_block = query[q_start:q_start + block_size]
+        for c_start in range(0, len(candidates), block_size):
+            similarities = q_block @ candidates[c_start:c_start + block_size].T
+            rows, cols = np.nonzero(similarities >= threshold)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                yield q_start + row, c_start + col, float(similarities[row, col])
+
+
+def run_duplicate_audit(threshold=DUPLICATE_SIMILARITY_THRESHOLD, block_size=DEFAULT_BLOCK_SIZE, full=False):
+    """
+    Find pairs of active encodings for different cadets above ``threshold``
+
+    Args:
+        threshold: Minimum cosine similarity for a pair to be reported
+        block_size: Rows per tile of the blocked similarity computation
+        full: Compare every encoding even if a previous audit exists
+
+    Returns:
+        FaceDuplicateAudit: The completed audit run
+    """
+    previous = FaceDuplicateAudit.objects.filter(finished_at__isnull=False).first()
+    full = full or previous is None
+    since = None if full else previous.started_at
+    audit = FaceDuplicateAudit.objects.create(threshold=threshold, is_full=full)
+
+    cadet_ids = []
+    encodings = []
+    changed_rows = []
+    updated = {}
+    rows = FaceEncoding.objects.filter(is_active=True).values_list(
+        'cadet_id', 'encoding', 'updated_at'
+    ).iterator(chunk_size=2000)
+    for cadet_id, encoding, updated_at in rows:
+        if since is None or updated_at >= since:
+            changed_rows.append(len(cadet_ids))
+        cadet_ids.append(cadet_id)
+        encodings.append(pickle.loads(encoding))
+        updated[cadet_id] = updated_at
+
+    matches = []
+    if changed_rows:
+        gallery = FaceGallery(encodings, ids=cadet_ids, metric='cosine')
+        del encodings
+        matrix = gallery.matrix
+        changed = set(changed_rows)
+        query = matrix[changed_rows]
+        for query_row, candidate_row, similarity in iter_similar_pairs(query, matrix, threshold, block_size):
+            row = changed_rows[query_row]
+            if row == candidate_row:
+                continue
+            # Pairs of two changed encodings are found twice; keep one orientation
+            if candidate_row in changed and candidate_row < row:
+                continue
+            cadet_a, cadet_b = sorted((cadet_ids[row], cadet_ids[candidate_row]))
+            matches.append(FaceDuplicateMatch(
+                cadet_a_id=cadet_a,
+                cadet_b_id=cadet_b,
+                similarity=similarity,
+                audit=audit
+            ))
+
+    with transaction.atomic():
+        active = FaceEncoding.objects.filter(is_active=True).values('cadet_id')
+        stale = ~Q(cadet_a_id__in=active) | ~Q(cadet_b_id__in=active)
+        if since is None:
+            stale = Q()
+        else:
+            recomputed = FaceEncoding.objects.filter(updated_at__gte=since).values('cadet_id')
+            stale |= Q(cadet_a_id__in=recomputed) | Q(cadet_b_id__in=recomputed)
+        # A pair found again keeps its review unless either face was re-registered since
+        reviewed = {
+            (cadet_a, cadet_b)
+            for cadet_a, cadet_b, detected_at in FaceDuplicateMatch.objects.filter(stale, is_reviewed=True)
+            .values_list('cadet_a_id', 'cadet_b_id', 'detected_at')
+            if cadet_a in updated and cadet_b in updated
+            and max(updated[cadet_a], updated[cadet_b]) < detected_at
+        }
+        for match in matches:
+            match.is_reviewed = (match.cadet_a_id, match.cadet_b_id) in reviewed
+        FaceDuplicateMatch.objects.filter(stale).delete()
+        FaceDuplicateMatch.objects.bulk_create(matches, batch_size=500, ignore_conflicts=True)
+
+        audit.encodings_checked = len(changed_rows)
+        audit.pairs_found = len(matches)
+        audit.finished_at = timezone.now()
+        audit.save(update_fields=['encodings_checked', 'pairs_found', 'finished_at'])
+
+    logger.info(f"Face duplicate audit compared {len(changed_rows)} encodings, found {len(matches)} pairs")
+    return audit
@@ -0,0 +1,384 @@
+"""
+Batch processing for face captures queued by offline kiosks.
+
+Kiosks that lose connectivity keep their captures locally and upload them
+later in one request, either as multipart files or as a single zip archive.
+Every capture carries an id and the time it was taken; the id is stored on
+the FaceAttendanceLog row so that a retried upload replays the earlier
+result instead of marking attendance twice.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+import zlib
+from datetime import datetime
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import Cadet
+from attendance.models import Attendance
+from attendance.services import upsert_attendance
+from .face_utils import FaceRecognitionError, detect_faces, get_face_encodings, preprocess_image
+from .gallery_cache import get_gallery_cache
+from .models import FaceAttendanceLog
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+MAX_BATCH_CAPTURES = 500
+# Largest uncompressed archive entry accepted, so a small upload cannot
+# expand into a huge image in memory
+MAX_CAPTURE_BYTES = 10 * 1024 * 1024
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+STATUS_MESSAGES = {
+    'SUCCESS': 'Attendance marked',
+    'UNKNOWN': 'Face not recognized',
+    'MULTIPLE': 'Multiple faces detected',
+    'NONE': 'No face detected',
+    'FAILED': 'Capture could not be processed',
+}
+
+
+# Errors reading one capture, e.g. a corrupt archive entry; they fail that capture only
+CAPTURE_READ_ERRORS = (FaceRecognitionError, zipfile.BadZipFile, zlib.error, EOFError, OSError)
+
+
+class CaptureBatchError(Exception):
+    """Raised when an uploaded capture batch is malformed"""
+    pass
+
+
+class Capture:
+    """
+    A single queued kiosk capture.
+
+    Image bytes are only read when needed, so archive entries are streamed
+    one at a time rather than held in memory for the whole batch.
+    """
+
+    def __init__(self, name, opener, capture_id=None, captured_at=None):
+        self.name = name
+        self._opener = opener
+        self._capture_id = capture_id
+        self.captured_at = captured_at or timezone.now()
+
+    @property
+    def capture_id(self):
+        # Fall back to a content hash so retries of the same image are still deduplicated
+        if not self._capture_id:
+            digest = hashlib.sha1()
+            try:
+                with self._opener() as stream:
+                    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+                        digest.update(chunk)
+            except CAPTURE_READ_ERRORS as e:
+                # Processing fails on the same error; FAILED rows are not keyed by this id
+                logger.warning(f"Could not read capture {self.name}: {e}")
+                digest = hashlib.sha1(f'unreadable:{self.name}'.encode())
+            self._capture_id = digest.hexdigest()
+        return self._capture_id
+
+    def open(self):
+        return self._opener()
+
+
+def _parse_captured_at(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        captured_at = value
+    elif isinstance(value, str):
+        try:
+            captured_at = parse_datetime(value)
+        except ValueError:
+            # Well formed but impossible, e.g. month 13
+            captured_at = None
+    else:
+        captured_at = None
+    if captured_at is None:
+        raise CaptureBatchError(f"Invalid capture timestamp: {value!r}")
+    if timezone.is_naive(captured_at):
+        captured_at = timezone.make_aware(captured_at)
+    return captured_at
+
+
+def _parse_metadata(raw):
+    """Return a {name: entry} mapping from a JSON list of capture entries"""
+    if not raw:
+        return {}
+    try:
+        entries = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    except ValueError as e:
+        raise CaptureBatchError(f"Invalid capture metadata: {e}")
+    if isinstance(entries, dict):
+        entries = entries.get('captures', [])
+    if not isinstance(entries, list):
+        raise CaptureBatchError("Capture metadata must be a list of entries")
+    metadata = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise CaptureBatchError(f"Capture metadata entries must be objects, not {entry!r}")
+        key = entry.get('filename') or entry.get('capture_id')
+        if key is not None and not isinstance(key, str):
+            raise CaptureBatchError(f"Invalid capture filename or id: {key!r}")
+        metadata[key] = entry
+    return metadata
+
+
+def _uploaded_file_opener(uploaded_file):
+    def opener():
+        uploaded_file.seek(0)
+        return _NonClosing(uploaded_file)
+    return opener
+
+
+class _NonClosing(io.RawIOBase):
+    """Context-managed wrapper that leaves the underlying upload open"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def close(self):
+        pass
+
+
+def read_capture_batch(request):
+    """
+    Build the list of captures from a batch upload request.
+
+    Accepts either an ``archive`` zip file (with an optional ``manifest.json``)
+    or one or more ``captures`` files. Capture ids and timestamps are read from
+    the manifest or the ``metadata`` POST field, a JSON list of
+    ``{"filename", "capture_id", "captured_at"}`` entries.
+    """
+    metadata = _parse_metadata(request.POST.get('metadata'))
+    archive = request.FILES.get('archive')
+    if archive is not None:
+        captures = _read_archive(archive, metadata)
+    else:
+        captures = []
+        for uploaded_file in request.FILES.getlist('captures'):
+            entry = metadata.get(uploaded_file.name, {})
+            captures.append(Capture(
+                uploaded_file.name,
+                _uploaded_file_opener(uploaded_file),
+                capture_id=entry.get('capture_id'),
+                captured_at=_parse_captured_at(entry.get('captured_at')),
+            ))
+
+    if not captures:
+        raise CaptureBatchError("No captures provided")
+    if len(captures) > MAX_BATCH_CAPTURES:
+        raise CaptureBatchError(f"A batch may contain at most {MAX_BATCH_CAPTURES} captures")
+    return captures
+
+
+def _read_archive(archive, metadata):
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile as e:
+        raise CaptureBatchError(f"Invalid capture archive: {e}")
+
+    if MANIFEST_NAME in zip_file.namelist():
+        if zip_file.getinfo(MANIFEST_NAME).file_size > MAX_CAPTURE_BYTES:
+            raise CaptureBatchError("Capture manifest is too large")
+        try:
+            manifest = _parse_metadata(zip_file.read(MANIFEST_NAME))
+        except (zipfile.BadZipFile, zlib.error, EOFError, OSError) as e:
+            raise CaptureBatchError(f"Invalid capture manifest: {e}")
+        metadata = {**manifest, **metadata}
+
+    captures = []
+    for info in zip_file.infolist():
+        if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if info.file_size > MAX_CAPTURE_BYTES:
+            raise CaptureBatchError(
+                f"Capture {info.filename} is larger than {MAX_CAPTURE_BYTES // (1024 * 1024)} MB"
+            )
+        name = os.path.basename(info.filename)
+        entry = metadata.get(info.filename) or metadata.get(name) or {}
+        captured_at = _parse_captured_at(entry.get('captured_at'))
+        if captured_at is None:
+            captured_at = timezone.make_aware(datetime(*info.date_time))
+        captures.append(Capture(
+            name,
+            lambda info=info: zip_file.open(info),
+            capture_id=entry.get('capture_id'),
+            captured_at=captured_at,
+        ))
+    return captures
+
+
+def _result(capture, status, cadet=None, confidence=None, replayed=False):
+    return {
+        'capture_id': capture.capture_id,
+        'filename': capture.name,
+        'captured_at': capture.captured_at.isoformat(),
+        'status': status,
+        'success': status == 'SUCCESS',
+        'cadet_id': cadet.id if cadet else None,
+        'cadet_name': cadet.user.get_full_name() if cadet else None,
+        'enrollment_number': cadet.enrollment_number if cadet else None,
+        'confidence': confidence,
+        'replayed': replayed,
+        'message': STATUS_MESSAGES.get(status, ''),
+    }
+
+
+def _embed_capture(capture):
+    """Return (status, encoding) for one capture"""
+    try:
+        with capture.open() as stream:
+            image_array = preprocess_image(io.BytesIO(stream.read()))
+        face_locations, rgb_image = detect_faces(image_array)
+        if not face_locations:
+            return 'NONE', None
+        if len(face_locations) > 1:
+            return 'MULTIPLE', None
+        face_encodings = get_face_encodings(rgb_image, face_locations)
+        if not face_encodings:
+            return 'FAILED', None
+        return None, face_encodings[0]
+    except CAPTURE_READ_ERRORS as e:
+        logger.warning(f"Could not process capture {capture.name}: {e}")
+        return 'FAILED', None
+
+
+def process_capture_batch(session, captures, marked_by=None, ip_address=None, threshold=0.6):
+    """
+    Recognize a batch of kiosk captures and mark attendance for the matches.
+
+    Captures already logged for this session are replayed from their log
+    rows, and duplicate captures within the batch are reported once. The
+    remaining captures are embedded one by one and matched against the unit
+    gallery with a single distance computation. Attendance rows are written
+    in bulk with the earliest capture time per cadet.
+
+    Returns:
+        list: Per-capture result dicts in the order the captures were given
+    """
+    results = {}
+    captures_by_id = {}
+    for capture in captures:
+        captures_by_id.setdefault(capture.capture_id, capture)
+    capture_ids = list(captures_by_id)
+
+    replayed_logs = FaceAttendanceLog.objects.filter(
+        session=session,
+        capture_id__in=capture_ids
+    ).select_related('cadet__user')
+    for log in replayed_logs:
+        capture = captures_by_id[log.capture_id]
+        results[log.capture_id] = _result(capture, log.status, log.cadet, log.confidence, replayed=True)
+
+    pending = [capture for capture_id, capture in captures_by_id.items() if capture_id not in results]
+    if not pending:
+        return [results[capture_id] for capture_id in capture_ids]
+
+    statuses = {}
+    probes = []
+    for capture in pending:
+        status, encoding = _embed_capture(capture)
+        if status:
+            statuses[capture.capture_id] = (status, None, None)
+        else:
+            probes.append((capture, encoding))
+
+    matches = {}
+    if probes:
+        with get_gallery_cache().gallery(session.unit_id) as gallery:
+            if len(gallery):
+                distances = gallery.distances(np.vstack([encoding for _, encoding in probes]))
+                best_rows = np.argmin(distances, axis=1)
+                ids = gallery.ids
+                for (capture, _), row, row_distances in zip(probes, best_rows, distances):
+                    distance = float(row_distances[row])
+                    if distance <= threshold:
+                        matches[capture.capture_id] = (ids[row], float(gallery.confidence(distance)))
+    cadets = Cadet.objects.select_related('user').in_bulk({cadet_id for cadet_id, _ in matches.values()})
+    for capture, _ in probes:
+        cadet_id, confidence = matches.get(capture.capture_id, (None, None))
+        if cadet_id in cadets:
+            statuses[capture.capture_id] = ('SUCCESS', cadets[cadet_id], confidence)
+        else:
+            statuses[capture.capture_id] = ('UNKNOWN', None, None)
+
+    # Earliest capture wins for each recognized cadet
+    first_seen = {}
+    for capture in pending:
+        status, cadet, _ = statuses[capture.capture_id]
+        if status == 'SUCCESS':
+            current = first_seen.get(cadet.id)
+            if current is None or capture.captured_at < current[1]:
+                first_seen[cadet.id] = (cadet, capture.captured_at)
+
+    with transaction.atomic():
+        _write_attendance(session, first_seen, marked_by)
+        FaceAttendanceLog.objects.bulk_create([
+            FaceAttendanceLog(
+                session=session,
+                cadet=statuses[capture.capture_id][1],
+                status=statuses[capture.capture_id][0],
+                confidence=statuses[capture.capture_id][2],
+                ip_address=ip_address or None,
+                # Processing failures are left unkeyed so that a retry processes them again
+                capture_id=capture.capture_id if statuses[capture.capture_id][0] != 'FAILED' else None,
+                captured_at=capture.captured_at,
+            )
+            for capture in pending
+        ], ignore_conflicts=True)
+
+    for capture in pending:
+        status, cadet, confidence = statuses[capture.capture_id]
+        results[capture.capture_id] = _result(capture, status, cadet, confidence)
+
+    return [results[capture_id] for capture_id in capture_ids]
+
+
+def _write_attendance(session, first_seen, marked_by):
+    """Upsert PRESENT rows for recognized cadets, keeping the earliest check-in"""
+    if not first_seen:
+        return
+
+    existing = {
+        cadet_id: (status, check_in_time)
+        for cadet_id, status, check_in_time in Attendance.objects.filter(
+            session=session, cadet_id__in=first_seen
+        ).values_list('cadet_id', 'status', 'check_in_time')
+    }
+    records = []
+    for cadet_id, (cadet, captured_at) in first_seen.items():
+        check_in_time = timezone.localtime(captured_at).time()
+        if cadet_id in existing:
+            status, current = existing[cadet_id]
+            if current is not None and current <= check_in_time:
+                if status == 'PRESENT':
+                    continue
+                check_in_time = current
+            remarks = 'Updated via offline face capture'
+        else:
+            remarks = 'Marked via offline face capture'
+        records.append(Attendance(
+            session=session,
+            cadet=cadet,
+            status='PRESENT',
+            marked_by=marked_by,
+            check_in_time=check_in_time,
+            remarks=remarks,
+        ))
+
+    upsert_attendance(records, update_fields=('status', 'check_in_time', 'remarks', 'updated_at'))
@@ -0,0 +1,150 @@
+"""
+Cached probe of the face recognition stack.
+
+Importing DeepFace pulls in TensorFlow, which takes seconds when it works
+and fails the same way on every attempt when it does not. The probe runs
+once per process, either on first use or in a background thread at startup
+(``FACE_RECOG_PROBE_AT_STARTUP``), and its report is shared by the views and
+the ``check_face_deps`` command. Call ``probe_face_stack(refresh=True)``
+after installing dependencies to check again without restarting the server.
+"""
+import importlib
+import logging
+import platform
+import threading
+import time
+from importlib import metadata
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Distributions reported by the probe, with the package names that provide them
+DISTRIBUTIONS = {
+    'deepface': ('deepface',),
+    'tensorflow': ('tensorflow', 'tensorflow-cpu', 'tensorflow-macos'),
+    'tf-keras': ('tf-keras',),
+    'opencv': ('opencv-python', 'opencv-python-headless', 'opencv-contrib-python', 'opencv-contrib-python-headless'),
+    'numpy': ('numpy',),
+    'pillow': ('pillow',),
+}
+
+_lock = threading.Lock()
+_report = None
+_background_thread = None
+
+
+class FaceStackReport:
+    """Result of probing the face recognition stack"""
+
+    def __init__(self, available, error='', versions=None, model=None, detector=None,
+                 distance_metric=None, duration=0.0):
+        self.available = available
+        self.error = error
+        self.versions = versions or {}
+        self.model = model
+        self.detector = detector
+        self.distance_metric = distance_metric
+        self.duration = duration
+        self.python_version = platform.python_version()
+        self.probed_at = timezone.now()
+
+    def as_dict(self):
+        return {
+            'available': self.available,
+            'error': self.error,
+            'model': self.model,
+            'detector': self.detector,
+            'distance_metric': self.distance_metric,
+            'versions': self.versions,
+            'python_version': self.python_version,
+            'probed_at': self.probed_at.isoformat(),
+            'duration': round(self.duration, 3),
+        }
+
+    def __repr__(self):
+        return f"<FaceStackReport available={self.available}>"
+
+
+def installed_versions():
+    """Return {name: version or None} read from package metadata without importing anything"""
+    versions = {}
+    for name, distributions in DISTRIBUTIONS.items():
+        versions[name] = None
+        for distribution in distributions:
+            try:
+                versions[name] = metadata.version(distribution)
+                break
+            except metadata.PackageNotFoundError:
+                continue
+    return versions
+
+
+def _run_probe():
+    started = time.monotonic()
+    versions = installed_versions()
+    try:
+        from . import face_utils
+    except ImportError as e:
+        logger.error(f"Face recognition dependencies are missing: {e}")
+        return FaceStackReport(False, error=str(e), versions=versions, duration=time.monotonic() - started)
+
+    settings = {
+        'model': face_utils.MODEL_NAME,
+        'detector': face_utils.DETECTOR_BACKEND,
+        'distance_metric': face_utils.DISTANCE_METRIC,
+    }
+    try:
+        face_utils._import_deepface()
+    except face_utils.FaceRecognitionError as e:
+        return FaceStackReport(False, error=str(e), versions=versions,
+                               duration=time.monotonic() - started, **settings)
+
+    report = FaceStackReport(True, versions=versions, duration=time.monotonic() - started, **settings)
+    logger.info(f"DeepFace {versions['deepface']} available with {report.model}/{report.detector} "
+                f"(probed in {report.duration:.2f}s)")
+    return report
+
+
+def probe_face_stack(refresh=False):
+    """
+    Return the cached FaceStackReport, probing the stack on first use
+
+    Args:
+        refresh: Probe again, e.g. after installing missing packages
+
+    Returns:
+        FaceStackReport: The report shared by every caller in this process
+    """
+    global _report
+    report = _report
+    if report is not None and not refresh:
+        return report
+    with _lock:
+        # Another thread may have finished probing while we waited for the lock
+        if _report is None or (refresh and _report is report):
+            if refresh:
+                importlib.invalidate_caches()
+            _report = _run_probe()
+        return _report
+
+
+def start_background_probe():
+    """Probe the stack in a daemon thread so the first face request does not pay for it"""
+    global _background_thread
+    if _report is not None or (_background_thread is not None and _background_thread.is_alive()):
+        return _background_thread
+    _background_thread = threading.Thread(target=probe_face_stack, name='face-stack-probe', daemon=True)
+    _background_thread.start()
+    return _background_thread
+
+
+def is_deepface_available():
+    """Return True if DeepFace and its dependencies are importable.
+
+    This helper lets views determine whether to enable camera-based
+    flow in templates. The result is cached for the process, so calling
+    it on every request is cheap; use ``probe_face_stack(refresh=True)``
+    to check again after installing dependencies.
+    """
+    return probe_face_stack().available
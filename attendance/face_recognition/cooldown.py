@@ -0,0 +1,149 @@
+"""
+Per-session cooldown of recently recognized cadets.
+
+Cadets tend to stay in front of the kiosk for a few seconds, so the same
+face is recognized on several consecutive frames. Once a cadet is marked,
+repeat recognitions within ``FACE_RECOG_COOLDOWN_SECONDS`` are answered
+from this cache without touching the Attendance table. The last embedding
+matched for each cadet is kept as well, so a probe that is very close to
+it is recognized without loading and scanning the unit gallery.
+
+The cache lives in process memory; a repeat frame handled by another
+worker simply goes through the normal matching and upsert path. Sessions
+that are never scanned again are swept out periodically, and only the
+most recently used ``MAX_SESSIONS`` sessions are kept.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_COOLDOWN_SECONDS = 300
+# Much stricter than the match threshold: only near-identical frames take the shortcut
+RECENT_PROBE_DISTANCE = 0.15
+MAX_CADETS_PER_SESSION = 64
+MAX_SESSIONS = 256
+# remember() calls between sweeps of expired sessions
+SWEEP_INTERVAL = 100
+
+
+class RecentMatch:
+    """A cadet marked for a session and what is needed to answer repeat scans"""
+
+    def __init__(self, cadet_id, marked_at, expires_at, embedding=None, details=None):
+        self.cadet_id = cadet_id
+        self.marked_at = marked_at
+        self.expires_at = expires_at
+        self.embedding = embedding
+        self.details = details or {}
+
+
+class RecognitionCooldown:
+    """Thread-safe TTL cache of recently marked cadets keyed by session"""
+
+    def __init__(self, ttl=DEFAULT_COOLDOWN_SECONDS, max_cadets=MAX_CADETS_PER_SESSION,
+                 max_sessions=MAX_SESSIONS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_cadets = max_cadets
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._remembered = 0
+
+    def _live_entries(self, session_id):
+        """Return the session's entries after dropping expired ones; caller holds the lock"""
+        entries = self._sessions.get(session_id)
+        if entries is None:
+            return None
+        now = self._clock()
+        for cadet_id in [cadet_id for cadet_id, entry in entries.items() if entry.expires_at <= now]:
+            del entries[cadet_id]
+        if not entries:
+            del self._sessions[session_id]
+            return None
+        return entries
+
+    def _sweep(self):
+        """Drop expired entries of every session; caller holds the lock"""
+        for session_id in list(self._sessions):
+            self._live_entries(session_id)
+
+    def get(self, session_id, cadet_id):
+        """Return the RecentMatch for a cadet still in cooldown, or None"""
+        with self._lock:
+            entries = self._live_entries(session_id)
+            return entries.get(cadet_id) if entries else None
+
+    def remember(self, session_id, cadet_id, marked_at, embedding=None, details=None):
+        """Start (or keep) the cooldown for a cadet and record the matched embedding"""
+        with self._lock:
+            self._remembered += 1
+            if self._remembered % SWEEP_INTERVAL == 0:
+                self._sweep()
+            entries = self._live_entries(session_id)
+            if entries is None:
+                entries = self._sessions[session_id] = OrderedDict()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            entry = entries.get(cadet_id)
+            if embedding is not None:
+                embedding = np.asarray(embedding, dtype=np.float32).ravel()
+                norm = np.linalg.norm(embedding)
+                embedding = embedding / norm if norm else None
+            if entry is None:
+                entry = RecentMatch(cadet_id, marked_at, self._clock() + self.ttl, embedding, details)
+                entries[cadet_id] = entry
+                while len(entries) > self.max_cadets:
+                    entries.popitem(last=False)
+            elif embedding is not None:
+                # Track the latest frame; the cooldown still runs from the first mark
+                entry.embedding = embedding
+            entries.move_to_end(cadet_id)
+            return entry
+
+    def match_probe(self, session_id, embedding, max_distance=RECENT_PROBE_DISTANCE):
+        """Return (RecentMatch, cosine distance) for a near-identical recent probe, or None"""
+        with self._lock:
+            entries = self._live_entries(session_id)
+            if not entries:
+                return None
+            candidates = [entry for entry in entries.values() if entry.embedding is not None]
+        if not candidates:
+            return None
+        probe = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(probe)
+        if not norm:
+            return None
+        distances = 1.0 - np.vstack([entry.embedding for entry in candidates]) @ (probe / norm)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return candidates[best], float(distances[best])
+
+    def forget(self, session_id, cadet_id=None):
+        """Drop one cadet, or the whole session, from the cooldown"""
+        with self._lock:
+            if cadet_id is None:
+                self._sessions.pop(session_id, None)
+            else:
+                self._sessions.get(session_id, {}).pop(cadet_id, None)
+
+
+_cooldown = None
+_cooldown_lock = threading.Lock()
+
+
+def get_cooldown():
+    """Return the process-wide RecognitionCooldown configured from settings"""
+    global _cooldown
+    if _cooldown is None:
+        with _cooldown_lock:
+            if _cooldown is None:
+                _cooldown = RecognitionCooldown(
+                    ttl=getattr(settings, 'FACE_RECOG_COOLDOWN_SECONDS', DEFAULT_COOLDOWN_SECONDS)
+                )
+    return _cooldown
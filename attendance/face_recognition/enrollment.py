@@ -0,0 +1,185 @@
+"""
+Bulk face enrollment from zip archives of cadet photos.
+
+Photos are named after the cadet's enrollment number (``NCC2024001.jpg``)
+and are read straight from the archive without extracting it. A producer
+thread reads and decodes entries into a bounded queue while the caller's
+thread runs detection, embedding and the database writes, so memory use is
+bounded by the queue size rather than the archive size.
+"""
+import io
+import logging
+import os
+import queue
+import threading
+import zipfile
+
+from django.db import transaction
+
+from accounts.models import Cadet
+from .face_utils import FaceRecognitionError, detect_faces, get_face_encodings, preprocess_image
+from .models import FaceEncoding
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+def enrollment_number_for(filename):
+    """Map an archive entry name to the enrollment number it refers to"""
+    return os.path.splitext(os.path.basename(filename))[0].upper()
+
+
+def save_face_encoding(cadet, encoding, rgb_image, face_location):
+    """Replace the cadet's face encoding and thumbnail"""
+    with transaction.atomic():
+        FaceEncoding.objects.filter(cadet=cadet).delete()
+        face_encoding = FaceEncoding(cadet=cadet)
+        face_encoding.set_encoding(encoding)
+        top, right, bottom, left = face_location
+        face_encoding.save_face_thumbnail(rgb_image[top:bottom, left:right])
+        face_encoding.save()
+    return face_encoding
+
+
+class ArchiveImportResult:
+    """Outcome for a single archive entry"""
+
+    def __init__(self, filename, enrollment_number, status, message=''):
+        self.filename = filename
+        self.enrollment_number = enrollment_number
+        self.status = status
+        self.message = message
+
+    @property
+    def success(self):
+        return self.status == 'REGISTERED'
+
+    def __repr__(self):
+        return f"<ArchiveImportResult {self.filename}: {self.status}>"
+
+
+def _produce(zip_file, jobs, work_queue, stop):
+    """Read and decode archive entries into the bounded work queue"""
+    try:
+        for info, cadet in jobs:
+            if stop.is_set():
+                break
+            try:
+                with zip_file.open(info) as entry:
+                    item = (info.filename, cadet, preprocess_image(io.BytesIO(entry.read())), None)
+            except (FaceRecognitionError, zipfile.BadZipFile, OSError) as e:
+                item = (info.filename, cadet, None, str(e))
+            except Exception as e:
+                # Anything else fails this entry only; the rest of the archive is still read
+                logger.warning(f"Could not read archive entry {info.filename}", exc_info=True)
+                item = (info.filename, cadet, None, str(e) or e.__class__.__name__)
+            # Block while the consumer is busy, but give up once it has stopped
+            while not stop.is_set():
+                try:
+                    work_queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+    finally:
+        while not stop.is_set():
+            try:
+                work_queue.put(_DONE, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+
+def import_face_archive(archive, replace=False, queue_size=DEFAULT_QUEUE_SIZE, callback=None):
+    """
+    Register faces for cadets from a zip archive of photos
+
+    Args:
+        archive: Path or file-like object of the zip archive
+        replace: Re-register cadets that already have a face encoding
+        queue_size: Maximum number of decoded images held in memory
+        callback: Optional callable invoked with each ArchiveImportResult
+
+    Returns:
+        list: ArchiveImportResult for every image entry in the archive
+    """
+    results = []
+
+    def record(result):
+        results.append(result)
+        if callback:
+            callback(result)
+
+    with zipfile.ZipFile(archive) as zip_file:
+        entries = [
+            info for info in zip_file.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            and not os.path.basename(info.filename).startswith('.')
+        ]
+
+        # One query for every cadet named in the archive
+        numbers = {enrollment_number_for(info.filename) for info in entries}
+        cadets = Cadet.objects.select_related('user').in_bulk(numbers, field_name='enrollment_number')
+        registered = set()
+        if not replace:
+            registered = set(
+                FaceEncoding.objects.filter(cadet__in=cadets.values()).values_list('cadet_id', flat=True)
+            )
+
+        jobs = []
+        for info in entries:
+            number = enrollment_number_for(info.filename)
+            cadet = cadets.get(number)
+            if cadet is None:
+                record(ArchiveImportResult(info.filename, number, 'NOT_FOUND',
+                                           f'Cadet with enrollment number {number} not found'))
+            elif cadet.id in registered:
+                record(ArchiveImportResult(info.filename, number, 'SKIPPED', 'Face already registered'))
+            else:
+                jobs.append((info, cadet))
+
+        if not jobs:
+            return results
+
+        work_queue = queue.Queue(maxsize=max(1, queue_size))
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=_produce, args=(zip_file, jobs, work_queue, stop),
+            name='face-archive-reader', daemon=True
+        )
+        producer.start()
+        try:
+            while True:
+                item = work_queue.get()
+                if item is _DONE:
+                    break
+                record(_register(*item))
+        finally:
+            stop.set()
+            producer.join()
+
+    return results
+
+
+def _register(filename, cadet, image_array, error):
+    number = cadet.enrollment_number
+    if error:
+        return ArchiveImportResult(filename, number, 'FAILED', error)
+    try:
+        face_locations, rgb_image = detect_faces(image_array)
+        if not face_locations:
+            return ArchiveImportResult(filename, number, 'NO_FACE', 'No face detected')
+        face_encodings = get_face_encodings(rgb_image, face_locations[:1])
+        if not face_encodings:
+            return ArchiveImportResult(filename, number, 'FAILED', 'Could not extract face features')
+        save_face_encoding(cadet, face_encodings[0], rgb_image, face_locations[0])
+    except FaceRecognitionError as e:
+        return ArchiveImportResult(filename, number, 'FAILED', str(e))
+
+    message = f'Registered face for {cadet.user.get_full_name()}'
+    if len(face_locations) > 1:
+        message += ' (multiple faces detected, used the first one)'
+    return ArchiveImportResult(filename, number, 'REGISTERED', message)
@@ -0,0 +1,3 @@
+class FaceRecognitionError(Exception):
+    """Custom exception for face recognition errors"""
+    pass
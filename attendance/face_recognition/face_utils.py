@@ -8,11 +8,10 @@ from django.core.files.base import ContentFile
 import io
 import logging
 
-logger = logging.getLogger(__name__)
+from .capabilities import is_deepface_available  # noqa: F401 - kept for existing imports
+from .exceptions import FaceRecognitionError
 
-class FaceRecognitionError(Exception):
-    """Custom exception for face recognition errors"""
-    pass
+logger = logging.getLogger(__name__)
 
 # Initialize DeepFace with default settings
 DETECTOR_BACKEND = 'opencv'  # Options: 'opencv', 'ssd', 'dlib', 'mtcnn', 'retinaface', 'mediapipe'
@@ -53,20 +52,6 @@ def _import_deepface():
         ) from e
 
 
-def is_deepface_available():
-    """Return True if DeepFace and its dependencies are importable.
-
-    This helper lets views determine whether to enable camera-based
-    flow in templates. It avoids throwing exceptions to the caller; use
-    it to show user-friendly fallbacks when heavy dependencies aren't
-    installed (for example in lightweight developer environments).
-    """
-    try:
-        _import_deepface()
-        return True
-    except FaceRecognitionError:
-        return False
-
 def get_detector():
     global _detector
     if _detector is None:
@@ -256,58 +241,212 @@ def get_face_encodings(image_array, face_locations=None):
         logger.error(f"Error getting face encodings: {str(e)}")
         raise FaceRecognitionError(f"Error getting face encodings: {str(e)}")
 
+class FaceGallery:
+    """
+    In-memory matrix of known face encodings used for matching.
+
+    Encodings are stored once as a contiguous matrix of L2-normalized rows
+    together with their original norms, so every supported metric can be
+    derived from a single matrix product against the probe(s). Rows can be
+    added and removed in place without rebuilding the whole matrix.
+
+    Args:
+        encodings: Optional iterable of face encodings to start with
+        ids: Optional identifiers for the encodings (defaults to 0..n-1)
+        metric: Distance metric ('cosine', 'euclidean' or 'euclidean_l2');
+            defaults to DISTANCE_METRIC
+    """
+    METRICS = ('cosine', 'euclidean', 'euclidean_l2')
+
+    def __init__(self, encodings=(), ids=None, metric=None, dtype=np.float32):
+        self.metric = metric or DISTANCE_METRIC
+        if self.metric not in self.METRICS:
+            raise ValueError(f"Unsupported distance metric: {self.metric}")
+        self.dtype = np.dtype(dtype)
+
+        encodings = [np.asarray(enc, dtype=self.dtype).ravel() for enc in encodings]
+        if ids is None:
+            ids = range(len(encodings))
+        ids = list(ids)
+        if len(ids) != len(encodings):
+            raise ValueError("ids and encodings must have the same length")
+
+        self._ids = []
+        self._rows = {}
+        self._size = 0
+        self._matrix = None
+        self._norms = None
+
+        if encodings:
+            matrix = np.vstack(encodings)
+            self._allocate(matrix.shape[1], len(encodings))
+            norms = np.linalg.norm(matrix, axis=1)
+            self._norms[:len(encodings)] = norms
+            norms[norms == 0] = 1
+            self._matrix[:len(encodings)] = matrix / norms[:, None]
+            for row, identifier in enumerate(ids):
+                if identifier in self._rows:
+                    raise ValueError(f"Duplicate gallery id: {identifier!r}")
+                self._rows[identifier] = row
+                self._ids.append(identifier)
+            self._size = len(encodings)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, identifier):
+        return identifier in self._rows
+
+    @property
+    def ids(self):
+        """Identifiers in row order"""
+        return list(self._ids)
+
+    @property
+    def dimension(self):
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @property
+    def matrix(self):
+        """Normalized encodings as a (n, d) contiguous view"""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return self._matrix[:self._size]
+
+    def _allocate(self, dimension, capacity):
+        capacity = max(capacity, 16)
+        matrix = np.zeros((capacity, dimension), dtype=self.dtype)
+        norms = np.zeros(capacity, dtype=self.dtype)
+        if self._matrix is not None:
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._matrix = matrix
+        self._norms = norms
+
+    def add(self, identifier, encoding):
+        """Add or replace the encoding stored under ``identifier``"""
+        vector = np.asarray(encoding, dtype=self.dtype).ravel()
+        if self._matrix is None:
+            self._allocate(vector.shape[0], 16)
+        elif vector.shape[0] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Encoding has dimension {vector.shape[0]}, expected {self._matrix.shape[1]}"
+            )
+
+        row = self._rows.get(identifier)
+        if row is None:
+            if self._size == self._matrix.shape[0]:
+                self._allocate(self._matrix.shape[1], self._size * 2)
+            row = self._size
+            self._rows[identifier] = row
+            self._ids.append(identifier)
+            self._size += 1
+
+        norm = float(np.linalg.norm(vector))
+        self._norms[row] = norm
+        self._matrix[row] = vector / norm if norm else vector
+
+    def remove(self, identifier):
+        """Remove the encoding stored under ``identifier``.
+
+        The last row is moved into the freed slot, so row indices of other
+        entries may change; use ``ids`` to map rows back to identifiers.
+        """
+        row = self._rows.pop(identifier)
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+        self._size = last
+
+    def distances(self, probes):
+        """
+        Distances between probe encoding(s) and every gallery entry
+
+        Args:
+            probes: A single encoding (d,) or a batch of encodings (m, d)
+
+        Returns:
+            numpy array: (n,) distances for a single probe, (m, n) for a batch
+        """
+        probes = np.asarray(probes, dtype=self.dtype)
+        single = probes.ndim == 1
+        probes = np.atleast_2d(probes)
+        if self._size == 0:
+            empty = np.empty((probes.shape[0], 0), dtype=self.dtype)
+            return empty[0] if single else empty
+
+        probe_norms = np.linalg.norm(probes, axis=1)
+        safe_norms = np.where(probe_norms == 0, 1, probe_norms)
+        # Single BLAS call: cosine similarity of every probe against every row
+        similarities = (probes / safe_norms[:, None]) @ self.matrix.T
+
+        if self.metric == 'cosine':
+            distances = 1.0 - similarities
+        elif self.metric == 'euclidean_l2':
+            distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities, 0.0))
+        else:
+            norms = self._norms[:self._size]
+            squared = (
+                probe_norms[:, None] ** 2 + norms[None, :] ** 2
+                - 2.0 * probe_norms[:, None] * norms[None, :] * similarities
+            )
+            distances = np.sqrt(np.maximum(squared, 0.0))
+
+        return distances[0] if single else distances
+
+    def confidence(self, distance):
+        """Convert a distance into a 0-1 confidence score"""
+        # For cosine: 1 means identical, 0 means orthogonal
+        if self.metric == 'cosine':
+            return 1.0 - distance
+        # For euclidean, normalize to [0,1] range (assuming max possible distance is 4.0)
+        return max(0.0, 1.0 - (distance / 4.0))
+
+    def best_match(self, probe, threshold=0.6):
+        """
+        Find the closest gallery entry for a probe encoding
+
+        Returns:
+            tuple: (row_index, confidence) or (None, None) if no entry is within threshold
+        """
+        if self._size == 0 or probe is None:
+            return None, None
+        distances = self.distances(probe)
+        best_match_index = int(np.argmin(distances))
+        min_distance = float(distances[best_match_index])
+        if min_distance <= threshold:
+            return best_match_index, float(self.confidence(min_distance))
+        return None, None
+
+
+def _as_gallery(known_encodings):
+    if isinstance(known_encodings, FaceGallery):
+        return known_encodings
+    return FaceGallery(known_encodings)
+
 def compare_faces(known_encodings, face_encoding_to_check, threshold=0.6):
     """
     Compare a face encoding with a list of known encodings
     
     Args:
-        known_encodings: List of known face encodings
+        known_encodings: List of known face encodings or a FaceGallery
         face_encoding_to_check: Face encoding to compare against known encodings
         threshold: Maximum distance to consider it a match (lower is more strict)
         
     Returns:
         list: List of True/False values indicating which known encodings match the face
     """
-    if not known_encodings or face_encoding_to_check is None:
+    if face_encoding_to_check is None or not len(known_encodings):
         return []
     
     try:
-        # Convert to numpy arrays if they aren't already
-        known_encodings = [np.array(enc) for enc in known_encodings]
-        face_encoding_to_check = np.array(face_encoding_to_check)
-        
-        # Calculate distances using the specified metric (NumPy replacement)
-        known_arr = np.vstack(known_encodings)
-        check_arr = face_encoding_to_check.reshape(1, -1)
-        if DISTANCE_METRIC == 'cosine':
-            # Cosine similarity: dot product of normalized vectors
-            def _normalize_rows(arr):
-                norms = np.linalg.norm(arr, axis=1, keepdims=True)
-                norms[norms == 0] = 1
-                return arr / norms
-            norm_known = _normalize_rows(known_arr)
-            norm_check = _normalize_rows(check_arr)
-            similarities = np.dot(norm_known, norm_check.T).flatten()
-            distances = 1.0 - similarities
-        elif DISTANCE_METRIC == 'euclidean':
-            # Euclidean distance
-            diffs = known_arr - check_arr
-            distances = np.linalg.norm(diffs, axis=1)
-        elif DISTANCE_METRIC == 'euclidean_l2':
-            # L2-normalized Euclidean (normalize vectors then euclidean)
-            def _normalize_rows(arr):
-                norms = np.linalg.norm(arr, axis=1, keepdims=True)
-                norms[norms == 0] = 1
-                return arr / norms
-            norm_known = _normalize_rows(known_arr)
-            norm_check = _normalize_rows(check_arr)
-            diffs = norm_known - norm_check
-            distances = np.linalg.norm(diffs, axis=1)
-        else:
-            raise ValueError(f"Unsupported distance metric: {DISTANCE_METRIC}")
-        
-        # Compare distances to threshold
-        return [dist <= threshold for dist in distances]
+        distances = _as_gallery(known_encodings).distances(face_encoding_to_check)
+        return (distances <= threshold).tolist()
     except Exception as e:
         logger.error(f"Error comparing faces: {str(e)}")
         return []
@@ -317,68 +456,18 @@ def find_best_match(known_encodings, face_encoding_to_check, threshold=0.6):
     Find the best match for a face encoding from a list of known encodings
     
     Args:
-        known_encodings: List of known face encodings
+        known_encodings: List of known face encodings or a FaceGallery
         face_encoding_to_check: Face encoding to find a match for
         threshold: Maximum distance to consider it a match (lower is more strict)
         
     Returns:
         tuple: (best_match_index, confidence) or (None, None) if no match found
     """
-    if not known_encodings or face_encoding_to_check is None:
+    if face_encoding_to_check is None or not len(known_encodings):
         return None, None
     
     try:
-        # Convert to numpy arrays if they aren't already
-        known_encodings = [np.array(enc) for enc in known_encodings]
-        face_encoding_to_check = np.array(face_encoding_to_check)
-        
-        # Calculate distances using the specified metric (NumPy replacement)
-        known_arr = np.vstack(known_encodings)
-        check_arr = face_encoding_to_check.reshape(1, -1)
-        if DISTANCE_METRIC == 'cosine':
-            # Cosine similarity: dot of normalized vectors
-            def _norm_rows(arr):
-                norms = np.linalg.norm(arr, axis=1, keepdims=True)
-                norms[norms == 0] = 1
-                return arr / norms
-            norm_known = _norm_rows(known_arr)
-            norm_check = _norm_rows(check_arr)
-            similarities = np.dot(norm_known, norm_check.T).flatten()
-            distances = 1.0 - similarities
-        elif DISTANCE_METRIC == 'euclidean':
-            diffs = known_arr - check_arr
-            distances = np.linalg.norm(diffs, axis=1)
-        elif DISTANCE_METRIC == 'euclidean_l2':
-            def _norm_rows(arr):
-                norms = np.linalg.norm(arr, axis=1, keepdims=True)
-                norms[norms == 0] = 1
-                return arr / norms
-            norm_known = _norm_rows(known_arr)
-            norm_check = _norm_rows(check_arr)
-            diffs = norm_known - norm_check
-            distances = np.linalg.norm(diffs, axis=1)
-        else:
-            raise ValueError(f"Unsupported distance metric: {DISTANCE_METRIC}")
-        
-        # Find the best match (smallest distance)
-        best_match_index = np.argmin(distances)
-        min_distance = distances[best_match_index]
-        
-        # Calculate confidence (1 - normalized distance)
-        # For cosine: 1 means identical, 0 means orthogonal
-        # For euclidean: 1 means identical, higher means more different
-        if DISTANCE_METRIC == 'cosine':
-            confidence = 1.0 - min_distance  # For cosine, distance is already 1-similarity
-        else:
-            # For euclidean, normalize to [0,1] range (assuming max possible distance is 4.0)
-            confidence = max(0.0, 1.0 - (min_distance / 4.0))
-        
-        # Check if the best match is below the threshold
-        if min_distance <= threshold:
-            # Ensure we return Python-native types (not numpy types) for compatibility
-            return int(best_match_index), float(confidence)
-        
-        return None, None
+        return _as_gallery(known_encodings).best_match(face_encoding_to_check, threshold)
     except Exception as e:
         logger.error(f"Error finding best match: {str(e)}")
         return None, None
@@ -0,0 +1,90 @@
+"""
+Per-unit cache of face galleries.
+
+Every recognition request used to load and unpickle all active encodings
+of the unit to build a FaceGallery, only to compare a single probe. The
+gallery of each unit is now built once per process and reused until the
+unit's encodings change.
+
+Each lookup reads a cheap stamp of the unit's active encodings (count,
+latest update and sum of cadet ids) with one aggregate query, and the
+gallery is rebuilt when it no longer matches, which catches changes made
+by other workers. Enrollments and deletions committed in this process
+drop the affected galleries straight away. They are not patched in place:
+a stamp re-read after the patch could also cover another worker's change
+that the patched gallery never received.
+"""
+import pickle
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, Max, Sum
+
+from .face_utils import FaceGallery
+from .models import FaceEncoding
+
+
+def _active_encodings(unit_id):
+    return FaceEncoding.objects.filter(cadet__unit_id=unit_id, is_active=True)
+
+
+class UnitGalleryCache:
+    """Thread-safe FaceGallery per unit, keyed by cadet id"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._units = {}
+
+    def _stamp(self, unit_id):
+        stamp = _active_encodings(unit_id).aggregate(
+            count=Count('id'), updated=Max('updated_at'), cadets=Sum('cadet_id')
+        )
+        return stamp['count'], stamp['updated'], stamp['cadets']
+
+    def _build(self, unit_id):
+        rows = _active_encodings(unit_id).values_list('cadet_id', 'encoding')
+        cadet_ids, encodings = [], []
+        for cadet_id, encoding in rows:
+            cadet_ids.append(cadet_id)
+            encodings.append(pickle.loads(encoding))
+        return FaceGallery(encodings, ids=cadet_ids)
+
+    @contextmanager
+    def gallery(self, unit_id):
+        """
+        Yield the up-to-date gallery of a unit, building it if needed
+
+        The gallery is locked for the duration of the block, so match against
+        it inside the block and map rows to cadet ids there as well.
+        """
+        stamp = self._stamp(unit_id)
+        with self._lock:
+            entry = self._units.get(unit_id)
+            if entry is None or entry[1] != stamp:
+                entry = self._units[unit_id] = [self._build(unit_id), stamp]
+            yield entry[0]
+
+    def invalidate(self, cadet_id, unit_id=None):
+        """Drop the gallery of ``unit_id`` and any gallery holding the cadet"""
+        with self._lock:
+            for cached_unit_id, (gallery, _) in list(self._units.items()):
+                if cached_unit_id == unit_id or cadet_id in gallery:
+                    del self._units[cached_unit_id]
+
+    def clear(self):
+        with self._lock:
+            self._units.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_gallery_cache():
+    """Return the process-wide UnitGalleryCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UnitGalleryCache()
+    return _cache
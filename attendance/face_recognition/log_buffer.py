@@ -0,0 +1,146 @@
+"""
+Buffered writer for FaceAttendanceLog rows.
+
+Kiosks send a frame every second or two and most of them are "no face" or
+"unknown face" attempts. Writing each log row on the request path makes
+every scan wait for SQLite's write lock, so attempts are queued in memory
+and written with ``bulk_create`` by a background thread once
+``FACE_LOG_FLUSH_SIZE`` rows are waiting or ``FACE_LOG_FLUSH_INTERVAL``
+seconds have passed. The queue is flushed at interpreter exit, and when it
+is full the row is written synchronously instead of being dropped.
+
+Because ``created_at`` is set when the row is written, buffered rows record
+the time of the attempt in ``captured_at``.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+
+from .models import FaceAttendanceLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_FLUSH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+
+class FaceLogBuffer:
+    """In-memory queue of unsaved FaceAttendanceLog rows flushed in bulk"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, flush_size=DEFAULT_FLUSH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, autostart=True):
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=max(1, max_size))
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def log(self, **fields):
+        """Queue a log row, writing it immediately if the buffer is full"""
+        fields.setdefault('captured_at', timezone.now())
+        log = FaceAttendanceLog(**fields)
+        if self.autostart and not self._stopping.is_set():
+            self._ensure_started()
+        try:
+            self._queue.put_nowait(log)
+        except queue.Full:
+            logger.warning("Face attendance log buffer is full, writing synchronously")
+            log.save()
+            return log
+        if self._queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+        return log
+
+    def flush(self):
+        """Write every queued row and return how many were written"""
+        with self._flush_lock:
+            pending = []
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not pending:
+                return 0
+            try:
+                FaceAttendanceLog.objects.bulk_create(pending, batch_size=500)
+                return len(pending)
+            except DatabaseError:
+                logger.exception(f"Bulk write of {len(pending)} face attendance logs failed, retrying one by one")
+            written = 0
+            for log in pending:
+                try:
+                    log.save()
+                    written += 1
+                except DatabaseError as e:
+                    logger.error(f"Dropping face attendance log for session {log.session_id}: {e}")
+            return written
+
+    def stop(self):
+        """Stop the background thread and write whatever is still queued"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='face-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Face attendance log flush failed")
+        finally:
+            connections.close_all()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_log_buffer():
+    """Return the process-wide FaceLogBuffer configured from settings"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = FaceLogBuffer(
+                    max_size=getattr(settings, 'FACE_LOG_BUFFER_SIZE', DEFAULT_MAX_SIZE),
+                    flush_size=getattr(settings, 'FACE_LOG_FLUSH_SIZE', DEFAULT_FLUSH_SIZE),
+                    flush_interval=getattr(settings, 'FACE_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+                )
+    return _buffer
+
+
+def log_face_attempt(**fields):
+    """Record a recognition attempt, buffered unless FACE_LOG_BUFFER_ENABLED is False"""
+    if not getattr(settings, 'FACE_LOG_BUFFER_ENABLED', True):
+        return FaceAttendanceLog.objects.create(**fields)
+    return get_log_buffer().log(**fields)
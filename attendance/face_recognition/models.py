@@ -1,7 +1,7 @@
 import os
-import numpy as np
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.core.files.base import ContentFile
 from accounts.models import Cadet
 import pickle
@@ -117,13 +117,106 @@ class FaceAttendanceLog(models.Model):
         help_text="IP address of the device used for attendance"
     )
     
+    # Offline kiosk captures carry their own id and capture time so that
+    # retried batch uploads can be recognised and replayed
+    capture_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Client-side identifier of a batch-uploaded capture"
+    )
+    
+    captured_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=timezone.now,
+        help_text="When the capture was taken on the kiosk, as opposed to when the row was written"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'face_attendance_logs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['session', 'captured_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session', 'capture_id'],
+                condition=models.Q(capture_id__isnull=False),
+                name='unique_face_log_capture',
+            ),
+        ]
         verbose_name = 'Face Attendance Log'
         verbose_name_plural = 'Face Attendance Logs'
     
     def __str__(self):
         return f"{self.get_status_display()} - {self.cadet} - {self.created_at}"
+
+
+class FaceDuplicateAudit(models.Model):
+    """
+    A run of the duplicate-registration audit
+    """
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    threshold = models.FloatField(help_text="Cosine similarity above which a pair is reported")
+    is_full = models.BooleanField(
+        default=False,
+        help_text="Whether every encoding was compared, rather than only new or changed ones"
+    )
+    encodings_checked = models.IntegerField(default=0)
+    pairs_found = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'face_duplicate_audits'
+        ordering = ['-started_at']
+        verbose_name = 'Face Duplicate Audit'
+        verbose_name_plural = 'Face Duplicate Audits'
+    
+    def __str__(self):
+        return f"Duplicate audit at {self.started_at}"
+
+
+class FaceDuplicateMatch(models.Model):
+    """
+    A pair of face encodings for different cadets that look like the same person
+    """
+    # Stored with cadet_a_id < cadet_b_id so each pair appears once
+    cadet_a = models.ForeignKey(
+        Cadet,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    cadet_b = models.ForeignKey(
+        Cadet,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    similarity = models.FloatField(help_text="Cosine similarity of the two encodings")
+    
+    audit = models.ForeignKey(
+        FaceDuplicateAudit,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='matches'
+    )
+    is_reviewed = models.BooleanField(
+        default=False,
+        help_text="Whether an officer has reviewed this pair"
+    )
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'face_duplicate_matches'
+        ordering = ['-similarity']
+        constraints = [
+            models.UniqueConstraint(fields=['cadet_a', 'cadet_b'], name='unique_face_duplicate_pair'),
+        ]
+        verbose_name = 'Face Duplicate Match'
+        verbose_name_plural = 'Face Duplicate Matches'
+    
+    def __str__(self):
+        return f"{self.cadet_a} ~ {self.cadet_b} ({self.similarity:.2f})"
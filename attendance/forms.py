@@ -17,3 +17,85 @@ class AttendanceSessionForm(forms.ModelForm):
             'location': forms.TextInput(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+
+
+class FaceArchiveImportForm(forms.Form):
+    archive = forms.FileField(
+        help_text='Zip archive of cadet photos named by enrollment number (e.g. NCC2024001.jpg)'
+    )
+    replace = forms.BooleanField(
+        required=False,
+        help_text='Re-register cadets that already have a face registered'
+    )
+
+    def clean_archive(self):
+        archive = self.cleaned_data['archive']
+        if not archive.name.lower().endswith('.zip'):
+            raise forms.ValidationError('Please upload a .zip archive.')
+        return archive
+
+
+class AttendanceExportForm(forms.Form):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    )
+
+    unit = forms.ModelChoiceField(
+        queryset=None, required=False, empty_label='All units',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    sessions = forms.ModelMultipleChoiceField(
+        queryset=None, required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 8}),
+        help_text='Leave empty to export every session matching the other filters'
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, initial='csv', widget=forms.Select(attrs={'class': 'form-control'}))
+
+    def __init__(self, *args, unit=None, **kwargs):
+        """Officers pass their unit so only its sessions can be chosen"""
+        super().__init__(*args, **kwargs)
+        from units.models import Unit
+        sessions = AttendanceSession.objects.select_related('unit').order_by('-date', '-start_time')
+        if unit is not None:
+            self.fields['unit'].queryset = Unit.objects.filter(pk=unit.pk)
+            self.fields['unit'].empty_label = None
+            self.fields['sessions'].queryset = sessions.filter(unit=unit)
+        else:
+            self.fields['unit'].queryset = Unit.objects.all()
+            self.fields['sessions'].queryset = sessions
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('The start date must be on or before the end date.')
+        return cleaned_data
+
+
+class AttendanceImportForm(forms.Form):
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'}),
+        help_text='CSV with enrollment_number, session_id and status columns, and optionally remarks and check_in_time'
+    )
+    session = forms.ModelChoiceField(
+        queryset=None, required=False, empty_label='Taken from the file',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        help_text='Session for rows that have no session_id'
+    )
+
+    def __init__(self, *args, unit=None, **kwargs):
+        """Officers pass their unit so only its sessions can be chosen"""
+        super().__init__(*args, **kwargs)
+        sessions = AttendanceSession.objects.select_related('unit').order_by('-date', '-start_time')
+        if unit is not None:
+            sessions = sessions.filter(unit=unit)
+        self.fields['session'].queryset = sessions
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Please upload a .csv file.')
+        return file
@@ -0,0 +1,215 @@
+"""
+Bulk attendance import from CSV files.
+
+Camps often record attendance on paper and type it up afterwards; this
+loads such sheets without going through mark_attendance one session at a
+time. The file is read as a stream and handled in chunks: each chunk
+resolves its enrollment numbers and sessions with one query each and is
+upserted in its own transaction. Rows that cannot be imported are reported
+with their line number and skipped, so one bad row never aborts the file.
+
+Expected columns (header names are case-insensitive)::
+
+    enrollment_number, session_id, status[, remarks][, check_in_time]
+
+``session_id`` may be left out when a default session is given.
+``status`` is one of the values or labels of Attendance.STATUS_CHOICES.
+"""
+import csv
+
+from django.utils.dateparse import parse_time
+
+from accounts.models import Cadet
+from .models import Attendance, AttendanceSession
+from .services import upsert_attendance
+
+CHUNK_SIZE = 2000
+REQUIRED_COLUMNS = ('enrollment_number', 'status')
+OPTIONAL_COLUMNS = ('remarks', 'check_in_time')
+
+# Statuses are accepted by value or label, in any case
+STATUS_LOOKUP = {
+    **{label.upper(): value for value, label in Attendance.STATUS_CHOICES},
+    **{value: value for value, _ in Attendance.STATUS_CHOICES},
+}
+
+
+class AttendanceImportError(Exception):
+    """Raised when the file as a whole cannot be imported"""
+    pass
+
+
+class AttendanceImportResult:
+    """Counts and per-row errors of one import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    @property
+    def skipped(self):
+        return len(self.errors)
+
+    def __repr__(self):
+        return f"<AttendanceImportResult {self.imported}/{self.rows} imported, {self.skipped} errors>"
+
+
+def _normalize_header(name):
+    return (name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _parse_check_in(value):
+    try:
+        check_in = parse_time(value)
+    except ValueError:
+        check_in = None
+    if check_in is None:
+        raise ValueError(f'Invalid check-in time "{value}"')
+    return check_in
+
+
+class _Importer:
+    def __init__(self, columns, session, unit, marked_by, result):
+        self.default_session_id = session.pk if session is not None else None
+        self.unit = unit
+        self.marked_by = marked_by
+        self.result = result
+        # {session id: (unit id, date) or None}, kept across chunks since files rarely span many sessions
+        self.sessions = {}
+        self.update_fields = ['status', 'marked_by', 'updated_at']
+        self.update_fields += [column for column in OPTIONAL_COLUMNS if column in columns]
+
+    def _parse(self, row):
+        """Return (enrollment_number, session_id, status, remarks, check_in), or raise ValueError"""
+        enrollment_number = (row.get('enrollment_number') or '').strip().upper()
+        if not enrollment_number:
+            raise ValueError('Missing enrollment number')
+
+        session_id = (row.get('session_id') or '').strip()
+        if not session_id:
+            if self.default_session_id is None:
+                raise ValueError('Missing session id')
+            session_id = self.default_session_id
+        elif not session_id.isdigit():
+            raise ValueError(f'Invalid session id "{session_id}"')
+
+        raw_status = (row.get('status') or '').strip()
+        status = STATUS_LOOKUP.get(raw_status.upper())
+        if status is None:
+            raise ValueError(f'Invalid status "{raw_status}"')
+
+        check_in = (row.get('check_in_time') or '').strip()
+        check_in = _parse_check_in(check_in) if check_in else None
+
+        return enrollment_number, int(session_id), status, (row.get('remarks') or '').strip(), check_in
+
+    def _load_sessions(self, session_ids):
+        missing = set(session_ids) - set(self.sessions)
+        if not missing:
+            return
+        sessions = AttendanceSession.objects.filter(id__in=missing)
+        if self.unit is not None:
+            sessions = sessions.filter(unit=self.unit)
+        found = {session_id: (unit_id, date) for session_id, unit_id, date in sessions.values_list('id', 'unit_id', 'date')}
+        for session_id in missing:
+            self.sessions[session_id] = found.get(session_id)
+
+    def import_chunk(self, chunk):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, *self._parse(row)))
+            except ValueError as e:
+                self.result.add_error(line, str(e))
+
+        self._load_sessions({row[2] for row in parsed})
+        cadets = {
+            enrollment_number: (cadet_id, unit_id)
+            for enrollment_number, cadet_id, unit_id in Cadet.objects.filter(
+                enrollment_number__in={row[1] for row in parsed}
+            ).values_list('enrollment_number', 'id', 'unit_id')
+        }
+
+        # Keyed by (session, cadet): a later row for the same cadet replaces an
+        # earlier one, which is reported so that rows == imported + skipped
+        records = {}
+        record_lines = {}
+        for line, enrollment_number, session_id, status, remarks, check_in in parsed:
+            session = self.sessions.get(session_id)
+            if session is None:
+                self.result.add_error(line, f'Session {session_id} not found')
+                continue
+            if enrollment_number not in cadets:
+                self.result.add_error(line, f'Cadet {enrollment_number} not found')
+                continue
+            cadet_id, cadet_unit_id = cadets[enrollment_number]
+            session_unit_id, session_date = session
+            if cadet_unit_id != session_unit_id:
+                self.result.add_error(line, f'Cadet {enrollment_number} is not in the unit of session {session_id}')
+                continue
+            key = session_id, cadet_id
+            if key in records:
+                self.result.add_error(record_lines[key], 'Duplicate row for session/cadet; later row kept')
+            record_lines[key] = line
+            records[key] = Attendance(
+                session_id=session_id, session_date=session_date, cadet_id=cadet_id, status=status,
+                remarks=remarks, check_in_time=check_in, marked_by=self.marked_by
+            )
+
+        # upsert_attendance commits the chunk, with its stats, in one transaction
+        upsert_attendance(list(records.values()), update_fields=self.update_fields)
+        self.result.imported += len(records)
+
+
+def import_attendance_csv(stream, session=None, unit=None, marked_by=None, chunk_size=CHUNK_SIZE):
+    """
+    Import attendance rows from a CSV text stream
+
+    Args:
+        stream: Text file object opened with newline=''
+        session: Default session for rows without a session_id
+        unit: Only accept sessions of this unit (used for officers)
+        marked_by: Officer recorded as having marked the attendance
+        chunk_size: Rows resolved and upserted per transaction
+
+    Returns:
+        AttendanceImportResult
+    """
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise AttendanceImportError('The file is empty.')
+    reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames]
+    if 'session' in reader.fieldnames and 'session_id' not in reader.fieldnames:
+        reader.fieldnames = ['session_id' if name == 'session' else name for name in reader.fieldnames]
+
+    columns = set(reader.fieldnames)
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if 'session_id' not in columns and session is None:
+        missing.append('session_id')
+    if missing:
+        raise AttendanceImportError(f'Missing required columns: {", ".join(missing)}')
+
+    result = AttendanceImportResult()
+    importer = _Importer(columns, session, unit, marked_by, result)
+    chunk = []
+    try:
+        for row in reader:
+            result.rows += 1
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= chunk_size:
+                importer.import_chunk(chunk)
+                chunk = []
+    except (csv.Error, UnicodeDecodeError) as e:
+        # Earlier chunks are already committed; the unreadable rest of the file is not
+        raise AttendanceImportError(
+            f'Could not read line {reader.line_num}: {e} ({result.imported} rows were imported before it)'
+        )
+    if chunk:
+        importer.import_chunk(chunk)
+
+    result.errors.sort()
+    return result
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.face_recognition.audit import (
+    DEFAULT_BLOCK_SIZE, DUPLICATE_SIMILARITY_THRESHOLD, run_duplicate_audit
+)
+from attendance.face_recognition.models import FaceDuplicateMatch
+
+
+class Command(BaseCommand):
+    help = 'Find face encodings of different cadets that appear to belong to the same person'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_SIMILARITY_THRESHOLD,
+                          help=f'Cosine similarity above which a pair is reported (default: {DUPLICATE_SIMILARITY_THRESHOLD})')
+        parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                          help=f'Encodings per tile of the similarity computation (default: {DEFAULT_BLOCK_SIZE})')
+        parser.add_argument('--full', action='store_true',
+                          help='Compare every encoding instead of only those changed since the last audit')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('Threshold must be between 0 and 1')
+        if options['block_size'] < 1:
+            raise CommandError('Block size must be positive')
+
+        audit = run_duplicate_audit(
+            threshold=options['threshold'],
+            block_size=options['block_size'],
+            full=options['full']
+        )
+
+        mode = 'Full' if audit.is_full else 'Incremental'
+        self.stdout.write(f'{mode} audit compared {audit.encodings_checked} encodings')
+        matches = FaceDuplicateMatch.objects.filter(audit=audit).select_related('cadet_a', 'cadet_b')
+        for match in matches:
+            self.stdout.write(self.style.WARNING(
+                f'{match.cadet_a.enrollment_number} ~ {match.cadet_b.enrollment_number}: {match.similarity:.3f}'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Found {audit.pairs_found} suspicious pairs'))
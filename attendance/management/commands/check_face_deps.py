@@ -1,22 +1,31 @@
 from django.core.management.base import BaseCommand
-from attendance.face_recognition.face_utils import is_deepface_available
+from attendance.face_recognition.capabilities import probe_face_stack
 
 
 class Command(BaseCommand):
     help = 'Check if DeepFace and face recognition dependencies are available in the current environment.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the capability report as JSON')
+
     def handle(self, *args, **options):
-        if is_deepface_available():
-            try:
-                import deepface
-                import tensorflow as tf
-                import cv2
-                self.stdout.write(self.style.SUCCESS('DeepFace and dependencies seem available.'))
-                self.stdout.write(f'DeepFace: {getattr(deepface, "__version__", "unknown")}')
-                self.stdout.write(f'TensorFlow: {getattr(tf, "__version__", "unknown")}')
-                self.stdout.write(f'OpenCV: {getattr(cv2, "__version__", "unknown")}')
-            except Exception as e:
-                self.stdout.write(self.style.SUCCESS('DeepFace is importable but a dependency import failed.'))
-                self.stdout.write(str(e))
+        report = probe_face_stack()
+
+        if options['json']:
+            import json
+            self.stdout.write(json.dumps(report.as_dict(), indent=2))
+            return
+
+        if report.available:
+            self.stdout.write(self.style.SUCCESS('DeepFace and dependencies seem available.'))
+            self.stdout.write(f'Model: {report.model}')
+            self.stdout.write(f'Detector: {report.detector}')
+            self.stdout.write(f'Distance metric: {report.distance_metric}')
         else:
             self.stdout.write(self.style.WARNING('DeepFace is not available. Install requirements from requirements_face.txt and use a compatible Python version (recommend Python 3.10 or 3.11).'))
+            self.stdout.write(report.error)
+
+        self.stdout.write(f'Python: {report.python_version}')
+        for name, version in report.versions.items():
+            self.stdout.write(f'{name}: {version or "not installed"}')
+        self.stdout.write(f'Probe took {report.duration:.2f}s')
@@ -0,0 +1,44 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from attendance.models import AttendanceSession
+from attendance.services import close_session
+
+
+class Command(BaseCommand):
+    help = 'Close attendance sessions that have ended and mark cadets without attendance as absent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, nargs='*', dest='sessions',
+                          help='Close these session ids now, whether or not they have ended')
+        parser.add_argument('--grace-minutes', type=int, default=30,
+                          help='Minutes after end_time before a session is closed (default: 30)')
+        parser.add_argument('--dry-run', action='store_true',
+                          help='List the sessions that would be closed without changing anything')
+
+    def handle(self, *args, **options):
+        if options['grace_minutes'] < 0:
+            raise CommandError('Grace minutes cannot be negative')
+
+        if options['sessions']:
+            sessions = AttendanceSession.objects.filter(id__in=options['sessions'])
+        else:
+            # Session times are local wall-clock times
+            cutoff = timezone.localtime() - datetime.timedelta(minutes=options['grace_minutes'])
+            sessions = AttendanceSession.objects.filter(is_active=True).filter(
+                Q(date__lt=cutoff.date()) | Q(date=cutoff.date(), end_time__lte=cutoff.time())
+            )
+
+        closed = 0
+        for session in sessions.order_by('date', 'end_time', 'id'):
+            if options['dry_run']:
+                self.stdout.write(f'Would close {session}')
+                continue
+            absent = close_session(session)
+            closed += 1
+            self.stdout.write(f'Closed {session}: {absent} cadets marked absent')
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Closed {closed} sessions'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.imports import CHUNK_SIZE, AttendanceImportError, import_attendance_csv
+from attendance.models import AttendanceSession
+
+
+class Command(BaseCommand):
+    help = 'Import attendance from a CSV file of enrollment_number, session_id and status rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help='CSV file to import')
+        parser.add_argument('--session', type=int,
+                          help='Session id for rows without a session_id column or value')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                          help=f'Rows upserted per transaction (default: {CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('Chunk size must be positive')
+
+        session = None
+        if options['session'] is not None:
+            try:
+                session = AttendanceSession.objects.get(pk=options['session'])
+            except AttendanceSession.DoesNotExist:
+                raise CommandError(f'Session {options["session"]} does not exist')
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as stream:
+                result = import_attendance_csv(stream, session=session, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f'Could not read {options["csv_file"]}: {e}')
+        except AttendanceImportError as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'Line {line}: {message}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} out of {result.rows} rows ({result.skipped} skipped)'
+        ))
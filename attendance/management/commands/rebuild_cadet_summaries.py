@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from attendance.models import CadetAttendanceSummary
+from attendance.services import STATS_FIELDS, rebuild_cadet_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every cadet attendance summary from the attendance records'
+
+    def handle(self, *args, **options):
+        before = {
+            row[:2]: row[2:]
+            for row in CadetAttendanceSummary.objects.values_list('cadet_id', 'academic_year', *STATS_FIELDS)
+        }
+        summaries = rebuild_cadet_summaries()
+
+        after = {
+            (summary.cadet_id, summary.academic_year): tuple(getattr(summary, field) for field in STATS_FIELDS)
+            for summary in summaries
+        }
+        repaired = sum(1 for key, counts in after.items() if before.get(key) != counts)
+        removed = len(before.keys() - after.keys())
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(summaries)} cadet summaries ({repaired} were missing or out of date, {removed} removed)'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.models import AttendanceSession, AttendanceSessionStats
+from attendance.services import STATS_FIELDS, refresh_session_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount the stored attendance statistics of sessions and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, nargs='*', dest='sessions',
+                          help='Only rebuild these session ids (default: all sessions)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                          help='Sessions recounted per query (default: 500)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive')
+
+        sessions = AttendanceSession.objects.order_by('id')
+        if options['sessions']:
+            sessions = sessions.filter(id__in=options['sessions'])
+        session_ids = list(sessions.values_list('id', flat=True))
+
+        repaired = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(session_ids), batch_size):
+            chunk = session_ids[start:start + batch_size]
+            before = {
+                row[0]: row[1:]
+                for row in AttendanceSessionStats.objects.filter(session_id__in=chunk).values_list('session_id', *STATS_FIELDS)
+            }
+            for session_id, stats in refresh_session_stats(chunk).items():
+                if before.get(session_id) != tuple(getattr(stats, field) for field in STATS_FIELDS):
+                    repaired += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {len(session_ids)} sessions ({repaired} were missing or out of date)'
+        ))
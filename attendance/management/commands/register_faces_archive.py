@@ -0,0 +1,46 @@
+import zipfile
+from django.core.management.base import BaseCommand, CommandError
+from attendance.face_recognition.enrollment import DEFAULT_QUEUE_SIZE, import_face_archive
+from attendance.face_recognition.face_utils import is_deepface_available
+
+
+class Command(BaseCommand):
+    help = 'Register faces for cadets from a zip archive of images named by enrollment number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', type=str, help='Zip archive containing cadet images')
+        parser.add_argument('--replace', action='store_true',
+                          help='Re-register cadets that already have a face registered')
+        parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                          help=f'Maximum number of decoded images held in memory (default: {DEFAULT_QUEUE_SIZE})')
+
+    def handle(self, *args, **options):
+        if not is_deepface_available():
+            raise CommandError('DeepFace is not available. Run check_face_deps for details.')
+
+        styles = {
+            'REGISTERED': self.style.SUCCESS,
+            'SKIPPED': self.style.WARNING,
+            'NO_FACE': self.style.WARNING,
+        }
+
+        def report(result):
+            style = styles.get(result.status, self.style.ERROR)
+            self.stdout.write(style(f'{result.filename}: {result.message or result.status}'))
+
+        try:
+            results = import_face_archive(
+                options['archive'],
+                replace=options['replace'],
+                queue_size=options['queue_size'],
+                callback=report
+            )
+        except (OSError, zipfile.BadZipFile) as e:
+            raise CommandError(f'Could not read archive {options["archive"]}: {e}')
+
+        if not results:
+            raise CommandError(f'No images found in {options["archive"]}')
+
+        success_count = sum(1 for result in results if result.success)
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS(f'Successfully registered {success_count} out of {len(results)} faces'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0002_faceattendancelog_faceencoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceattendancelog',
+            name='capture_id',
+            field=models.CharField(blank=True, help_text='Client-side identifier of a batch-uploaded capture', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='faceattendancelog',
+            name='captured_at',
+            field=models.DateTimeField(blank=True, help_text='When the capture was taken on the kiosk (batch uploads only)', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='faceattendancelog',
+            constraint=models.UniqueConstraint(condition=models.Q(('capture_id__isnull', False)), fields=('session', 'capture_id'), name='unique_face_log_capture'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0003_faceattendancelog_capture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceDuplicateAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('threshold', models.FloatField(help_text='Cosine similarity above which a pair is reported')),
+                ('is_full', models.BooleanField(default=False, help_text='Whether every encoding was compared, rather than only new or changed ones')),
+                ('encodings_checked', models.IntegerField(default=0)),
+                ('pairs_found', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Face Duplicate Audit',
+                'verbose_name_plural': 'Face Duplicate Audits',
+                'db_table': 'face_duplicate_audits',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FaceDuplicateMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(help_text='Cosine similarity of the two encodings')),
+                ('is_reviewed', models.BooleanField(default=False, help_text='Whether an officer has reviewed this pair')),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('audit', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='matches', to='attendance.faceduplicateaudit')),
+                ('cadet_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.cadet')),
+                ('cadet_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.cadet')),
+            ],
+            options={
+                'verbose_name': 'Face Duplicate Match',
+                'verbose_name_plural': 'Face Duplicate Matches',
+                'db_table': 'face_duplicate_matches',
+                'ordering': ['-similarity'],
+                'constraints': [models.UniqueConstraint(fields=('cadet_a', 'cadet_b'), name='unique_face_duplicate_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_face_duplicate_audit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='faceattendancelog',
+            name='captured_at',
+            field=models.DateTimeField(blank=True, help_text='When the capture was taken on the kiosk, as opposed to when the row was written', null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+STATUSES = ('PRESENT', 'ABSENT', 'LATE', 'EXCUSED', 'ON_LEAVE')
+
+
+def populate_stats(apps, schema_editor):
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceSessionStats = apps.get_model('attendance', 'AttendanceSessionStats')
+    annotations = {'total': Count('attendances')}
+    for status in STATUSES:
+        annotations[status.lower()] = Count('attendances', filter=Q(attendances__status=status))
+    rows = AttendanceSession.objects.order_by().values('id').annotate(**annotations)
+    AttendanceSessionStats.objects.bulk_create(
+        [AttendanceSessionStats(session_id=row.pop('id'), **row) for row in rows.iterator()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_faceattendancelog_captured_at_help'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSessionStats',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='attendance.attendancesession')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('on_leave', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Attendance Session Stats',
+                'verbose_name_plural': 'Attendance Session Stats',
+                'db_table': 'attendance_session_stats',
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Q, When
+from django.db.models.functions import ExtractYear
+
+STATUSES = ('PRESENT', 'ABSENT', 'LATE', 'EXCUSED', 'ON_LEAVE')
+
+
+def populate_summaries(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    CadetAttendanceSummary = apps.get_model('attendance', 'CadetAttendanceSummary')
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7)
+    year = Case(
+        When(session__date__month__gte=start_month, then=ExtractYear('session__date')),
+        default=ExtractYear('session__date') - 1,
+        output_field=IntegerField(),
+    )
+    counts = {'total': Count('id')}
+    for status in STATUSES:
+        counts[status.lower()] = Count('id', filter=Q(status=status))
+    rows = Attendance.objects.order_by().values('cadet_id', academic_year=year).annotate(**counts)
+    CadetAttendanceSummary.objects.bulk_create(
+        [CadetAttendanceSummary(**row) for row in rows.iterator()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0006_attendance_session_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CadetAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year in which the academic year starts')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('on_leave', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cadet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='accounts.cadet')),
+            ],
+            options={
+                'verbose_name': 'Cadet Attendance Summary',
+                'verbose_name_plural': 'Cadet Attendance Summaries',
+                'db_table': 'cadet_attendance_summaries',
+                'ordering': ['-academic_year'],
+                'constraints': [models.UniqueConstraint(fields=('cadet', 'academic_year'), name='unique_cadet_attendance_summary')],
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_session_dates(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    Attendance.objects.update(
+        session_date=Subquery(AttendanceSession.objects.filter(pk=OuterRef('session_id')).values('date')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0007_cadet_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='attendance',
+            options={'ordering': ['-session_date']},
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='session_date',
+            field=models.DateField(db_index=True, editable=False, help_text='Copy of session.date so ordering and date filters do not join the sessions table', null=True),
+        ),
+        migrations.RunPython(copy_session_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendance',
+            name='session_date',
+            field=models.DateField(db_index=True, editable=False, help_text='Copy of session.date so ordering and date filters do not join the sessions table'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['cadet', 'status'], name='attendance_cadet_i_2d2b91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['session', 'status'], name='attendance_session_0dca61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['cadet', 'session_date'], name='attendance_cadet_i_493eb6_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0008_attendance_session_date'),
+        ('units', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['unit', 'date', 'start_time'], name='attendance__unit_id_386d73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='faceattendancelog',
+            index=models.Index(fields=['session', 'created_at'], name='face_attend_session_b648e1_idx'),
+        ),
+    ]
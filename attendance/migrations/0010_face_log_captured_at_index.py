@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:53
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_captured_at(apps, schema_editor):
+    # Rows logged before captured_at was always set were written at attempt time
+    FaceAttendanceLog = apps.get_model('attendance', 'FaceAttendanceLog')
+    FaceAttendanceLog.objects.filter(captured_at__isnull=True).update(captured_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('attendance', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='faceattendancelog',
+            name='face_attend_session_b648e1_idx',
+        ),
+        migrations.RunPython(fill_captured_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='faceattendancelog',
+            name='captured_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='When the capture was taken on the kiosk, as opposed to when the row was written', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='faceattendancelog',
+            index=models.Index(fields=['session', 'captured_at'], name='face_attend_session_79b0ec_idx'),
+        ),
+    ]
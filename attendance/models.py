@@ -31,22 +31,20 @@ class AttendanceSession(models.Model):
     class Meta:
         db_table = 'attendance_sessions'
         ordering = ['-date', '-start_time']
+        indexes = [
+            models.Index(fields=['unit', 'date', 'start_time']),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.date}"
     
     def get_attendance_stats(self):
-        total = self.attendances.count()
-        present = self.attendances.filter(status='PRESENT').count()
-        absent = self.attendances.filter(status='ABSENT').count()
-        late = self.attendances.filter(status='LATE').count()
-        return {
-            'total': total,
-            'present': present,
-            'absent': absent,
-            'late': late,
-            'percentage': round((present / total * 100) if total > 0 else 0, 2)
-        }
+        try:
+            stats = self.stats
+        except AttendanceSessionStats.DoesNotExist:
+            from .services import refresh_session_stats
+            stats = refresh_session_stats([self.id])[self.id]
+        return stats.as_dict()
 
 
 class Attendance(models.Model):
@@ -60,6 +58,10 @@ class Attendance(models.Model):
     
     session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE, related_name='attendances')
     cadet = models.ForeignKey('accounts.Cadet', on_delete=models.CASCADE, related_name='attendances')
+    session_date = models.DateField(
+        db_index=True, editable=False,
+        help_text='Copy of session.date so ordering and date filters do not join the sessions table'
+    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ABSENT')
     marked_by = models.ForeignKey('accounts.Officer', on_delete=models.SET_NULL, null=True)
     check_in_time = models.TimeField(blank=True, null=True)
@@ -70,8 +72,87 @@ class Attendance(models.Model):
     class Meta:
         db_table = 'attendance'
         unique_together = ('session', 'cadet')
-        ordering = ['-session__date']
+        ordering = ['-session_date']
+        indexes = [
+            models.Index(fields=['cadet', 'status']),
+            models.Index(fields=['session', 'status']),
+            models.Index(fields=['cadet', 'session_date']),
+        ]
 
     def __str__(self):
         return f"{self.cadet.user.get_full_name()} - {self.session.date} - {self.status}"
+    
+    def save(self, *args, **kwargs):
+        if self.session_date is None:
+            self.session_date = self.session.date
+        super().save(*args, **kwargs)
+
+
+class AttendanceSessionStats(models.Model):
+    """Attendance counts for a session, refreshed whenever its attendance is written"""
+    session = models.OneToOneField(
+        AttendanceSession, on_delete=models.CASCADE, primary_key=True, related_name='stats'
+    )
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    on_leave = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_session_stats'
+        verbose_name = 'Attendance Session Stats'
+        verbose_name_plural = 'Attendance Session Stats'
+
+    def __str__(self):
+        return f"{self.session} - {self.present}/{self.total}"
+
+    @property
+    def percentage(self):
+        return round((self.present / self.total * 100) if self.total > 0 else 0, 2)
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'present': self.present,
+            'absent': self.absent,
+            'late': self.late,
+            'excused': self.excused,
+            'on_leave': self.on_leave,
+            'percentage': self.percentage
+        }
+
+
+class CadetAttendanceSummary(models.Model):
+    """Attendance counts for a cadet in one academic year, refreshed whenever their attendance is written"""
+    cadet = models.ForeignKey('accounts.Cadet', on_delete=models.CASCADE, related_name='attendance_summaries')
+    academic_year = models.PositiveSmallIntegerField(help_text="Calendar year in which the academic year starts")
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    on_leave = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cadet_attendance_summaries'
+        ordering = ['-academic_year']
+        constraints = [
+            models.UniqueConstraint(fields=['cadet', 'academic_year'], name='unique_cadet_attendance_summary'),
+        ]
+        verbose_name = 'Cadet Attendance Summary'
+        verbose_name_plural = 'Cadet Attendance Summaries'
+
+    def __str__(self):
+        return f"{self.cadet} - {self.academic_year_label} - {self.present}/{self.total}"
+
+    @property
+    def academic_year_label(self):
+        return f"{self.academic_year}-{(self.academic_year + 1) % 100:02d}"
 
+    @property
+    def percentage(self):
+        return round((self.present / self.total * 100) if self.total > 0 else 0, 2)
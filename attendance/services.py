@@ -0,0 +1,283 @@
+"""
+Write paths for attendance records shared by the views, face recognition
+and the batch importers.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Q, Sum, When
+from django.db.models.functions import ExtractYear
+
+from .models import Attendance, AttendanceSession, AttendanceSessionStats, CadetAttendanceSummary
+
+# Fields overwritten when a (session, cadet) row already exists. marked_at
+# keeps the time the row was first created.
+UPSERT_FIELDS = ('status', 'check_in_time', 'remarks', 'marked_by', 'updated_at')
+
+STATS_FIELDS = ('total',) + tuple(status.lower() for status, _ in Attendance.STATUS_CHOICES)
+
+
+def upsert_attendance(records, update_fields=UPSERT_FIELDS, batch_size=500):
+    """
+    Insert Attendance rows or update the existing rows for the same session and cadet
+
+    Each batch is a single INSERT ... ON CONFLICT (session_id, cadet_id) DO UPDATE
+    statement, so concurrent writers for the same cadet cannot race between
+    a lookup and the write. The stats of the sessions and the summaries of
+    the cadets written to are refreshed in the same transaction.
+
+    Args:
+        records: Unsaved Attendance instances
+        update_fields: Fields to overwrite on rows that already exist
+        batch_size: Rows per statement
+
+    Returns:
+        list: The Attendance instances passed in
+    """
+    records = list(records)
+    if not records:
+        return records
+    fill_session_dates(records)
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            records,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['session', 'cadet'],
+            update_fields=list(update_fields),
+        )
+        refresh_session_stats({record.session_id for record in records})
+        refresh_cadet_summaries({record.cadet_id for record in records})
+    return records
+
+
+def fill_session_dates(records):
+    """
+    Set session_date on unsaved Attendance rows, which bulk_create() cannot do
+    through save(). Rows with their session loaded need no query; the dates
+    of the other sessions are read with one query.
+    """
+    pending = []
+    for record in records:
+        if record.session_date is not None:
+            continue
+        if Attendance.session.is_cached(record):
+            record.session_date = record.session.date
+        else:
+            pending.append(record)
+    if pending:
+        dates = dict(
+            AttendanceSession.objects.filter(id__in={record.session_id for record in pending}).values_list('id', 'date')
+        )
+        for record in pending:
+            record.session_date = dates.get(record.session_id)
+
+
+def session_stats_annotations(prefix='attendances'):
+    """Conditional counts per status over the attendance rows reached through ``prefix``"""
+    annotations = {'total': Count(prefix)}
+    for status, _ in Attendance.STATUS_CHOICES:
+        annotations[status.lower()] = Count(prefix, filter=Q(**{f'{prefix}__status': status}))
+    return annotations
+
+
+def lock_rows(model, ids):
+    """
+    Lock rows until the end of the current transaction so recounts serialize
+
+    Uses SELECT ... FOR NO KEY UPDATE, which does not conflict with the key
+    share locks taken by inserting attendance rows that reference them.
+    SQLite has no row locks; its database write lock already serializes
+    writers, so nothing is issued there.
+    """
+    if connection.features.has_select_for_update:
+        list(model.objects.select_for_update(no_key=True).filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+
+
+def refresh_session_stats(session_ids):
+    """
+    Recount attendance for the given sessions and store the results
+
+    One grouped query counts every status for all the sessions and one
+    upsert stores them, so the cost depends on the number of sessions
+    written to rather than on how often they are read.
+
+    Every write recounts its sessions rather than applying a delta, so the
+    stored counts cannot drift from the rows. The sessions are locked first:
+    at READ COMMITTED, two writers would otherwise each count without the
+    other's uncommitted rows and the last one would store stale counts. The
+    recount is a few queries on each face match, pinned by a test.
+
+    Returns:
+        dict: AttendanceSessionStats keyed by session id, for sessions that exist
+    """
+    session_ids = set(session_ids)
+    if not session_ids:
+        return {}
+    with transaction.atomic(savepoint=False):
+        lock_rows(AttendanceSession, session_ids)
+        rows = AttendanceSession.objects.filter(id__in=session_ids).order_by().values('id').annotate(
+            **session_stats_annotations()
+        )
+        stats = {
+            row['id']: AttendanceSessionStats(session_id=row['id'], **{field: row[field] for field in STATS_FIELDS})
+            for row in rows
+        }
+        AttendanceSessionStats.objects.bulk_create(
+            stats.values(),
+            update_conflicts=True,
+            unique_fields=['session'],
+            update_fields=list(STATS_FIELDS) + ['updated_at'],
+        )
+    return stats
+
+
+def academic_year_of(date):
+    """Return the calendar year in which the academic year containing ``date`` starts"""
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7)
+    return date.year if date.month >= start_month else date.year - 1
+
+
+def academic_year_expression(field='session_date'):
+    """Database expression computing academic_year_of() for a date field"""
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7)
+    return Case(
+        When(**{f'{field}__month__gte': start_month}, then=ExtractYear(field)),
+        default=ExtractYear(field) - 1,
+        output_field=IntegerField(),
+    )
+
+
+def _summary_rows(attendances):
+    """Group attendance rows by cadet and academic year with a count per status"""
+    counts = {'total': Count('id')}
+    for status, _ in Attendance.STATUS_CHOICES:
+        counts[status.lower()] = Count('id', filter=Q(status=status))
+    return attendances.order_by().values('cadet_id', year=academic_year_expression()).annotate(**counts)
+
+
+def _store_summaries(attendances, cadet_ids=None):
+    """Replace summaries with the counts grouped from ``attendances``"""
+    summaries = [
+        CadetAttendanceSummary(
+            cadet_id=row['cadet_id'],
+            academic_year=row['year'],
+            **{field: row[field] for field in STATS_FIELDS}
+        )
+        for row in _summary_rows(attendances)
+    ]
+    # Years that no longer have attendance (e.g. after deletes) lose their row
+    existing = CadetAttendanceSummary.objects.all()
+    if cadet_ids is not None:
+        existing = existing.filter(cadet_id__in=cadet_ids)
+    kept = {(summary.cadet_id, summary.academic_year) for summary in summaries}
+    stale = [
+        summary_id for summary_id, cadet_id, academic_year
+        in existing.values_list('id', 'cadet_id', 'academic_year')
+        if (cadet_id, academic_year) not in kept
+    ]
+    if stale:
+        CadetAttendanceSummary.objects.filter(id__in=stale).delete()
+    CadetAttendanceSummary.objects.bulk_create(
+        summaries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['cadet', 'academic_year'],
+        update_fields=list(STATS_FIELDS) + ['updated_at'],
+    )
+    return summaries
+
+
+def refresh_cadet_summaries(cadet_ids):
+    """
+    Recount the per academic year attendance summaries of the given cadets
+
+    Like refresh_session_stats(), the cadets' whole history is regrouped
+    rather than applying a delta, and the cadet rows are locked first so
+    that concurrent writers cannot store summaries missing each other's rows.
+
+    Returns:
+        list: The CadetAttendanceSummary rows stored for those cadets
+    """
+    from accounts.models import Cadet
+
+    cadet_ids = set(cadet_ids)
+    if not cadet_ids:
+        return []
+    with transaction.atomic():
+        lock_rows(Cadet, cadet_ids)
+        return _store_summaries(Attendance.objects.filter(cadet_id__in=cadet_ids), cadet_ids)
+
+
+def rebuild_cadet_summaries():
+    """Rebuild every cadet summary from a single GROUP BY over all attendance"""
+    with transaction.atomic():
+        return _store_summaries(Attendance.objects.all())
+
+
+def cadet_attendance_totals(cadet, academic_year=None):
+    """
+    Return attendance counts and percentage for a cadet from their summaries
+
+    Args:
+        cadet: Cadet instance or id
+        academic_year: Only count this academic year (start year); all years when None
+    """
+    summaries = CadetAttendanceSummary.objects.filter(cadet=cadet)
+    if academic_year is not None:
+        summaries = summaries.filter(academic_year=academic_year)
+    totals = summaries.aggregate(**{field: Sum(field) for field in STATS_FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+    totals['percentage'] = round((totals['present'] / totals['total'] * 100) if totals['total'] > 0 else 0, 2)
+    return totals
+
+
+CLOSE_REMARKS = 'Not marked before the session was closed'
+
+
+def close_session(session, marked_by=None, batch_size=2000):
+    """
+    Close a session and record every unit cadet without attendance as absent
+
+    Closing stops kiosk marking; officers can still correct records by hand.
+    The absent rows are inserted with ON CONFLICT DO NOTHING, so a cadet
+    marked concurrently keeps their status and closing the same session
+    twice, even at the same time, never duplicates or overwrites a row.
+
+    Args:
+        session: AttendanceSession to close
+        marked_by: Officer closing the session, or None when scheduled
+        batch_size: Rows per INSERT statement
+
+    Returns:
+        int: Number of absent rows this call inserted
+    """
+    from accounts.models import Cadet
+
+    with transaction.atomic():
+        AttendanceSession.objects.filter(pk=session.pk).update(is_active=False)
+        session.is_active = False
+        missing = list(
+            Cadet.objects.filter(unit_id=session.unit_id)
+            .exclude(id__in=Attendance.objects.filter(session_id=session.pk).values('cadet_id'))
+            .values_list('id', flat=True)
+        )
+        if not missing:
+            return 0
+        # Rows skipped as conflicts are not counted: only the closing rows
+        # that did not exist before the inserts are this call's
+        closed = Attendance.objects.filter(session_id=session.pk, status='ABSENT', remarks=CLOSE_REMARKS)
+        already_closed = closed.count()
+        for start in range(0, len(missing), batch_size):
+            Attendance.objects.bulk_create(
+                [
+                    Attendance(session_id=session.pk, session_date=session.date, cadet_id=cadet_id,
+                               status='ABSENT', remarks=CLOSE_REMARKS, marked_by=marked_by)
+                    for cadet_id in missing[start:start + batch_size]
+                ],
+                ignore_conflicts=True,
+            )
+        inserted = closed.count() - already_closed
+        if inserted:
+            refresh_session_stats([session.pk])
+            refresh_cadet_summaries(missing)
+    return inserted
@@ -0,0 +1,103 @@
+"""
+Keep AttendanceSessionStats and CadetAttendanceSummary in step with
+single-row attendance writes, and Attendance.session_date in step with
+the session's date, and the cached unit face galleries in step with
+face encodings.
+
+Bulk writes go through attendance.services, which refreshes both itself;
+these receivers cover save() and delete() calls such as the ones made by
+the admin, and deletions that cascade from sessions and cadets.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import Cadet
+from .face_recognition.models import FaceEncoding
+from .models import Attendance, AttendanceSession
+from .services import refresh_cadet_summaries, refresh_session_stats
+
+# Sessions and cadets being deleted in this thread; their attendance rows
+# cascade with them and their own stats rows are deleted too
+_deleting = threading.local()
+
+
+def _deleting_ids(model):
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = defaultdict(set)
+    return _deleting.ids[model]
+
+
+@receiver(post_save, sender=AttendanceSession)
+def sync_session_date(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    attendances = Attendance.objects.filter(session=instance).exclude(session_date=instance.date)
+    cadet_ids = list(attendances.values_list('cadet_id', flat=True))
+    if cadet_ids:
+        # Touching updated_at also moves the unit's analytics cache key on
+        Attendance.objects.filter(session=instance).update(session_date=instance.date, updated_at=timezone.now())
+        # Moving a session can move its attendance into another academic year
+        refresh_cadet_summaries(cadet_ids)
+
+
+@receiver(pre_delete, sender=AttendanceSession)
+def mark_session_deleting(sender, instance, **kwargs):
+    _deleting_ids(AttendanceSession).add(instance.pk)
+    # The cadets' summaries are recounted once the session is gone
+    instance._attendance_cadet_ids = list(instance.attendances.values_list('cadet_id', flat=True))
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def clear_session_deleting(sender, instance, **kwargs):
+    _deleting_ids(AttendanceSession).discard(instance.pk)
+    refresh_cadet_summaries(set(getattr(instance, '_attendance_cadet_ids', ())) - _deleting_ids(Cadet))
+
+
+@receiver(pre_delete, sender=Cadet)
+def mark_cadet_deleting(sender, instance, **kwargs):
+    _deleting_ids(Cadet).add(instance.pk)
+
+
+@receiver(post_delete, sender=Cadet)
+def clear_cadet_deleting(sender, instance, **kwargs):
+    _deleting_ids(Cadet).discard(instance.pk)
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_session_stats([instance.session_id])
+    refresh_cadet_summaries([instance.cadet_id])
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_stats_on_delete(sender, instance, **kwargs):
+    if instance.session_id in _deleting_ids(AttendanceSession):
+        # Summaries are recounted once when the session delete finishes
+        return
+    refresh_session_stats([instance.session_id])
+    if instance.cadet_id not in _deleting_ids(Cadet):
+        refresh_cadet_summaries([instance.cadet_id])
+
+
+@receiver(post_save, sender=FaceEncoding)
+def invalidate_gallery_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Imported here so that startup does not load numpy and OpenCV
+    from .face_recognition.gallery_cache import get_gallery_cache
+    cadet_id, unit_id = instance.cadet_id, instance.cadet.unit_id
+    transaction.on_commit(lambda: get_gallery_cache().invalidate(cadet_id, unit_id))
+
+
+@receiver(post_delete, sender=FaceEncoding)
+def invalidate_gallery_on_delete(sender, instance, **kwargs):
+    from .face_recognition.gallery_cache import get_gallery_cache
+    cadet_id = instance.cadet_id
+    transaction.on_commit(lambda: get_gallery_cache().invalidate(cadet_id))
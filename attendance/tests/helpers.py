@@ -0,0 +1,80 @@
+"""Small factories shared by the attendance tests"""
+import datetime
+import functools
+
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import User, Cadet, Officer
+from units.models import Unit
+from attendance.models import AttendanceSession
+
+
+def make_unit(code='UNIT1'):
+    return Unit.objects.create(
+        name=f'Unit {code}',
+        wing='ARMY',
+        unit_code=code,
+        location='Test Location',
+        contact_email=f'{code.lower()}@example.com',
+        contact_phone='1234567890'
+    )
+
+
+def make_officer(unit, username='officer'):
+    user = User.objects.create_user(
+        username=username,
+        password='testpass123',
+        first_name='Test',
+        last_name='Officer',
+        role='OFFICER'
+    )
+    return Officer.objects.create(
+        user=user,
+        rank='LT',
+        unit=unit,
+        employee_id=f'EMP-{username}',
+        joining_date='2020-01-01'
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _password_hash():
+    # Hashing once keeps fixtures with hundreds of cadets fast
+    return make_password('testpass123')
+
+
+def make_cadet(unit, enrollment_number):
+    user = User.objects.create(
+        username=enrollment_number.lower(),
+        password=_password_hash(),
+        first_name='Cadet',
+        last_name=enrollment_number,
+        role='CADET'
+    )
+    return Cadet.objects.create(
+        user=user,
+        unit=unit,
+        enrollment_number=enrollment_number,
+        enrollment_date='2023-01-01',
+        college_name='Test College',
+        course='B.Tech',
+        year_of_study=2,
+        roll_number=enrollment_number,
+        parent_name='Parent Name',
+        parent_phone='1234567890',
+        emergency_contact='0987654321'
+    )
+
+
+def make_session(unit, officer=None, date=None, **kwargs):
+    return AttendanceSession.objects.create(
+        title=kwargs.pop('title', 'Morning Parade'),
+        session_type=kwargs.pop('session_type', 'DAILY'),
+        date=date or datetime.date.today(),
+        start_time=kwargs.pop('start_time', datetime.time(7, 0)),
+        end_time=kwargs.pop('end_time', datetime.time(9, 0)),
+        unit=unit,
+        created_by=officer,
+        location='Parade Ground',
+        **kwargs
+    )
@@ -0,0 +1,89 @@
+import csv
+import datetime
+import io
+import sys
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from attendance.exports import EXPORT_COLUMNS, export_rows, xlsx_value
+from attendance.models import Attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class AttendanceExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadets = [make_cadet(cls.unit, f'NCC{i:03d}') for i in range(3)]
+        cls.first = make_session(cls.unit, cls.officer, date=datetime.date(2024, 1, 1))
+        cls.second = make_session(cls.unit, cls.officer, date=datetime.date(2024, 2, 1))
+        for session in (cls.first, cls.second):
+            for cadet in cls.cadets:
+                Attendance.objects.create(session=session, cadet=cadet, status='PRESENT', remarks='ok, on time')
+        other_unit = make_unit('UNIT2')
+        Attendance.objects.create(
+            session=make_session(other_unit, date=datetime.date(2024, 1, 1)),
+            cadet=make_cadet(other_unit, 'OTHER001'), status='ABSENT'
+        )
+
+    def _download(self, **params):
+        response = self.client.get(reverse('attendance_export'), {'format': 'csv', **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_rows_are_read_with_one_query(self):
+        with self.assertNumQueries(1):
+            rows = list(export_rows(unit=self.unit))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(rows[0]), len(EXPORT_COLUMNS))
+        self.assertEqual(rows[0][5], 'NCC000')
+
+    def test_csv_filters(self):
+        self.client.login(username='officer', password='testpass123')
+        rows = self._download(sessions=self.second.id)
+        self.assertEqual(rows[0], [header for header, _ in EXPORT_COLUMNS])
+        self.assertEqual([row[5] for row in rows[1:]], ['NCC000', 'NCC001', 'NCC002'])
+        self.assertEqual(rows[1][10], 'ok, on time')
+
+        rows = self._download(date_from='2024-01-15')
+        self.assertEqual({row[0] for row in rows[1:]}, {'2024-02-01'})
+
+    def test_officer_only_exports_own_unit(self):
+        self.client.login(username='officer', password='testpass123')
+        rows = self._download()
+        self.assertEqual(len(rows), 7)
+        self.assertNotIn('OTHER001', {row[5] for row in rows})
+
+    def test_invalid_date_range_shows_form(self):
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('attendance_export'), {
+            'format': 'csv', 'date_from': '2024-02-01', 'date_to': '2024-01-01'
+        })
+        self.assertContains(response, 'The start date must be on or before the end date.')
+
+    def test_xlsx_without_openpyxl(self):
+        self.client.login(username='officer', password='testpass123')
+        with mock.patch.dict(sys.modules, {'openpyxl': None}):
+            response = self.client.get(reverse('attendance_export'), {'format': 'xlsx'})
+        self.assertContains(response, 'XLSX export requires the openpyxl package')
+
+    def test_xlsx_values_are_local_time(self):
+        marked_at = datetime.datetime(2024, 1, 1, 2, 0, tzinfo=datetime.timezone.utc)
+        # TIME_ZONE is Asia/Kolkata, UTC+5:30, as shown in the UI and the CSV
+        self.assertEqual(xlsx_value(marked_at), datetime.datetime(2024, 1, 1, 7, 30))
+        self.assertEqual(xlsx_value(datetime.date(2024, 1, 1)), datetime.date(2024, 1, 1))
+        self.assertEqual(xlsx_value('Present'), 'Present')
+
+    def test_xlsx(self):
+        try:
+            import openpyxl
+        except ImportError:
+            self.skipTest('openpyxl is not installed')
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('attendance_export'), {'format': 'xlsx'})
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.active.max_row, 7)
@@ -0,0 +1,115 @@
+import datetime
+import io
+import os
+import tempfile
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.imports import AttendanceImportError, import_attendance_csv
+from attendance.models import Attendance, AttendanceSessionStats
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class AttendanceImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadets = [make_cadet(cls.unit, f'NCC{i:03d}') for i in range(4)]
+        cls.session = make_session(cls.unit, cls.officer, date=datetime.date(2024, 1, 1))
+        cls.camp = make_session(cls.unit, cls.officer, date=datetime.date(2024, 1, 2), session_type='CAMP')
+        other_unit = make_unit('UNIT2')
+        cls.outsider = make_cadet(other_unit, 'OTHER001')
+        cls.other_session = make_session(other_unit, date=datetime.date(2024, 1, 1))
+
+    def _import(self, text, **kwargs):
+        return import_attendance_csv(io.StringIO(text), **kwargs)
+
+    def _statuses(self, session):
+        return dict(Attendance.objects.filter(session=session).values_list('cadet__enrollment_number', 'status'))
+
+    def test_imports_rows_and_reports_errors(self):
+        s, c = self.session.id, self.camp.id
+        result = self._import(
+            'Enrollment Number,Session ID,Status,Remarks,Check-in Time\n'
+            f'ncc000,{s},present,,07:05\n'
+            f'NCC001,{s},On Leave,sick,\n'
+            f'NCC002,{s},MAYBE,,\n'
+            f'NCC404,{s},ABSENT,,\n'
+            f'OTHER001,{s},ABSENT,,\n'
+            f'NCC003,999999,ABSENT,,\n'
+            f'NCC000,{c},LATE,,7 am\n',
+            chunk_size=3
+        )
+        self.assertEqual((result.rows, result.imported), (7, 2))
+        self.assertEqual([line for line, _ in result.errors], [4, 5, 6, 7, 8])
+        self.assertIn('Invalid status "MAYBE"', result.errors[0][1])
+        self.assertIn('not in the unit', result.errors[2][1])
+        self.assertIn('Invalid check-in time "7 am"', result.errors[4][1])
+        self.assertEqual(self._statuses(self.session), {'NCC000': 'PRESENT', 'NCC001': 'ON_LEAVE'})
+        self.assertEqual(
+            Attendance.objects.get(session=self.session, cadet=self.cadets[0]).check_in_time, datetime.time(7, 5)
+        )
+        self.assertEqual(AttendanceSessionStats.objects.get(session=self.session).total, 2)
+
+    def test_duplicate_rows_are_reported(self):
+        s = self.session.id
+        result = self._import(
+            'enrollment_number,session_id,status\n'
+            f'NCC000,{s},ABSENT\n'
+            f'NCC001,{s},PRESENT\n'
+            f'NCC000,{s},LATE\n'
+        )
+        self.assertEqual((result.rows, result.imported, result.skipped), (3, 2, 1))
+        self.assertEqual(result.errors, [(2, 'Duplicate row for session/cadet; later row kept')])
+        self.assertEqual(self._statuses(self.session)['NCC000'], 'LATE')
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries_for(cadets):
+            Attendance.objects.all().delete()
+            text = 'enrollment_number,status\n' + ''.join(f'{cadet.enrollment_number},PRESENT\n' for cadet in cadets)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._import(text, session=self.session).imported, len(cadets))
+            return len(queries)
+
+        self.assertEqual(queries_for(self.cadets[:1]), queries_for(self.cadets))
+
+    def test_reimport_updates_without_clearing_missing_columns(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='ABSENT', remarks='keep me')
+        self._import('enrollment_number,status\nNCC000,PRESENT\n', session=self.session)
+        attendance = Attendance.objects.get(session=self.session, cadet=self.cadets[0])
+        self.assertEqual((attendance.status, attendance.remarks), ('PRESENT', 'keep me'))
+
+    def test_unit_restricts_sessions(self):
+        result = self._import(f'enrollment_number,session_id,status\nOTHER001,{self.other_session.id},PRESENT\n', unit=self.unit)
+        self.assertEqual(result.imported, 0)
+        self.assertIn(f'Session {self.other_session.id} not found', result.errors[0][1])
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(AttendanceImportError, 'session_id'):
+            self._import('enrollment_number,status\nNCC000,PRESENT\n')
+        with self.assertRaisesMessage(AttendanceImportError, 'empty'):
+            self._import('')
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('enrollment_number,status\nNCC000,PRESENT\nNCC001,bogus\n')
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+        call_command('import_attendance', handle.name, session=self.session.id, stdout=out)
+        self.assertIn('Line 3: Invalid status', out.getvalue())
+        self.assertIn('Imported 1 out of 2 rows (1 skipped)', out.getvalue())
+
+    def test_upload_form(self):
+        self.client.login(username='officer', password='testpass123')
+        upload = SimpleUploadedFile('camp.csv', b'\xef\xbb\xbfenrollment_number,status\nNCC000,PRESENT\nNCC404,ABSENT\n')
+        response = self.client.post(reverse('attendance_import'), {'file': upload, 'session': self.camp.id})
+        self.assertContains(response, 'Imported 1 out of 2 rows.')
+        self.assertContains(response, 'Cadet NCC404 not found')
+        self.assertEqual(Attendance.objects.get(session=self.camp).marked_by, self.officer)
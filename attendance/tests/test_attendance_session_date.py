@@ -0,0 +1,85 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from attendance.models import Attendance, CadetAttendanceSummary
+from attendance.services import upsert_attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+@override_settings(ACADEMIC_YEAR_START_MONTH=7)
+class AttendanceSessionDateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadet = make_cadet(cls.unit, 'NCC001')
+        cls.session = make_session(cls.unit, cls.officer, date=datetime.date(2024, 6, 30))
+
+    def test_set_on_save_and_bulk_upsert(self):
+        attendance = Attendance.objects.create(session=self.session, cadet=self.cadet, status='PRESENT')
+        self.assertEqual(attendance.session_date, datetime.date(2024, 6, 30))
+
+        other = make_session(self.unit, date=datetime.date(2024, 8, 1))
+        upsert_attendance([Attendance(session_id=other.id, cadet=self.cadet, status='ABSENT')])
+        self.assertEqual(Attendance.objects.get(session=other).session_date, datetime.date(2024, 8, 1))
+
+    def test_follows_session_date_changes(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadet, status='PRESENT')
+        self.assertEqual(CadetAttendanceSummary.objects.get(cadet=self.cadet).academic_year, 2023)
+
+        self.session.date = datetime.date(2024, 7, 2)
+        self.session.save()
+        self.assertEqual(Attendance.objects.get().session_date, datetime.date(2024, 7, 2))
+        self.assertEqual(CadetAttendanceSummary.objects.get(cadet=self.cadet).academic_year, 2024)
+
+    def test_default_ordering_does_not_join_sessions(self):
+        sql = str(Attendance.objects.filter(cadet=self.cadet).query)
+        self.assertNotIn('attendance_sessions', sql)
+        self.assertIn('ORDER BY "attendance"."session_date" DESC', sql)
+
+
+class AttendanceIndexPlanTests(TestCase):
+    """The dashboard and stats counts are answered from the composite indexes alone"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.cadet = make_cadet(cls.unit, 'NCC001')
+        cls.session = make_session(cls.unit, date=datetime.date(2024, 1, 1))
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked against SQLite')
+
+    def _plan(self, queryset):
+        # count() has no explain(); capture its SQL and ask SQLite for the plan
+        with CaptureQueriesContext(connection) as queries:
+            queryset.count()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries[-1]['sql'])
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertCoveringIndex(self, queryset, columns):
+        plan = self._plan(queryset)
+        self.assertIn('USING COVERING INDEX', plan)
+        self.assertIn(columns, plan)
+        self.assertNotIn('attendance_sessions', plan)
+
+    def test_cadet_status_count(self):
+        self.assertCoveringIndex(
+            Attendance.objects.filter(cadet=self.cadet, status='PRESENT'), '(cadet_id=? AND status=?)'
+        )
+
+    def test_session_status_count(self):
+        self.assertCoveringIndex(
+            Attendance.objects.filter(session=self.session, status='ABSENT'), '(session_id=? AND status=?)'
+        )
+
+    def test_cadet_date_range_count(self):
+        self.assertCoveringIndex(
+            Attendance.objects.filter(cadet=self.cadet, session_date__gte=datetime.date(2024, 1, 1)),
+            '(cadet_id=? AND session_date>?)'
+        )
@@ -0,0 +1,59 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from attendance.models import Attendance
+from attendance.services import upsert_attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class AttendanceUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(3)]
+
+    def _record(self, cadet, status, check_in_time=None, remarks=''):
+        return Attendance(
+            session=self.session, cadet=cadet, status=status,
+            check_in_time=check_in_time, remarks=remarks, marked_by=self.officer
+        )
+
+    def test_inserts_and_updates_in_one_statement(self):
+        existing = Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='ABSENT')
+
+        with CaptureQueriesContext(connection) as queries:
+            upsert_attendance([
+                self._record(cadet, 'PRESENT', datetime.time(7, 5), 'Marked via face recognition')
+                for cadet in self.cadets
+            ])
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "attendance"')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('ON CONFLICT', writes[0])
+
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 3)
+        updated = Attendance.objects.get(pk=existing.pk)
+        self.assertEqual(updated.status, 'PRESENT')
+        self.assertEqual(updated.check_in_time, datetime.time(7, 5))
+        self.assertEqual(updated.marked_at, existing.marked_at)
+
+    def test_update_fields_limit_what_is_overwritten(self):
+        Attendance.objects.create(
+            session=self.session, cadet=self.cadets[0], status='PRESENT', check_in_time=datetime.time(7, 0)
+        )
+        upsert_attendance(
+            [self._record(self.cadets[0], 'LATE', remarks='Arrived after roll call')],
+            update_fields=('status', 'remarks', 'marked_by', 'updated_at')
+        )
+        attendance = Attendance.objects.get(session=self.session, cadet=self.cadets[0])
+        self.assertEqual(attendance.status, 'LATE')
+        self.assertEqual(attendance.check_in_time, datetime.time(7, 0))
+        self.assertEqual(attendance.remarks, 'Arrived after roll call')
+
+    def test_empty_input_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(upsert_attendance([]), [])
@@ -0,0 +1,97 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Cadet
+from attendance import services
+from attendance.models import Attendance, CadetAttendanceSummary
+from attendance.services import academic_year_of, cadet_attendance_totals, upsert_attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+@override_settings(ACADEMIC_YEAR_START_MONTH=7)
+class CadetAttendanceSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadet = make_cadet(cls.unit, 'NCC001')
+        # The last day of one academic year and the first day of the next
+        cls.june = make_session(cls.unit, cls.officer, date=datetime.date(2024, 6, 30))
+        cls.july = make_session(cls.unit, cls.officer, date=datetime.date(2024, 7, 1))
+        cls.august = make_session(cls.unit, cls.officer, date=datetime.date(2024, 8, 1))
+
+    def _summaries(self):
+        return {
+            summary.academic_year: (summary.total, summary.present)
+            for summary in CadetAttendanceSummary.objects.filter(cadet=self.cadet)
+        }
+
+    def test_academic_year_of(self):
+        self.assertEqual(academic_year_of(datetime.date(2024, 6, 30)), 2023)
+        self.assertEqual(academic_year_of(datetime.date(2024, 7, 1)), 2024)
+
+    def test_upsert_updates_summaries_per_academic_year(self):
+        upsert_attendance([
+            Attendance(session=self.june, cadet=self.cadet, status='PRESENT'),
+            Attendance(session=self.july, cadet=self.cadet, status='ABSENT'),
+            Attendance(session=self.august, cadet=self.cadet, status='PRESENT'),
+        ])
+        self.assertEqual(self._summaries(), {2023: (1, 1), 2024: (2, 1)})
+
+        totals = cadet_attendance_totals(self.cadet)
+        self.assertEqual((totals['total'], totals['present'], totals['absent']), (3, 2, 1))
+        self.assertEqual(totals['percentage'], 66.67)
+        self.assertEqual(cadet_attendance_totals(self.cadet, academic_year=2024)['percentage'], 50.0)
+
+    def test_single_row_writes_and_session_deletes_update_summaries(self):
+        attendance = Attendance.objects.create(session=self.june, cadet=self.cadet, status='LATE')
+        Attendance.objects.create(session=self.july, cadet=self.cadet, status='PRESENT')
+        self.assertEqual(self._summaries(), {2023: (1, 0), 2024: (1, 1)})
+
+        attendance.status = 'PRESENT'
+        attendance.save()
+        self.assertEqual(self._summaries()[2023], (1, 1))
+
+        # A year with no attendance left loses its row
+        attendance.delete()
+        self.assertEqual(self._summaries(), {2024: (1, 1)})
+        self.july.delete()
+        self.assertEqual(self._summaries(), {})
+
+    def test_writers_lock_the_cadet_and_session_before_recounting(self):
+        with mock.patch.object(services, 'lock_rows') as lock_rows:
+            upsert_attendance([Attendance(session=self.july, cadet=self.cadet, status='PRESENT')])
+        lock_rows.assert_any_call(Cadet, {self.cadet.id})
+        lock_rows.assert_any_call(services.AttendanceSession, {self.july.id})
+
+    def test_deleting_a_cadet_removes_summaries(self):
+        Attendance.objects.create(session=self.july, cadet=self.cadet, status='PRESENT')
+        self.cadet.user.delete()
+        self.assertFalse(CadetAttendanceSummary.objects.exists())
+
+    def test_rebuild_command_reconciles(self):
+        Attendance.objects.create(session=self.july, cadet=self.cadet, status='PRESENT')
+        CadetAttendanceSummary.objects.update(present=5, total=5)
+        CadetAttendanceSummary.objects.create(cadet=self.cadet, academic_year=2010, total=1)
+        out = StringIO()
+        call_command('rebuild_cadet_summaries', stdout=out)
+        self.assertIn('1 were missing or out of date, 1 removed', out.getvalue())
+        self.assertEqual(self._summaries(), {2024: (1, 1)})
+
+    def test_cadet_views_read_summaries(self):
+        Attendance.objects.create(session=self.july, cadet=self.cadet, status='PRESENT')
+        Attendance.objects.create(session=self.august, cadet=self.cadet, status='ABSENT')
+        self.client.login(username='ncc001', password='testpass123')
+
+        response = self.client.get(reverse('cadet_attendance'))
+        self.assertEqual(response.context['statistics']['percentage'], 50.0)
+        self.assertEqual(response.context['statistics']['absent'], 1)
+
+        response = self.client.get(reverse('cadet_dashboard'))
+        self.assertEqual(response.context['total_sessions'], 2)
+        self.assertEqual(response.context['present_count'], 1)
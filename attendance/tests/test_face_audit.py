@@ -0,0 +1,79 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from attendance.face_recognition.audit import iter_similar_pairs, run_duplicate_audit
+from attendance.face_recognition.models import FaceDuplicateMatch, FaceEncoding
+from .helpers import make_cadet, make_officer, make_unit
+
+
+class SimilarPairTilingTests(SimpleTestCase):
+    def test_tiled_pairs_match_dense_computation(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(50, 16))
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        dense = matrix @ matrix.T
+        expected = {(int(i), int(j)) for i, j in zip(*np.nonzero(dense >= 0.3))}
+
+        found = {(i, j) for i, j, _ in iter_similar_pairs(matrix, matrix, 0.3, block_size=7)}
+        self.assertEqual(found, expected)
+
+
+class DuplicateAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(4)]
+
+    def _register(self, cadet, vector):
+        encoding = FaceEncoding.objects.filter(cadet=cadet).first() or FaceEncoding(cadet=cadet)
+        encoding.set_encoding(np.asarray(vector, dtype=float))
+        encoding.save()
+
+    def _pairs(self):
+        return set(FaceDuplicateMatch.objects.values_list('cadet_a', 'cadet_b'))
+
+    def test_incremental_audit_only_rechecks_changed_encodings(self):
+        a, b, c, d = self.cadets
+        self._register(a, [1, 0, 0])
+        self._register(b, [0.99, 0.05, 0])
+        self._register(c, [0, 1, 0])
+
+        audit = run_duplicate_audit(threshold=0.9)
+        self.assertTrue(audit.is_full)
+        self.assertEqual(self._pairs(), {(a.id, b.id)})
+
+        # A new registration is compared against the whole gallery
+        self._register(d, [0, 0.98, 0.1])
+        audit = run_duplicate_audit(threshold=0.9)
+        self.assertFalse(audit.is_full)
+        self.assertEqual(audit.encodings_checked, 1)
+        self.assertEqual(self._pairs(), {(a.id, b.id), (c.id, d.id)})
+
+        # Re-registering with a different face clears the stale pair
+        self._register(b, [0, 0, 1])
+        run_duplicate_audit(threshold=0.9)
+        self.assertEqual(self._pairs(), {(c.id, d.id)})
+
+    def test_full_audit_keeps_reviews_of_unchanged_pairs(self):
+        a, b, c, d = self.cadets
+        self._register(a, [1, 0, 0])
+        self._register(b, [0.99, 0.05, 0])
+        self._register(c, [0, 1, 0])
+        self._register(d, [0, 0.98, 0.1])
+        run_duplicate_audit(threshold=0.9)
+        FaceDuplicateMatch.objects.update(is_reviewed=True)
+
+        # Re-registering a face asks for a new review of its pairs
+        self._register(d, [0, 0.99, 0.05])
+        run_duplicate_audit(threshold=0.9, full=True)
+        self.assertEqual(
+            set(FaceDuplicateMatch.objects.values_list('cadet_a', 'cadet_b', 'is_reviewed')),
+            {(a.id, b.id, True), (c.id, d.id, False)}
+        )
+
+    def test_review_view_rejects_invalid_match_id(self):
+        make_officer(self.unit)
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.post(reverse('face_duplicates'), {'match_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,124 @@
+import datetime
+import io
+import zipfile
+from unittest import mock
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils import timezone
+
+from attendance.face_recognition import batch
+from attendance.face_recognition.batch import Capture, process_capture_batch
+from attendance.face_recognition.models import FaceAttendanceLog, FaceEncoding
+from attendance.models import Attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+def _capture(name, captured_at, capture_id=None):
+    upload = SimpleUploadedFile(name, name.encode())
+    return Capture(name, batch._uploaded_file_opener(upload), capture_id=capture_id, captured_at=captured_at)
+
+
+class CaptureBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(3)]
+        cls.vectors = np.eye(3, 8)
+        for cadet, vector in zip(cls.cadets, cls.vectors):
+            encoding = FaceEncoding(cadet=cadet)
+            encoding.set_encoding(vector)
+            encoding.save()
+
+    def setUp(self):
+        # Each fake image's bytes name the gallery row it should match; 'none' has no face
+        def fake_preprocess(stream):
+            return stream.read().decode()
+
+        def fake_detect(name):
+            return ([] if name.startswith('none') else [(0, 1, 1, 0)]), name
+
+        def fake_encode(name, locations):
+            return [self.vectors[int(name.split('-')[1][0])]]
+
+        patches = [
+            mock.patch.object(batch, 'preprocess_image', fake_preprocess),
+            mock.patch.object(batch, 'detect_faces', fake_detect),
+            mock.patch.object(batch, 'get_face_encodings', fake_encode),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_batch_marks_earliest_capture_and_is_idempotent(self):
+        base = timezone.make_aware(datetime.datetime.combine(self.session.date, datetime.time(7, 30)))
+        captures = [
+            _capture('face-0a.jpg', base + datetime.timedelta(minutes=5)),
+            _capture('face-0b.jpg', base),
+            _capture('face-1.jpg', base + datetime.timedelta(minutes=1)),
+            _capture('none.jpg', base),
+        ]
+
+        results = process_capture_batch(self.session, captures, marked_by=self.officer)
+
+        self.assertEqual([r['status'] for r in results], ['SUCCESS', 'SUCCESS', 'SUCCESS', 'NONE'])
+        attendance = Attendance.objects.get(session=self.session, cadet=self.cadets[0])
+        self.assertEqual(attendance.status, 'PRESENT')
+        self.assertEqual(attendance.check_in_time, timezone.localtime(base).time())
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 2)
+        self.assertEqual(FaceAttendanceLog.objects.filter(session=self.session).count(), 4)
+
+        # Retrying the same upload replays the earlier results without new writes
+        retry = [_capture(c.name, c.captured_at) for c in captures]
+        replayed = process_capture_batch(self.session, retry, marked_by=self.officer)
+        self.assertTrue(all(r['replayed'] for r in replayed))
+        self.assertEqual([r['status'] for r in replayed], [r['status'] for r in results])
+        self.assertEqual(FaceAttendanceLog.objects.filter(session=self.session).count(), 4)
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 2)
+
+
+    def _archive(self, names, corrupt=None):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_file:
+            for name in names:
+                zip_file.writestr(name, name.encode())
+        data = bytearray(buffer.getvalue())
+        if corrupt:
+            # The entry's data follows the name in its local header
+            offset = data.find(corrupt.encode(), data.find(corrupt.encode()) + 1)
+            data[offset] ^= 0xFF
+        return io.BytesIO(bytes(data))
+
+    def test_corrupt_archive_entry_fails_only_that_capture(self):
+        archive = self._archive(['face-0.jpg', 'face-1.jpg'], corrupt='face-1.jpg')
+        captures = batch._read_archive(archive, {})
+
+        results = process_capture_batch(self.session, captures, marked_by=self.officer)
+
+        self.assertEqual([r['status'] for r in results], ['SUCCESS', 'FAILED'])
+        self.assertTrue(Attendance.objects.filter(session=self.session, cadet=self.cadets[0]).exists())
+
+    def test_oversized_archive_entry_is_a_batch_error(self):
+        with mock.patch.object(batch, 'MAX_CAPTURE_BYTES', 8):
+            with self.assertRaises(batch.CaptureBatchError):
+                batch._read_archive(self._archive(['face-0.jpg']), {})
+
+
+class CaptureMetadataTests(TestCase):
+    def test_malformed_metadata_is_a_batch_error(self):
+        for raw in ('not json', '{"captures": 5}', '[5]', '["face.jpg"]', '[{"filename": 7}]'):
+            with self.subTest(raw=raw), self.assertRaises(batch.CaptureBatchError):
+                batch._parse_metadata(raw)
+
+    def test_malformed_timestamps_are_a_batch_error(self):
+        for value in (5, 1.5, ['2024-01-01'], 'yesterday', '2024-13-45T10:00'):
+            with self.subTest(value=value), self.assertRaises(batch.CaptureBatchError):
+                batch._parse_captured_at(value)
+
+    def test_valid_metadata(self):
+        metadata = batch._parse_metadata('[{"filename": "face.jpg", "captured_at": "2024-01-01T07:30"}]')
+        captured_at = batch._parse_captured_at(metadata['face.jpg']['captured_at'])
+        self.assertEqual(timezone.localtime(captured_at).hour, 7)
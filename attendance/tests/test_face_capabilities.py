@@ -0,0 +1,69 @@
+import threading
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from attendance.face_recognition import capabilities
+from attendance.face_recognition.capabilities import FaceStackReport, probe_face_stack
+from .helpers import make_officer, make_session, make_unit
+
+
+class FaceStackProbeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+
+    def setUp(self):
+        patcher = mock.patch.object(capabilities, '_report', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.run_probe = mock.patch.object(
+            capabilities, '_run_probe',
+            side_effect=lambda: FaceStackReport(False, error='No module named deepface')
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_probe_runs_once_per_process(self):
+        report = probe_face_stack()
+        self.assertIs(probe_face_stack(), report)
+        self.assertFalse(capabilities.is_deepface_available())
+        self.assertEqual(self.run_probe.call_count, 1)
+
+    def test_concurrent_callers_share_one_probe(self):
+        threads = [threading.Thread(target=probe_face_stack) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.run_probe.call_count, 1)
+
+    def test_refresh_probes_again(self):
+        probe_face_stack()
+        self.run_probe.side_effect = lambda: FaceStackReport(True, model='Facenet512')
+        self.assertTrue(probe_face_stack(refresh=True).available)
+        self.assertTrue(capabilities.is_deepface_available())
+        self.assertEqual(self.run_probe.call_count, 2)
+
+    def test_views_reuse_cached_probe(self):
+        self.client.login(username='officer', password='testpass123')
+        url = reverse('face_attendance', args=[self.session.id])
+        for _ in range(3):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.context['deepface_available'])
+        self.assertEqual(self.run_probe.call_count, 1)
+
+    def test_capabilities_endpoint_reprobes_on_post(self):
+        self.client.login(username='officer', password='testpass123')
+        url = reverse('face_capabilities')
+        response = self.client.get(url)
+        self.assertFalse(response.json()['available'])
+
+        self.run_probe.side_effect = lambda: FaceStackReport(True, model='Facenet512', detector='opencv')
+        response = self.client.post(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['model'], 'Facenet512')
+        self.assertTrue(response.json()['available'])
+        self.assertEqual(self.run_probe.call_count, 2)
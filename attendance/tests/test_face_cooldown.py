@@ -0,0 +1,148 @@
+import base64
+import json
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.face_recognition import capabilities, cooldown, face_utils
+from attendance.face_recognition.capabilities import FaceStackReport
+from attendance.face_recognition.cooldown import RecognitionCooldown
+from attendance.face_recognition.models import FaceAttendanceLog, FaceEncoding
+from attendance.models import Attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecognitionCooldownTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cooldown = RecognitionCooldown(ttl=60, max_cadets=2, clock=self.clock)
+        self.marked_at = timezone.now()
+
+    def test_entries_expire_after_ttl(self):
+        self.cooldown.remember(1, 10, self.marked_at)
+        self.assertIsNotNone(self.cooldown.get(1, 10))
+        self.assertIsNone(self.cooldown.get(2, 10))
+        self.clock.now = 61
+        self.assertIsNone(self.cooldown.get(1, 10))
+
+    def test_repeat_remember_keeps_first_mark(self):
+        first = self.cooldown.remember(1, 10, self.marked_at, embedding=np.ones(4))
+        self.clock.now = 30
+        again = self.cooldown.remember(1, 10, timezone.now(), embedding=np.ones(4))
+        self.assertIs(again, first)
+        self.assertEqual(again.marked_at, self.marked_at)
+
+    def test_match_probe_only_accepts_near_identical_embeddings(self):
+        self.cooldown.remember(1, 10, self.marked_at, embedding=[1, 0, 0, 0])
+        self.cooldown.remember(1, 11, self.marked_at, embedding=[0, 1, 0, 0])
+        entry, distance = self.cooldown.match_probe(1, [0.05, 1, 0, 0])
+        self.assertEqual(entry.cadet_id, 11)
+        self.assertLess(distance, 0.01)
+        self.assertIsNone(self.cooldown.match_probe(1, [1, 1, 0, 0]))
+        self.assertIsNone(self.cooldown.match_probe(2, [0, 1, 0, 0]))
+
+    def test_sessions_that_are_not_scanned_again_are_swept(self):
+        self.cooldown.remember(1, 10, self.marked_at)
+        self.clock.now = 61
+        for _ in range(cooldown.SWEEP_INTERVAL - 1):
+            self.cooldown.remember(2, 10, self.marked_at)
+        self.assertEqual(list(self.cooldown._sessions), [2])
+
+    def test_least_recently_used_sessions_are_evicted(self):
+        limited = RecognitionCooldown(ttl=60, max_sessions=2, clock=self.clock)
+        for session_id in (1, 2, 1, 3):
+            limited.remember(session_id, 10, self.marked_at)
+        self.assertIsNotNone(limited.get(1, 10))
+        self.assertIsNone(limited.get(2, 10))
+        self.assertIsNotNone(limited.get(3, 10))
+
+    def test_oldest_cadets_are_evicted(self):
+        for cadet_id in (10, 11, 12):
+            self.cooldown.remember(1, cadet_id, self.marked_at)
+        self.assertIsNone(self.cooldown.get(1, 10))
+        self.assertIsNotNone(self.cooldown.get(1, 12))
+
+
+@override_settings(FACE_LOG_BUFFER_ENABLED=False)
+class FaceAttendanceCooldownViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(3)]
+        cls.vectors = np.eye(3, 8)
+        for cadet, vector in zip(cls.cadets, cls.vectors):
+            encoding = FaceEncoding(cadet=cadet)
+            encoding.set_encoding(vector)
+            encoding.save()
+        _, jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))
+        cls.image = base64.b64encode(jpeg.tobytes()).decode()
+
+    def setUp(self):
+        self.probe = self.vectors[1]
+        mock.patch.object(capabilities, '_report', FaceStackReport(True)).start()
+        mock.patch.object(cooldown, '_cooldown', RecognitionCooldown(ttl=60)).start()
+        mock.patch.object(face_utils, 'detect_faces', return_value=([(0, 1, 1, 0)], None)).start()
+        mock.patch.object(face_utils, 'get_face_encodings', side_effect=lambda *args: [self.probe]).start()
+        self.addCleanup(mock.patch.stopall)
+        self.client.login(username='officer', password='testpass123')
+        self.url = reverse('process_face_attendance', args=[self.session.id])
+
+    def _scan(self):
+        response = self.client.post(self.url, json.dumps({'image': self.image}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_repeat_scan_is_not_written_again(self):
+        first = self._scan()
+        self.assertTrue(first['success'])
+        self.assertNotIn('already_marked', first)
+        attendance = Attendance.objects.get(session=self.session, cadet=self.cadets[1])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self._scan()
+        self.assertTrue(second['already_marked'])
+        self.assertEqual(second['cadet_id'], self.cadets[1].id)
+        self.assertIn('already marked at', second['message'])
+        self.assertEqual(Attendance.objects.get(pk=attendance.pk).updated_at, attendance.updated_at)
+
+        # The near-identical frame is matched without loading the gallery
+        tables = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('face_encodings', tables)
+        self.assertNotIn('"attendance"', tables)
+        self.assertEqual(FaceAttendanceLog.objects.filter(status='SUCCESS').count(), 2)
+
+    def test_different_frame_of_marked_cadet_reports_cooldown(self):
+        self._scan()
+        # Still the same cadet, but too far from the last frame to take the shortcut
+        self.probe = self.vectors[1] + 0.7 * self.vectors[0]
+        result = self._scan()
+        self.assertTrue(result['already_marked'])
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 1)
+
+    def test_face_match_query_count(self):
+        self._scan()
+        self.probe = self.vectors[2]
+        # Auth and session lookups, the gallery stamp, the matched cadet, the
+        # log row, then the upsert with its session stats and cadet summary
+        # recounts. SQLite takes no row locks; other backends add one per recount.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self._scan()['success'])
+        self.assertEqual(len(queries), 19)
+        stats = [query for query in queries.captured_queries if 'attendance_session_stats' in query['sql']]
+        self.assertEqual(len(stats), 1)
@@ -0,0 +1,87 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from attendance.face_recognition import enrollment
+from attendance.face_recognition.enrollment import import_face_archive
+from attendance.face_recognition.models import FaceEncoding
+from .helpers import make_cadet, make_unit
+
+
+def _archive(names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name in names:
+            zip_file.writestr(name, name.encode())
+    buffer.seek(0)
+    return buffer
+
+
+class FaceArchiveImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(3)]
+        existing = FaceEncoding(cadet=cls.cadets[2])
+        existing.set_encoding(np.ones(8))
+        existing.save()
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        def fake_detect(image_array):
+            return [(0, 10, 10, 0)], image_array
+
+        patches = [
+            mock.patch.object(enrollment, 'preprocess_image', lambda stream: np.zeros((10, 10, 3), np.uint8)),
+            mock.patch.object(enrollment, 'detect_faces', fake_detect),
+            mock.patch.object(enrollment, 'get_face_encodings', lambda image, locations: [np.ones(8)]),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_import_registers_skips_and_reports_unknown(self):
+        archive = _archive([
+            'photos/ncc000.jpg', 'photos/NCC001.JPG', 'photos/NCC002.jpg',
+            'photos/NCC999.jpg', 'photos/readme.txt',
+        ])
+
+        # One lookup for cadets and one for already registered faces, before any writes
+        with self.assertNumQueries(2):
+            with mock.patch.object(enrollment, '_register', return_value=None) as register:
+                import_face_archive(_archive(['NCC000.jpg', 'NCC001.jpg']))
+        self.assertEqual(register.call_count, 2)
+
+        results = {result.enrollment_number: result.status
+                   for result in import_face_archive(archive, queue_size=1)}
+        self.assertEqual(results, {
+            'NCC000': 'REGISTERED',
+            'NCC001': 'REGISTERED',
+            'NCC002': 'SKIPPED',
+            'NCC999': 'NOT_FOUND',
+        })
+        self.assertEqual(FaceEncoding.objects.count(), 3)
+
+    def test_unexpected_read_error_fails_only_that_entry(self):
+        def fake_preprocess(stream):
+            if stream.read() == b'NCC000.jpg':
+                raise ValueError('broken image')
+            return np.zeros((10, 10, 3), np.uint8)
+
+        with mock.patch.object(enrollment, 'preprocess_image', fake_preprocess):
+            results = import_face_archive(_archive(['NCC000.jpg', 'NCC001.jpg']))
+        self.assertEqual(
+            [(result.enrollment_number, result.status) for result in results],
+            [('NCC000', 'FAILED'), ('NCC001', 'REGISTERED')]
+        )
+        self.assertEqual(results[0].message, 'broken image')
@@ -0,0 +1,88 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from attendance.face_recognition.face_utils import (
+    FaceGallery, compare_faces, find_best_match
+)
+
+
+def _reference_distances(known, probe, metric):
+    """Straightforward per-row distances used to check the gallery maths"""
+    known = np.asarray(known, dtype=np.float64)
+    probe = np.asarray(probe, dtype=np.float64)
+
+    def _normalize(arr):
+        norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return arr / norms
+
+    if metric == 'cosine':
+        return 1.0 - _normalize(known) @ _normalize(probe)
+    if metric == 'euclidean':
+        return np.linalg.norm(known - probe, axis=1)
+    return np.linalg.norm(_normalize(known) - _normalize(probe), axis=1)
+
+
+class FaceGalleryTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.known = rng.normal(size=(20, 512))
+        self.probe = self.known[7] + rng.normal(scale=0.05, size=512)
+
+    def test_distances_match_reference_for_all_metrics(self):
+        for metric in FaceGallery.METRICS:
+            with self.subTest(metric=metric):
+                gallery = FaceGallery(self.known, metric=metric)
+                np.testing.assert_allclose(
+                    gallery.distances(self.probe),
+                    _reference_distances(self.known, self.probe, metric),
+                    rtol=1e-4, atol=1e-4
+                )
+
+    def test_batch_distances(self):
+        gallery = FaceGallery(self.known)
+        probes = self.known[:3]
+        distances = gallery.distances(probes)
+        self.assertEqual(distances.shape, (3, 20))
+        np.testing.assert_allclose(np.diag(distances[:, :3]), 0.0, atol=1e-5)
+
+    def test_add_and_remove_without_rebuild(self):
+        gallery = FaceGallery(self.known[:2], ids=['a', 'b'])
+        gallery.add('c', self.known[2])
+        self.assertEqual(gallery.ids, ['a', 'b', 'c'])
+
+        gallery.remove('a')
+        self.assertEqual(len(gallery), 2)
+        self.assertNotIn('a', gallery)
+        index, _ = gallery.best_match(self.known[2])
+        self.assertEqual(gallery.ids[index], 'c')
+
+        # Replacing an existing id keeps the gallery size
+        gallery.add('b', self.known[5])
+        self.assertEqual(len(gallery), 2)
+        index, _ = gallery.best_match(self.known[5])
+        self.assertEqual(gallery.ids[index], 'b')
+
+    def test_add_grows_capacity(self):
+        gallery = FaceGallery()
+        for i, encoding in enumerate(self.known):
+            gallery.add(i, encoding)
+        self.assertEqual(len(gallery), 20)
+        self.assertTrue(gallery.matrix.flags['C_CONTIGUOUS'])
+
+    def test_rejects_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            FaceGallery(self.known, metric='manhattan')
+
+    def test_wrappers_accept_lists_and_galleries(self):
+        known = list(self.known)
+        index, confidence = find_best_match(known, self.probe)
+        self.assertEqual(index, 7)
+        self.assertGreater(confidence, 0.9)
+        self.assertEqual(find_best_match(FaceGallery(known), self.probe)[0], 7)
+
+        matches = compare_faces(known, self.probe)
+        self.assertEqual(matches.count(True), 1)
+        self.assertTrue(matches[7])
+        self.assertEqual(compare_faces([], self.probe), [])
+        self.assertFalse(any(compare_faces([np.zeros(512)], self.probe)))
@@ -0,0 +1,83 @@
+from unittest import mock
+
+import numpy as np
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from attendance.face_recognition import gallery_cache
+from attendance.face_recognition.gallery_cache import UnitGalleryCache, get_gallery_cache
+from attendance.face_recognition.models import FaceEncoding
+from .helpers import make_cadet, make_unit
+
+
+class UnitGalleryCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(3)]
+        cls.vectors = np.eye(4, 8)
+        for cadet, vector in zip(cls.cadets[:2], cls.vectors):
+            cls._enroll(cadet, vector)
+
+    @staticmethod
+    def _enroll(cadet, vector):
+        encoding = FaceEncoding(cadet=cadet)
+        encoding.set_encoding(vector)
+        encoding.save()
+        return encoding
+
+    def setUp(self):
+        mock.patch.object(gallery_cache, '_cache', UnitGalleryCache()).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _gallery(self):
+        with get_gallery_cache().gallery(self.unit.id) as gallery:
+            return gallery
+
+    def test_gallery_is_built_once(self):
+        gallery = self._gallery()
+        self.assertEqual(sorted(gallery.ids), [self.cadets[0].id, self.cadets[1].id])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(self._gallery(), gallery)
+        # Only the stamp is read; the encodings are not loaded again
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"encoding"', queries[0]['sql'])
+
+    def test_enrollment_rebuilds_gallery(self):
+        gallery = self._gallery()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._enroll(self.cadets[2], self.vectors[2])
+
+        rebuilt = self._gallery()
+        self.assertIsNot(rebuilt, gallery)
+        self.assertIn(self.cadets[2].id, rebuilt)
+        self.assertEqual(rebuilt.best_match(self.vectors[2], 0.1)[0], rebuilt.ids.index(self.cadets[2].id))
+
+    def test_deleted_encoding_is_removed(self):
+        self._gallery()
+        with self.captureOnCommitCallbacks(execute=True):
+            FaceEncoding.objects.filter(cadet=self.cadets[0]).delete()
+
+        self.assertEqual(self._gallery().ids, [self.cadets[1].id])
+
+    def test_invalidation_does_not_adopt_other_changes(self):
+        gallery = self._gallery()
+        # Another worker deactivates an encoding without this process hearing of it
+        FaceEncoding.objects.filter(cadet=self.cadets[1]).update(is_active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._enroll(self.cadets[2], self.vectors[2])
+
+        rebuilt = self._gallery()
+        self.assertIsNot(rebuilt, gallery)
+        self.assertEqual(sorted(rebuilt.ids), [self.cadets[0].id, self.cadets[2].id])
+
+    def test_changes_from_other_workers_rebuild_gallery(self):
+        gallery = self._gallery()
+        # A queryset update sends no signals, like a write made by another process
+        FaceEncoding.objects.filter(cadet=self.cadets[1]).update(is_active=False)
+
+        rebuilt = self._gallery()
+        self.assertIsNot(rebuilt, gallery)
+        self.assertEqual(rebuilt.ids, [self.cadets[0].id])
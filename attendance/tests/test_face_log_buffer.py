@@ -0,0 +1,67 @@
+import time
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from attendance.face_recognition.log_buffer import FaceLogBuffer, log_face_attempt
+from attendance.face_recognition.models import FaceAttendanceLog
+from .helpers import make_officer, make_session, make_unit
+
+
+class FaceLogBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.session = make_session(cls.unit, make_officer(cls.unit))
+
+    def test_rows_are_written_in_one_bulk_insert(self):
+        buffer = FaceLogBuffer(autostart=False)
+        for status in ('NONE', 'UNKNOWN', 'MULTIPLE'):
+            buffer.log(session=self.session, status=status)
+        self.assertEqual(FaceAttendanceLog.objects.count(), 0)
+        self.assertEqual(len(buffer), 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len(buffer), 0)
+        self.assertFalse(FaceAttendanceLog.objects.filter(captured_at__isnull=True).exists())
+
+    def test_full_buffer_writes_synchronously(self):
+        buffer = FaceLogBuffer(max_size=1, autostart=False)
+        buffer.log(session=self.session, status='NONE')
+        with self.assertLogs('attendance.face_recognition.log_buffer', 'WARNING'):
+            buffer.log(session=self.session, status='UNKNOWN')
+        self.assertEqual(list(FaceAttendanceLog.objects.values_list('status', flat=True)), ['UNKNOWN'])
+        buffer.flush()
+        self.assertEqual(FaceAttendanceLog.objects.count(), 2)
+
+    @override_settings(FACE_LOG_BUFFER_ENABLED=False)
+    def test_disabled_buffer_writes_directly(self):
+        log_face_attempt(session=self.session, status='NONE')
+        self.assertEqual(FaceAttendanceLog.objects.count(), 1)
+
+
+class FaceLogWriterThreadTests(TransactionTestCase):
+    def setUp(self):
+        self.unit = make_unit()
+        self.session = make_session(self.unit, make_officer(self.unit))
+
+    def _wait_for_rows(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if FaceAttendanceLog.objects.count() >= count:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_background_thread_flushes_on_size(self):
+        buffer = FaceLogBuffer(flush_size=2, flush_interval=60)
+        self.addCleanup(buffer.stop)
+        buffer.log(session=self.session, status='NONE')
+        buffer.log(session=self.session, status='NONE')
+        self.assertTrue(self._wait_for_rows(2))
+
+    def test_stop_flushes_remaining_rows(self):
+        buffer = FaceLogBuffer(flush_size=100, flush_interval=60)
+        buffer.log(session=self.session, status='UNKNOWN')
+        buffer.stop()
+        self.assertEqual(FaceAttendanceLog.objects.count(), 1)
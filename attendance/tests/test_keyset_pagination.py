@@ -0,0 +1,107 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.face_recognition.models import FaceAttendanceLog
+from attendance.models import AttendanceSession
+from ncc_automation.pagination import InvalidCursor, KeysetPaginator
+from .helpers import make_officer, make_session, make_unit
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        # Several sessions share a date and start time so the id breaks ties
+        for day in range(4):
+            for start in (datetime.time(7, 0), datetime.time(7, 0), datetime.time(16, 0)):
+                make_session(cls.unit, cls.officer, date=datetime.date(2024, 1, 1 + day), start_time=start)
+        cls.expected = list(AttendanceSession.objects.order_by('-date', '-start_time', '-id').values_list('id', flat=True))
+
+    def _paginator(self, per_page=5):
+        return KeysetPaginator(AttendanceSession.objects.all(), ('-date', '-start_time', '-id'), per_page=per_page)
+
+    def test_forward_and_back(self):
+        paginator = self._paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([obj.id for page in pages for obj in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([obj.id for obj in back], [obj.id for obj in pages[1]])
+        self.assertEqual(back.next_cursor, pages[1].next_cursor)
+        first = paginator.page(back.previous_cursor)
+        self.assertEqual([obj.id for obj in first], [obj.id for obj in pages[0]])
+        self.assertFalse(first.has_previous)
+
+    def test_later_pages_cost_one_query(self):
+        paginator = self._paginator()
+        cursor = paginator.page(paginator.page().next_cursor).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page(cursor)
+        self.assertEqual([obj.id for obj in page], self.expected[10:])
+
+    def test_invalid_cursor(self):
+        paginator = self._paginator()
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+        self.assertEqual([obj.id for obj in paginator.get_page('not-a-cursor')], self.expected[:5])
+
+    def test_nullable_keys_sort_last(self):
+        session = AttendanceSession.objects.first()
+        now = timezone.now()
+        for minutes in (None, 3, None, 1, 2):
+            FaceAttendanceLog.objects.create(
+                session=session, status='UNKNOWN',
+                captured_at=now - datetime.timedelta(minutes=minutes) if minutes is not None else None
+            )
+        paginator = KeysetPaginator(FaceAttendanceLog.objects.all(), ('-captured_at', '-id'), per_page=2)
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        rows = [log for page in pages for log in page]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([log.captured_at is None for log in rows], [False, False, False, True, True])
+        self.assertEqual(rows[0].captured_at, now - datetime.timedelta(minutes=1))
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([log.id for log in back], [log.id for log in pages[1]])
+
+    def test_requires_unique_last_key(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(AttendanceSession.objects.all(), ('-date',))
+
+    def test_session_list_is_paginated(self):
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('attendance_session_list'))
+        page = response.context['page']
+        self.assertEqual(len(page), 12)
+        self.assertFalse(page.has_other_pages)
+
+        make_session(self.unit, date=datetime.date(2023, 1, 1), title='Oldest')
+        paginator = KeysetPaginator(AttendanceSession.objects.all(), ('-date', '-start_time', '-id'), per_page=12)
+        cursor = paginator.page().next_cursor
+        response = self.client.get(reverse('attendance_session_list'), {'cursor': cursor})
+        self.assertEqual([session.title for session in response.context['sessions']], ['Oldest'])
+        self.assertContains(response, '?cursor=')
+
+    def test_logs_are_ordered_by_capture_time(self):
+        session = AttendanceSession.objects.first()
+        now = timezone.now()
+        # Buffered and batch-uploaded rows are written after they were captured
+        for minutes in (5, 1, 3):
+            FaceAttendanceLog.objects.create(
+                session=session, status='UNKNOWN', captured_at=now - datetime.timedelta(minutes=minutes)
+            )
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('attendance_logs', args=[session.id]))
+        self.assertEqual(
+            [log.captured_at for log in response.context['logs']],
+            [now - datetime.timedelta(minutes=minutes) for minutes in (1, 3, 5)]
+        )
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.models import Attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class MarkAttendanceSubmitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+        cls.cadets = [make_cadet(cls.unit, f'NCC{i:03d}') for i in range(30)]
+        cls.other_cadet = make_cadet(make_unit('UNIT2'), 'OTHER001')
+
+    def setUp(self):
+        self.client.login(username='officer', password='testpass123')
+        self.url = reverse('mark_attendance', args=[self.session.id])
+
+    def _form(self, cadets, status='PRESENT'):
+        data = {}
+        for cadet in cadets:
+            data[f'status_{cadet.id}'] = status
+            data[f'remarks_{cadet.id}'] = f'Remark {cadet.enrollment_number}'
+        return data
+
+    def _submit_queries(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('attendance_session_list'), fetch_redirect_response=False)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cadets(self):
+        small = self._submit_queries(self._form(self.cadets[:3]))
+        Attendance.objects.all().delete()
+        large = self._submit_queries(self._form(self.cadets))
+        self.assertEqual(small, large)
+        self.assertEqual(Attendance.objects.filter(session=self.session, status='PRESENT').count(), 30)
+
+    def test_resubmission_updates_existing_rows(self):
+        self.client.post(self.url, self._form(self.cadets[:5]))
+        self.client.post(self.url, self._form(self.cadets[:5], status='LATE'))
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 5)
+        self.assertFalse(Attendance.objects.exclude(status='LATE').exists())
+        self.assertEqual(
+            Attendance.objects.get(cadet=self.cadets[0]).marked_by, self.officer
+        )
+
+    def test_invalid_rows_are_skipped(self):
+        data = self._form(self.cadets[:2])
+        data.update({
+            f'status_{self.other_cadet.id}': 'PRESENT',
+            'status_999999': 'PRESENT',
+            'status_abc': 'PRESENT',
+            f'status_{self.cadets[2].id}': 'ASLEEP',
+        })
+        response = self.client.post(self.url, data, follow=True)
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 2)
+        self.assertContains(response, '4 entries were skipped')
@@ -0,0 +1,105 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.models import Attendance, AttendanceSession, CadetAttendanceSummary
+from attendance.services import close_session
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class SessionCloseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadets = [make_cadet(cls.unit, f'NCC{i:03d}') for i in range(5)]
+        cls.session = make_session(cls.unit, cls.officer, date=datetime.date(2024, 1, 1))
+        make_cadet(make_unit('UNIT2'), 'OTHER001')
+
+    def _statuses(self):
+        return dict(Attendance.objects.filter(session=self.session).values_list('cadet__enrollment_number', 'status'))
+
+    def test_close_marks_missing_cadets_absent(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='PRESENT')
+        Attendance.objects.create(session=self.session, cadet=self.cadets[1], status='LATE')
+
+        self.assertEqual(close_session(self.session, marked_by=self.officer, batch_size=2), 3)
+
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_active)
+        self.assertEqual(self._statuses(), {
+            'NCC000': 'PRESENT', 'NCC001': 'LATE', 'NCC002': 'ABSENT', 'NCC003': 'ABSENT', 'NCC004': 'ABSENT'
+        })
+        stats = self.session.get_attendance_stats()
+        self.assertEqual((stats['total'], stats['absent'], stats['percentage']), (5, 3, 20.0))
+        self.assertEqual(CadetAttendanceSummary.objects.get(cadet=self.cadets[4]).absent, 1)
+
+    def test_closing_again_changes_nothing(self):
+        close_session(self.session)
+        Attendance.objects.filter(cadet=self.cadets[0]).update(status='EXCUSED')
+        with self.assertNumQueries(4):
+            self.assertEqual(close_session(self.session), 0)
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 5)
+        self.assertEqual(self._statuses()['NCC000'], 'EXCUSED')
+
+    def test_cadet_marked_while_closing_keeps_their_status(self):
+        # The cadet is marked after close_session decided they were missing
+        real_bulk_create = Attendance.objects.bulk_create
+
+        def mark_first(records, **kwargs):
+            Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='PRESENT')
+            return real_bulk_create(records, **kwargs)
+
+        with mock.patch.object(Attendance.objects, 'bulk_create', side_effect=mark_first):
+            # The conflicting row is not counted as marked absent
+            self.assertEqual(close_session(self.session), 4)
+        self.assertEqual(self._statuses()['NCC000'], 'PRESENT')
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 5)
+
+    def test_command_closes_ended_sessions(self):
+        now = timezone.localtime()
+        ended = make_session(self.unit, date=now.date() - datetime.timedelta(days=1))
+        running = make_session(
+            self.unit, date=now.date(),
+            start_time=datetime.time(0, 0), end_time=datetime.time(23, 59, 59)
+        )
+        AttendanceSession.objects.filter(pk=self.session.pk).update(is_active=False)
+
+        out = StringIO()
+        call_command('close_sessions', stdout=out)
+        self.assertIn('Closed 1 sessions', out.getvalue())
+        self.assertEqual(ended.attendances.filter(status='ABSENT').count(), 5)
+        self.assertFalse(running.attendances.exists())
+        self.assertFalse(Attendance.objects.filter(session=self.session).exists())
+
+        call_command('close_sessions', session=[running.pk], stdout=StringIO())
+        running.refresh_from_db()
+        self.assertFalse(running.is_active)
+
+    def test_close_view(self):
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.post(reverse('attendance_session_close', args=[self.session.pk]), follow=True)
+        self.assertContains(response, '5 cadets without attendance were marked absent')
+        self.assertEqual(Attendance.objects.filter(session=self.session, marked_by=self.officer).count(), 5)
+
+    def test_close_view_is_limited_to_own_unit(self):
+        other_unit = make_unit('UNIT3')
+        make_officer(other_unit, 'other')
+        self.client.login(username='other', password='testpass123')
+        response = self.client.post(reverse('attendance_session_close', args=[self.session.pk]), follow=True)
+        self.assertContains(response, 'You can only close sessions of your own unit.')
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.is_active)
+        self.assertFalse(Attendance.objects.filter(session=self.session).exists())
+
+        User.objects.create_user(username='admin', password='testpass123', role='ADMIN')
+        self.client.login(username='admin', password='testpass123')
+        self.client.post(reverse('attendance_session_close', args=[self.session.pk]))
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_active)
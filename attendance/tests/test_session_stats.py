@@ -0,0 +1,92 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.models import Attendance, AttendanceSession, AttendanceSessionStats
+from attendance.services import upsert_attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class SessionStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.session = make_session(cls.unit, cls.officer)
+        cls.cadets = [make_cadet(cls.unit, f'NCC00{i}') for i in range(4)]
+
+    def _stats(self):
+        return AttendanceSessionStats.objects.get(session=self.session)
+
+    def test_upsert_refreshes_stats(self):
+        upsert_attendance([
+            Attendance(session=self.session, cadet=cadet, status=status)
+            for cadet, status in zip(self.cadets, ['PRESENT', 'PRESENT', 'LATE', 'ABSENT'])
+        ])
+        stats = self._stats()
+        self.assertEqual((stats.total, stats.present, stats.late, stats.absent), (4, 2, 1, 1))
+        self.assertEqual(stats.percentage, 50.0)
+
+        upsert_attendance([Attendance(session=self.session, cadet=self.cadets[3], status='PRESENT')])
+        self.assertEqual(self._stats().present, 3)
+        self.assertEqual(self._stats().absent, 0)
+
+    def test_save_and_delete_refresh_stats(self):
+        attendance = Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='EXCUSED')
+        self.assertEqual(self._stats().excused, 1)
+        attendance.status = 'ON_LEAVE'
+        attendance.save()
+        self.assertEqual((self._stats().excused, self._stats().on_leave), (0, 1))
+        attendance.delete()
+        self.assertEqual(self._stats().total, 0)
+
+    def test_deleting_a_session_removes_its_stats(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='PRESENT')
+        self.session.delete()
+        self.assertFalse(AttendanceSessionStats.objects.exists())
+
+    def test_get_attendance_stats_reads_the_stored_row(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='PRESENT')
+        session = AttendanceSession.objects.select_related('stats').get(pk=self.session.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(session.get_attendance_stats()['present'], 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Attendance.objects.create(session=self.session, cadet=self.cadets[0], status='PRESENT')
+        AttendanceSessionStats.objects.update(present=7, total=7)
+        out = StringIO()
+        call_command('rebuild_session_stats', stdout=out)
+        self.assertIn('1 were missing or out of date', out.getvalue())
+        self.assertEqual((self._stats().present, self._stats().total), (1, 1))
+
+
+class SessionListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.cadet = make_cadet(cls.unit, 'NCC001')
+
+    def _add_sessions(self, count):
+        for i in range(count):
+            session = make_session(self.unit, self.officer, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i))
+            Attendance.objects.create(session=session, cadet=self.cadet, status='PRESENT')
+
+    def _list_queries(self):
+        self.client.login(username='officer', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('attendance_session_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_sessions(self):
+        self._add_sessions(2)
+        few = self._list_queries()
+        self._add_sessions(20)
+        many = self._list_queries()
+        self.assertEqual(few, many)
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Generous enough for slow CI machines, far below what the face stack costs
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+
+# Modules that must only be loaded when face recognition is actually used
+HEAVY_MODULES = ('cv2', 'numpy', 'PIL', 'deepface', 'tensorflow')
+
+STARTUP_SCRIPT = """
+import sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(','.join(sorted(m for m in {modules!r} if m in sys.modules)))
+"""
+
+
+class StartupImportTests(SimpleTestCase):
+    """Guard against the face recognition stack creeping back into startup"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT.format(modules=HEAVY_MODULES)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        cls.loaded_modules = [m for m in result.stdout.strip().split(',') if m]
+        cls.import_time_us = 0
+        for line in result.stderr.splitlines():
+            # Lines look like "import time:  self [us] | cumulative | imported package"
+            if not line.startswith('import time:'):
+                continue
+            self_time = line[len('import time:'):].split('|')[0].strip()
+            if self_time.isdigit():
+                cls.import_time_us += int(self_time)
+
+    def test_setup_does_not_import_face_stack(self):
+        self.assertEqual(self.loaded_modules, [])
+
+    def test_setup_stays_within_import_budget(self):
+        self.assertLess(
+            self.import_time_us / 1e6, IMPORT_TIME_BUDGET_SECONDS,
+            f"django.setup() and URLconf imports took {self.import_time_us / 1e6:.2f}s"
+        )
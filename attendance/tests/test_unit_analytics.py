@@ -0,0 +1,91 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from attendance.analytics import compute_unit_analytics, get_unit_analytics, load_unit_frame
+from attendance.models import Attendance
+from .helpers import make_cadet, make_officer, make_session, make_unit
+
+
+class UnitAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.regular = make_cadet(cls.unit, 'NCC001')
+        cls.absentee = make_cadet(cls.unit, 'NCC002')
+        # Two Mondays a week apart, plus a camp day in the second week
+        monday = datetime.date(2024, 1, 1)
+        cls.sessions = [
+            make_session(cls.unit, cls.officer, date=monday),
+            make_session(cls.unit, cls.officer, date=monday + datetime.timedelta(days=7)),
+            make_session(cls.unit, cls.officer, date=monday + datetime.timedelta(days=9), session_type='CAMP'),
+        ]
+        for session in cls.sessions:
+            Attendance.objects.create(session=session, cadet=cls.regular, status='PRESENT')
+        for session, status in zip(cls.sessions, ['PRESENT', 'ABSENT', 'ABSENT']):
+            Attendance.objects.create(session=session, cadet=cls.absentee, status=status)
+        # Attendance in other units is not included
+        other_unit = make_unit('UNIT2')
+        Attendance.objects.create(
+            session=make_session(other_unit, date=monday), cadet=make_cadet(other_unit, 'OTHER001'), status='ABSENT'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_frame_is_loaded_with_one_query(self):
+        with self.assertNumQueries(1):
+            frame = load_unit_frame(self.unit)
+        self.assertEqual(len(frame), 6)
+
+    def test_rollups(self):
+        analytics = compute_unit_analytics(load_unit_frame(self.unit), rolling_weeks=2)
+        self.assertEqual(analytics['overall'], {
+            'total': 6, 'present': 4, 'percentage': 66.67, 'sessions': 3, 'cadets': 2
+        })
+        self.assertEqual(
+            [(week['week'], week['percentage'], week['rolling_percentage']) for week in analytics['weekly']],
+            [('2024-01-01', 100.0, 100.0), ('2024-01-08', 50.0, 66.67)]
+        )
+        camp = next(row for row in analytics['by_session_type'] if row['session_type'] == 'CAMP')
+        self.assertEqual((camp['total'], camp['counts']['ABSENT'], camp['label']), (2, 1, 'Camp'))
+        self.assertEqual([row['enrollment_number'] for row in analytics['at_risk']], ['NCC002'])
+        self.assertEqual(analytics['at_risk'][0]['percentage'], 33.33)
+
+    def test_empty_unit(self):
+        analytics = compute_unit_analytics(load_unit_frame(make_unit('EMPTY')))
+        self.assertEqual(analytics['overall']['total'], 0)
+        self.assertEqual(analytics['weekly'], [])
+
+    def test_cached_until_attendance_changes(self):
+        get_unit_analytics(self.unit)
+        with self.assertNumQueries(1):
+            analytics = get_unit_analytics(self.unit)
+        self.assertEqual(len(analytics['at_risk']), 1)
+
+        Attendance.objects.filter(cadet=self.absentee).first().delete()
+        analytics = get_unit_analytics(self.unit)
+        self.assertEqual(analytics['overall']['total'], 5)
+
+    def test_cache_follows_session_date_changes(self):
+        self.assertEqual(get_unit_analytics(self.unit)['weekly'][0]['week'], '2024-01-01')
+        session = self.sessions[0]
+        session.date = datetime.date(2023, 12, 25)
+        session.save()
+        self.assertEqual(get_unit_analytics(self.unit)['weekly'][0]['week'], '2023-12-25')
+
+    def test_api_returns_officer_unit(self):
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('unit_attendance_analytics'))
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['unit']['id'], self.unit.id)
+        self.assertEqual(data['overall']['total'], 6)
+
+    def test_officer_dashboard_has_analytics_panel(self):
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(reverse('officer_dashboard'))
+        self.assertContains(response, f'data-url="{reverse("unit_attendance_analytics")}"')
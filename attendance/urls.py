@@ -6,8 +6,12 @@ urlpatterns = [
     path('sessions/', views.attendance_session_list, name='attendance_session_list'),
     path('sessions/create/', views.attendance_session_create, name='attendance_session_create'),
     path('sessions/<int:pk>/', views.attendance_session_detail, name='attendance_session_detail'),
+    path('sessions/<int:pk>/close/', views.attendance_session_close, name='attendance_session_close'),
     path('mark/<int:session_id>/', views.mark_attendance, name='mark_attendance'),
     path('my-attendance/', views.cadet_attendance_view, name='cadet_attendance'),
+    path('export/', views.attendance_export, name='attendance_export'),
+    path('import/', views.attendance_import, name='attendance_import'),
+    path('analytics/', views.unit_attendance_analytics, name='unit_attendance_analytics'),
 ]
 
 # Include face recognition specific routes so they are available under the same /attendance/ prefix
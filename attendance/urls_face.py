@@ -9,10 +9,13 @@ urlpatterns = [
     # Face management
     path('face/manage/', face_views.face_management_view, name='face_management'),
     path('face/<int:cadet_id>/delete/', face_views.delete_face_encoding, name='delete_face_encoding'),
+    path('face/duplicates/', face_views.face_duplicates_view, name='face_duplicates'),
+    path('face/capabilities/', face_views.face_capabilities_view, name='face_capabilities'),
     
     # Face attendance
     path('session/face/<int:session_id>/', face_views.face_attendance_view, name='face_attendance'),
     path('session/<int:session_id>/process-face/', face_views.process_face_attendance, name='process_face_attendance'),
+    path('session/<int:session_id>/process-face/batch/', face_views.process_face_attendance_batch, name='process_face_attendance_batch'),
     
     # Attendance logs
     path('session/<int:session_id>/logs/', face_views.attendance_logs_view, name='attendance_logs'),
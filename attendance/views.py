@@ -1,23 +1,34 @@
+import io
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Count, Q
+from django.utils import timezone
 from accounts.decorators import officer_required
 from accounts.models import Cadet
+from ncc_automation.pagination import KeysetPaginator
 from .models import AttendanceSession, Attendance
-from .forms import AttendanceSessionForm
+from .forms import AttendanceExportForm, AttendanceImportForm, AttendanceSessionForm
+from .services import cadet_attendance_totals, close_session, upsert_attendance
+
+MAX_IMPORT_ERRORS_SHOWN = 200
 
 @officer_required
 def attendance_session_list(request):
     user = request.user
+    # Stats, unit and creator come from the same query as the sessions
+    sessions = AttendanceSession.objects.select_related('stats', 'unit', 'created_by__user')
     if user.role == 'ADMIN':
-        sessions = AttendanceSession.objects.all()
+        sessions = sessions.all()
     elif hasattr(user, 'officer_profile'):
-        sessions = AttendanceSession.objects.filter(unit=user.officer_profile.unit)
+        sessions = sessions.filter(unit=user.officer_profile.unit)
     else:
-        sessions = AttendanceSession.objects.none()
+        sessions = sessions.none()
     
-    return render(request, 'attendance/session_list.html', {'sessions': sessions})
+    page = KeysetPaginator(sessions, ('-date', '-start_time', '-id')).get_page(request.GET.get('cursor'))
+    return render(request, 'attendance/session_list.html', {'sessions': page, 'page': page})
 
 @officer_required
 def attendance_session_create(request):
@@ -43,30 +54,35 @@ def mark_attendance(request, session_id):
     session = get_object_or_404(AttendanceSession, id=session_id)
     
     if request.method == 'POST':
-        # Bulk mark attendance
-        for key, value in request.POST.items():
-            if key.startswith('status_'):
-                cadet_id = key.split('_')[1]
-                status = value
-                remarks = request.POST.get(f'remarks_{cadet_id}', '')
-                
-                try:
-                    cadet = Cadet.objects.get(id=cadet_id)
-                    officer = request.user.officer_profile if hasattr(request.user, 'officer_profile') else None
-                    
-                    Attendance.objects.update_or_create(
-                        session=session,
-                        cadet=cadet,
-                        defaults={
-                            'status': status,
-                            'remarks': remarks,
-                            'marked_by': officer
-                        }
-                    )
-                except Cadet.DoesNotExist:
-                    continue
+        # Parse the whole form first: {cadet_id: (status, remarks)}
+        valid_statuses = {value for value, _ in Attendance.STATUS_CHOICES}
+        submitted = {}
+        invalid = 0
+        for key, status in request.POST.items():
+            if not key.startswith('status_'):
+                continue
+            cadet_id = key[len('status_'):]
+            if not cadet_id.isdigit() or status not in valid_statuses:
+                invalid += 1
+                continue
+            submitted[int(cadet_id)] = (status, request.POST.get(f'remarks_{cadet_id}', ''))
+        
+        # One query validates every cadet id against the session's unit
+        cadets = Cadet.objects.filter(unit_id=session.unit_id).only('id').in_bulk(list(submitted))
+        invalid += len(submitted) - len(cadets)
         
-        messages.success(request, 'Attendance marked successfully!')
+        officer = request.user.officer_profile if hasattr(request.user, 'officer_profile') else None
+        records = [
+            Attendance(session=session, cadet_id=cadet_id, status=status, remarks=remarks, marked_by=officer)
+            for cadet_id, (status, remarks) in submitted.items()
+            if cadet_id in cadets
+        ]
+        with transaction.atomic():
+            upsert_attendance(records, update_fields=('status', 'remarks', 'marked_by', 'updated_at'))
+        
+        messages.success(request, f'Attendance marked for {len(records)} cadets!')
+        if invalid:
+            messages.warning(request, f'{invalid} entries were skipped because the cadet or status was not valid.')
         return redirect('attendance_session_list')
     
     # Get cadets for this unit
@@ -93,16 +109,35 @@ def mark_attendance(request, session_id):
 
 @officer_required
 def attendance_session_detail(request, pk):
-    session = get_object_or_404(AttendanceSession, pk=pk)
-    attendances = Attendance.objects.filter(session=session).select_related('cadet__user')
+    session = get_object_or_404(AttendanceSession.objects.select_related('stats'), pk=pk)
+    attendances = Attendance.objects.filter(session=session).select_related('cadet__user', 'marked_by__user')
+    page = KeysetPaginator(attendances, ('marked_at', 'id')).get_page(request.GET.get('cursor'))
     stats = session.get_attendance_stats()
     
     return render(request, 'attendance/session_detail.html', {
         'session': session,
-        'attendances': attendances,
+        'attendances': page,
+        'page': page,
         'stats': stats
     })
 
+@officer_required
+def attendance_session_close(request, pk):
+    """Close a session, recording cadets without attendance as absent"""
+    session = get_object_or_404(AttendanceSession, pk=pk)
+    if request.method != 'POST':
+        return redirect('attendance_session_detail', pk=session.pk)
+    
+    # Officers can only close sessions of their own unit
+    officer = request.user.officer_profile if hasattr(request.user, 'officer_profile') else None
+    if request.user.role != 'ADMIN' and (officer is None or officer.unit_id != session.unit_id):
+        messages.error(request, 'You can only close sessions of your own unit.')
+        return redirect('attendance_session_detail', pk=session.pk)
+    
+    absent = close_session(session, marked_by=officer)
+    messages.success(request, f'Session closed. {absent} cadets without attendance were marked absent.')
+    return redirect('attendance_session_detail', pk=session.pk)
+
 @login_required
 def cadet_attendance_view(request):
     if request.user.role != 'CADET' or not hasattr(request.user, 'cadet_profile'):
@@ -110,24 +145,114 @@ def cadet_attendance_view(request):
         return redirect('dashboard')
     
     cadet = request.user.cadet_profile
-    attendance_records = Attendance.objects.filter(cadet=cadet).select_related('session').order_by('-session__date')
+    attendance_records = Attendance.objects.filter(cadet=cadet).select_related('session').order_by('-session_date')
     
-    # Calculate statistics
-    total = attendance_records.count()
-    present = attendance_records.filter(status='PRESENT').count()
-    absent = attendance_records.filter(status='ABSENT').count()
-    late = attendance_records.filter(status='LATE').count()
-    excused = attendance_records.filter(status='EXCUSED').count()
-    percentage = (present / total * 100) if total > 0 else 0
+    # Totals come from the per-year summaries rather than counting the history
+    summaries = list(cadet.attendance_summaries.all())
     
     return render(request, 'attendance/cadet_attendance.html', {
         'attendance_records': attendance_records,
-        'statistics': {
-            'total': total,
-            'present': present,
-            'absent': absent,
-            'late': late,
-            'excused': excused,
-            'percentage': round(percentage, 2)
-        }
+        'statistics': cadet_attendance_totals(cadet),
+        'summaries': summaries
+    })
+
+@officer_required
+def unit_attendance_analytics(request):
+    """Attendance trends for the officer's unit as JSON; admins choose the unit with ?unit=<id>"""
+    # pandas is only loaded when analytics are requested
+    from .analytics import get_unit_analytics
+    from units.models import Unit
+    
+    unit = None
+    unit_id = request.GET.get('unit', '')
+    if request.user.role == 'ADMIN' and unit_id.isdigit():
+        unit = get_object_or_404(Unit, pk=unit_id)
+    elif hasattr(request.user, 'officer_profile'):
+        unit = request.user.officer_profile.unit
+    
+    if unit is None:
+        return JsonResponse({'success': False, 'error': 'No unit selected'}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'unit': {'id': unit.id, 'name': unit.name},
+        **get_unit_analytics(unit)
+    })
+
+@officer_required
+def attendance_export(request):
+    """Download attendance as CSV or XLSX, filtered by unit, sessions and date range"""
+    from .exports import ExportUnavailable, csv_response, export_rows, xlsx_response
+    
+    # Officers can only export their own unit
+    unit = None
+    if request.user.role != 'ADMIN':
+        if not hasattr(request.user, 'officer_profile'):
+            messages.error(request, 'Access denied.')
+            return redirect('dashboard')
+        unit = request.user.officer_profile.unit
+    
+    if 'format' not in request.GET:
+        form = AttendanceExportForm(unit=unit, initial={'unit': unit})
+        return render(request, 'attendance/export.html', {'form': form})
+    
+    form = AttendanceExportForm(request.GET, unit=unit)
+    if not form.is_valid():
+        return render(request, 'attendance/export.html', {'form': form})
+    
+    data = form.cleaned_data
+    rows = export_rows(
+        sessions=data['sessions'],
+        unit=data['unit'] or unit,
+        date_from=data['date_from'],
+        date_to=data['date_to'],
+    )
+    filename = f"attendance-{timezone.localdate():%Y%m%d}"
+    if data['format'] == 'xlsx':
+        try:
+            return xlsx_response(rows, filename)
+        except ExportUnavailable as e:
+            messages.error(request, str(e))
+            return render(request, 'attendance/export.html', {'form': form})
+    return csv_response(rows, filename)
+
+@officer_required
+def attendance_import(request):
+    """Upload a CSV of attendance typed up from paper registers"""
+    from .imports import AttendanceImportError, import_attendance_csv
+    
+    # Officers can only import into their own unit's sessions
+    unit = None
+    if request.user.role != 'ADMIN':
+        if not hasattr(request.user, 'officer_profile'):
+            messages.error(request, 'Access denied.')
+            return redirect('dashboard')
+        unit = request.user.officer_profile.unit
+    
+    result = None
+    if request.method == 'POST':
+        form = AttendanceImportForm(request.POST, request.FILES, unit=unit)
+        if form.is_valid():
+            stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_attendance_csv(
+                    stream,
+                    session=form.cleaned_data['session'],
+                    unit=unit,
+                    marked_by=getattr(request.user, 'officer_profile', None)
+                )
+            except AttendanceImportError as e:
+                form.add_error('file', str(e))
+            else:
+                messages.success(request, f'Imported {result.imported} out of {result.rows} rows.')
+                if result.errors:
+                    messages.warning(request, f'{result.skipped} rows were skipped; see the errors below.')
+    else:
+        form = AttendanceImportForm(unit=unit)
+    
+    return render(request, 'attendance/import.html', {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:MAX_IMPORT_ERRORS_SHOWN] if result else [],
+        'max_errors_shown': MAX_IMPORT_ERRORS_SHOWN
     })
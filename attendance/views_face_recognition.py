@@ -1,30 +1,29 @@
 import json
 import logging
 import base64
-import pickle
-import numpy as np
-import cv2
-import cv2
-import pickle
 from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db import OperationalError
+from django.db.models import Q
 from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.utils import timezone
 from django.core.files.base import ContentFile
 from django.db import transaction
 
 from accounts.models import Cadet
+from ncc_automation.pagination import KeysetPaginator
 from attendance.models import AttendanceSession, Attendance
-from .face_recognition.face_utils import (
-    detect_faces, get_face_encodings, find_best_match,
-    draw_face_boxes, preprocess_image, FaceRecognitionError
-)
-from .face_recognition.face_utils import is_deepface_available
-from .face_recognition.models import FaceEncoding, FaceAttendanceLog
+from attendance.services import upsert_attendance
+from .face_recognition.capabilities import is_deepface_available, probe_face_stack
+from .face_recognition.exceptions import FaceRecognitionError
+from .face_recognition.models import FaceEncoding, FaceAttendanceLog, FaceDuplicateAudit, FaceDuplicateMatch
+
+# OpenCV, NumPy, PIL and DeepFace are imported inside the views that need
+# them, so loading the URLconf does not pay for the face recognition stack.
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +44,9 @@ def face_registration_view(request, cadet_id=None):
         cadet = request.user.cadet_profile
     
     if request.method == 'POST':
+        from .face_recognition.face_utils import detect_faces, get_face_encodings, preprocess_image
+        from .face_recognition.enrollment import save_face_encoding
+        
         try:
             # Get the image data from the request
             image_data = request.FILES.get('image')
@@ -79,22 +81,8 @@ def face_registration_view(request, cadet_id=None):
                     'error': 'Could not extract face features. Please try again.'
                 }, status=400)
             
-            # Save the face encoding to the database
-            with transaction.atomic():
-                # Delete any existing face encodings for this cadet
-                FaceEncoding.objects.filter(cadet=cadet).delete()
-                
-                # Create a new face encoding
-                face_encoding = FaceEncoding(cadet=cadet)
-                face_encoding.set_encoding(face_encodings[0])
-                
-                # Save a thumbnail of the face
-                top, right, bottom, left = face_locations[0]
-                face_image = rgb_image[top:bottom, left:right]
-                face_encoding.save_face_thumbnail(face_image)
-                
-                # Save the face encoding
-                face_encoding.save()
+            # Save the face encoding to the database, replacing any existing one
+            face_encoding = save_face_encoding(cadet, face_encodings[0], rgb_image, face_locations[0])
             
             return JsonResponse({
                 'success': True,
@@ -154,11 +142,42 @@ def face_attendance_view(request, session_id=None):
     context['deepface_available'] = is_deepface_available()
     return render(request, 'attendance/face_attendance.html', context)
 
+def _already_marked_response(entry, confidence):
+    """Response for a cadet recognized again while still in the cooldown"""
+    marked_at = entry.marked_at.strftime('%H:%M')
+    name = entry.details.get('cadet_name', 'Cadet')
+    return JsonResponse({
+        'success': True,
+        'already_marked': True,
+        'cadet_id': entry.cadet_id,
+        'cadet_name': name,
+        'enrollment_number': entry.details.get('enrollment_number', ''),
+        'thumbnail_url': entry.details.get('thumbnail_url', ''),
+        'confidence': confidence,
+        'marked_at': marked_at,
+        'message': f'{name} already marked at {marked_at}'
+    })
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @login_required
 def process_face_attendance(request, session_id):
     """API endpoint to process face attendance"""
+    # Answer from the cached probe rather than failing deep inside the import chain
+    if not is_deepface_available():
+        return JsonResponse({
+            'success': False,
+            'error': 'deepface_unavailable',
+            'message': probe_face_stack().error or 'Face recognition is not available on the server.'
+        }, status=503)
+    
+    import cv2
+    import numpy as np
+    from .face_recognition.face_utils import detect_faces, get_face_encodings, find_best_match
+    from .face_recognition.gallery_cache import get_gallery_cache
+    from .face_recognition.log_buffer import log_face_attempt
+    from .face_recognition.cooldown import get_cooldown
+    
     try:
         # Get the session
         session = get_object_or_404(AttendanceSession, id=session_id, is_active=True)
@@ -200,8 +219,10 @@ def process_face_attendance(request, session_id):
         
         # Detect faces
         face_locations, _ = detect_faces(rgb_image)
+        ip_address = request.META.get('REMOTE_ADDR', '')
         
         if not face_locations:
+            log_face_attempt(session=session, status='NONE', ip_address=ip_address or None)
             return JsonResponse({
                 'success': False,
                 'error': 'no_face',
@@ -209,6 +230,7 @@ def process_face_attendance(request, session_id):
             })
         
         if len(face_locations) > 1:
+            log_face_attempt(session=session, status='MULTIPLE', ip_address=ip_address or None)
             return JsonResponse({
                 'success': False,
                 'error': 'multiple_faces',
@@ -225,13 +247,31 @@ def process_face_attendance(request, session_id):
                 'message': 'Could not process face features. Please try again.'
             })
         
-        # Get all face encodings for cadets in this unit
-        cadet_encodings = FaceEncoding.objects.filter(
-            cadet__unit=session.unit,
-            is_active=True
-        ).select_related('cadet')
+        # A frame nearly identical to a cadet matched moments ago skips the gallery scan
+        cooldown = get_cooldown()
+        recent = cooldown.match_probe(session.id, face_encodings[0])
+        if recent:
+            entry, distance = recent
+            log_face_attempt(
+                session=session,
+                cadet_id=entry.cadet_id,
+                status='SUCCESS',
+                confidence=1.0 - distance,
+                ip_address=ip_address or None
+            )
+            return _already_marked_response(entry, 1.0 - distance)
+        
+        # Match against the unit's cached gallery of known encodings
+        with get_gallery_cache().gallery(session.unit_id) as gallery:
+            registered_faces = len(gallery)
+            best_match_index, confidence = find_best_match(
+                gallery,
+                face_encodings[0],
+                threshold=FACE_MATCH_THRESHOLD
+            )
+            matched_cadet_id = gallery.ids[best_match_index] if best_match_index is not None else None
         
-        if not cadet_encodings.exists():
+        if not registered_faces:
             return JsonResponse({
                 'success': False,
                 'error': 'no_registered_faces',
@@ -241,30 +281,27 @@ def process_face_attendance(request, session_id):
         # Simulation mode - useful for local testing without deepface installed
         if settings.DEBUG and getattr(settings, 'FACE_RECOG_SIMULATE', False):
             # Choose the first cadet as a simulated match
-            simulated_cadet = cadet_encodings.first().cadet
+            simulated_encoding = FaceEncoding.objects.filter(
+                cadet__unit=session.unit,
+                is_active=True
+            ).select_related('cadet__user').first()
+            simulated_cadet = simulated_encoding.cadet if simulated_encoding else None
             if simulated_cadet:
-                attendance, created = Attendance.objects.get_or_create(
+                upsert_attendance([Attendance(
                     session=session,
                     cadet=simulated_cadet,
-                    defaults={
-                        'status': 'PRESENT',
-                        'marked_by': request.user.officer_profile if hasattr(request.user, 'officer_profile') else None,
-                        'check_in_time': timezone.now(),
-                        'remarks': 'Simulated via face recognition (DEBUG)'
-                    }
-                )
-                if not created:
-                    attendance.status = 'PRESENT'
-                    attendance.check_in_time = timezone.now()
-                    attendance.remarks = 'Simulated via face recognition (DEBUG)'
-                    attendance.save()
+                    status='PRESENT',
+                    marked_by=request.user.officer_profile if hasattr(request.user, 'officer_profile') else None,
+                    check_in_time=timezone.localtime().time(),
+                    remarks='Simulated via face recognition (DEBUG)'
+                )])
 
-                FaceAttendanceLog.objects.create(
+                log_face_attempt(
                     session=session,
                     cadet=simulated_cadet,
                     status='SUCCESS',
                     confidence=0.99,
-                    ip_address=request.META.get('REMOTE_ADDR','')
+                    ip_address=ip_address or None
                 )
 
                 return JsonResponse({
@@ -276,53 +313,35 @@ def process_face_attendance(request, session_id):
                     'message': f'Attendance marked for {simulated_cadet.user.get_full_name()} (simulated)'
                 })
         
-        # Convert encodings to numpy arrays
-        known_face_encodings = [
-            pickle.loads(encoding.encoding) 
-            for encoding in cadet_encodings
-        ]
+        matched_cadet = None
+        if matched_cadet_id is not None:
+            matched_cadet = Cadet.objects.select_related('user', 'face_encoding').filter(pk=matched_cadet_id).first()
         
-        # Find the best match
-        best_match_index, confidence = find_best_match(
-            known_face_encodings,
-            face_encodings[0],
-            threshold=FACE_MATCH_THRESHOLD
-        )
-        
-        # Log the attendance attempt
-        ip_address = request.META.get('REMOTE_ADDR', '')
-        
-        if best_match_index is not None:
-            # Ensure integer indexing for Django QuerySets (convert numpy types)
-            idx = int(best_match_index)
-            matched_cadet = cadet_encodings[idx].cadet
-            
-            # Check if attendance is already marked for this cadet and session
-            attendance, created = Attendance.objects.get_or_create(
+        if matched_cadet is not None:
+            # Log successful recognition
+            log_face_attempt(
                 session=session,
                 cadet=matched_cadet,
-                defaults={
-                    'status': 'PRESENT',
-                    'marked_by': request.user.officer_profile if hasattr(request.user, 'officer_profile') else None,
-                    'check_in_time': timezone.now(),
-                    'remarks': 'Marked via face recognition'
-                }
+                status='SUCCESS',
+                confidence=confidence,
+                ip_address=ip_address or None
             )
             
-            if not created:
-                attendance.status = 'PRESENT'
-                attendance.check_in_time = timezone.now()
-                attendance.remarks = 'Updated via face recognition'
-                attendance.save()
+            # Repeat recognitions within the cooldown do not write the row again
+            entry = cooldown.get(session.id, matched_cadet.id)
+            if entry is not None:
+                cooldown.remember(session.id, matched_cadet.id, entry.marked_at, embedding=face_encodings[0])
+                return _already_marked_response(entry, confidence)
             
-            # Log successful recognition
-            FaceAttendanceLog.objects.create(
+            # Insert or update the attendance row in a single statement
+            upsert_attendance([Attendance(
                 session=session,
                 cadet=matched_cadet,
-                status='SUCCESS',
-                confidence=confidence,
-                ip_address=ip_address
-            )
+                status='PRESENT',
+                marked_by=request.user.officer_profile if hasattr(request.user, 'officer_profile') else None,
+                check_in_time=timezone.localtime().time(),
+                remarks='Marked via face recognition'
+            )])
             
             # Prepare thumbnail url if available
             thumbnail_url = ''
@@ -330,6 +349,16 @@ def process_face_attendance(request, session_id):
                 thumbnail_url = matched_cadet.face_encoding.face_thumbnail.url if matched_cadet.face_encoding.face_thumbnail else ''
             except Exception:
                 thumbnail_url = ''
+            
+            cooldown.remember(
+                session.id, matched_cadet.id, timezone.localtime(),
+                embedding=face_encodings[0],
+                details={
+                    'cadet_name': matched_cadet.user.get_full_name(),
+                    'enrollment_number': matched_cadet.enrollment_number,
+                    'thumbnail_url': thumbnail_url,
+                }
+            )
 
             return JsonResponse({
                 'success': True,
@@ -343,10 +372,10 @@ def process_face_attendance(request, session_id):
         
         else:
             # Log failed recognition
-            FaceAttendanceLog.objects.create(
+            log_face_attempt(
                 session=session,
                 status='UNKNOWN',
-                ip_address=ip_address
+                ip_address=ip_address or None
             )
             
             return JsonResponse({
@@ -370,6 +399,53 @@ def process_face_attendance(request, session_id):
             'message': 'An error occurred while processing your request.'
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@login_required
+def process_face_attendance_batch(request, session_id):
+    """API endpoint to process a batch of captures queued by an offline kiosk"""
+    from .face_recognition.batch import CaptureBatchError, read_capture_batch, process_capture_batch
+    
+    session = get_object_or_404(AttendanceSession, id=session_id)
+    if not (request.user.is_staff or request.user == session.created_by.user or (hasattr(request.user, 'officer_profile') and request.user.officer_profile.unit == session.unit)):
+        return JsonResponse({'success': False, 'error': 'unauthorized', 'message': 'You are not authorized to mark attendance for this session.'}, status=403)
+    
+    if not is_deepface_available():
+        return JsonResponse({
+            'success': False,
+            'error': 'deepface_unavailable',
+            'message': 'Face recognition is not available on the server.'
+        }, status=503)
+    
+    try:
+        captures = read_capture_batch(request)
+    except CaptureBatchError as e:
+        return JsonResponse({'success': False, 'error': 'invalid_batch', 'message': str(e)}, status=400)
+    
+    try:
+        results = process_capture_batch(
+            session,
+            captures,
+            marked_by=request.user.officer_profile if hasattr(request.user, 'officer_profile') else None,
+            ip_address=request.META.get('REMOTE_ADDR', ''),
+            threshold=FACE_MATCH_THRESHOLD
+        )
+    except Exception as e:
+        logger.error(f"Error processing face attendance batch: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': 'server_error',
+            'message': 'An error occurred while processing your request.'
+        }, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        'processed': sum(1 for result in results if not result['replayed']),
+        'replayed': sum(1 for result in results if result['replayed']),
+        'marked': sum(1 for result in results if result['success']),
+        'results': results
+    })
+
 @login_required
 def face_management_view(request):
     """View for managing registered faces"""
@@ -413,11 +489,48 @@ def face_management_view(request):
     context = {
         'cadets_with_faces': cadets_with_faces,
         'cadets_without_faces': cadets_without_faces,
-        'unit': unit
+        'unit': unit,
+        'face_stack': probe_face_stack()
     }
     
     return render(request, 'attendance/face_management.html', context)
 
+@login_required
+def face_duplicates_view(request):
+    """Report of face registrations that appear to belong to the same person"""
+    if not (request.user.is_staff or hasattr(request.user, 'officer_profile')):
+        return HttpResponse("You are not authorized to access this page.", status=403)
+    
+    unit = None
+    if hasattr(request.user, 'officer_profile'):
+        unit = request.user.officer_profile.unit
+    
+    matches = FaceDuplicateMatch.objects.select_related(
+        'cadet_a__user', 'cadet_a__unit', 'cadet_a__face_encoding',
+        'cadet_b__user', 'cadet_b__unit', 'cadet_b__face_encoding'
+    )
+    if unit:
+        matches = matches.filter(Q(cadet_a__unit=unit) | Q(cadet_b__unit=unit))
+    
+    # Mark a pair as reviewed
+    if request.method == 'POST':
+        match_id = request.POST.get('match_id', '')
+        if not match_id.isdigit():
+            return HttpResponseBadRequest('Invalid match id.')
+        matches.filter(id=match_id).update(is_reviewed=True)
+        return redirect('face_duplicates')
+    
+    if request.GET.get('show') != 'all':
+        matches = matches.filter(is_reviewed=False)
+    
+    context = {
+        'matches': matches,
+        'last_audit': FaceDuplicateAudit.objects.filter(finished_at__isnull=False).first(),
+        'show_all': request.GET.get('show') == 'all',
+        'unit': unit
+    }
+    return render(request, 'attendance/face_duplicates.html', context)
+
 @login_required
 def delete_face_encoding(request, cadet_id):
     """Delete a face encoding"""
@@ -440,13 +553,32 @@ def delete_face_encoding(request, cadet_id):
         'message': 'Face encoding deleted successfully.'
     })
 
+@login_required
+def face_capabilities_view(request):
+    """Report the face recognition stack; POST probes it again after installing dependencies"""
+    if not (request.user.is_staff or hasattr(request.user, 'officer_profile')):
+        return JsonResponse({'success': False, 'error': 'You are not authorized to perform this action.'}, status=403)
+    
+    if request.method == 'POST':
+        report = probe_face_stack(refresh=True)
+        if 'application/json' not in request.headers.get('Accept', ''):
+            if report.available:
+                messages.success(request, 'Face recognition is available.')
+            else:
+                messages.warning(request, f'Face recognition is still unavailable: {report.error}')
+            return redirect('face_management')
+    else:
+        report = probe_face_stack()
+    
+    return JsonResponse({'success': True, **report.as_dict()})
+
 @login_required
 def attendance_logs_view(request, session_id=None):
     """View for viewing attendance logs"""
     # If session_id is provided, get logs for that session
     if session_id:
         session = get_object_or_404(AttendanceSession, id=session_id)
-        logs = FaceAttendanceLog.objects.filter(session=session).order_by('-created_at')
+        logs = FaceAttendanceLog.objects.filter(session=session)
     else:
         # Otherwise, get logs for the most recent session
         latest_session = AttendanceSession.objects.filter(
@@ -454,14 +586,16 @@ def attendance_logs_view(request, session_id=None):
         ).order_by('-date', '-start_time').first()
         
         if latest_session:
-            logs = FaceAttendanceLog.objects.filter(
-                session=latest_session
-            ).order_by('-created_at')
+            logs = FaceAttendanceLog.objects.filter(session=latest_session)
         else:
             logs = FaceAttendanceLog.objects.none()
     
+    logs = logs.select_related('cadet__user')
+    page = KeysetPaginator(logs, ('-captured_at', '-id')).get_page(request.GET.get('cursor'))
+    
     context = {
-        'logs': logs,
+        'logs': page,
+        'page': page,
         'session': session if session_id else latest_session
     }
     
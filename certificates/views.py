@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from accounts.decorators import officer_required
+from ncc_automation.pagination import KeysetPaginator
 from .models import Certificate
 from .forms import CertificateForm
 
@@ -31,8 +32,11 @@ def certificate_list(request):
     if status:
         certificates = certificates.filter(status=status)
     
+    page = KeysetPaginator(certificates, ('-issued_date', '-id')).get_page(request.GET.get('cursor'))
+    
     context = {
-        'certificates': certificates,
+        'certificates': page,
+        'page': page,
         'certificate_types': Certificate.CERTIFICATE_TYPE_CHOICES,
         'statuses': Certificate.STATUS_CHOICES,
     }
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Event, EventRegistration
+from .services import refresh_claimed_places
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -17,4 +18,18 @@ class EventRegistrationAdmin(admin.ModelAdmin):
     search_fields = ['cadet__user__first_name', 'cadet__user__last_name', 
                     'event__title']
     date_hierarchy = 'registration_date'
-    raw_id_fields = ['event', 'cadet', 'approved_by']
\ No newline at end of file
+    raw_id_fields = ['event', 'cadet', 'approved_by']
+
+    # Edits here bypass events.services, so recount the places they may have freed or taken
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_claimed_places([obj.event_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_claimed_places([obj.event_id])
+
+    def delete_queryset(self, request, queryset):
+        event_ids = set(queryset.values_list('event_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_claimed_places(event_ids)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('events', '0002_eventannouncement_eventparticipation_eventresource_and_more'),
+        ('units', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['unit', 'start_date', 'created_at'], name='events_unit_id_30a53b_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_claimed_places(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventRegistration = apps.get_model('events', 'EventRegistration')
+    claimed = EventRegistration.objects.filter(
+        event=OuterRef('pk'), status__in=['APPROVED', 'PENDING']
+    ).order_by().values('event').annotate(count=Count('id')).values('count')
+    Event.objects.update(claimed_places=Coalesce(Subquery(claimed), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='claimed_places',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_claimed_places, migrations.RunPython.noop),
+    ]
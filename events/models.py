@@ -1,8 +1,39 @@
-from django.db import models
+import re
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Length
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+# Room kept after the title part of an event slug for "-<number>"
+SLUG_SUFFIX_LENGTH = 7
+SLUG_RETRIES = 5
+
+# Registrations that hold or claim a place
+ACTIVE_REGISTRATION_STATUSES = ('APPROVED', 'PENDING')
+
+
+class EventQuerySet(models.QuerySet):
+    def with_registration_counts(self):
+        """
+        Annotate every event with its registration counts in the same query
+
+        Adds ``<status>_count`` for each registration status (approved_count,
+        pending_count, ...) and ``registration_count`` for approved plus pending.
+        """
+        counts = {
+            f'{status.lower()}_count': models.Count(
+                'registrations', filter=models.Q(registrations__status=status)
+            )
+            for status, _ in EventRegistration.REGISTRATION_STATUS_CHOICES
+        }
+        counts['registration_count'] = models.Count(
+            'registrations', filter=models.Q(registrations__status__in=ACTIVE_REGISTRATION_STATUSES)
+        )
+        return self.annotate(**counts)
+
+
 class Event(models.Model):
     EVENT_TYPE_CHOICES = (
         ('DRILL', 'Drill Practice'),
@@ -61,6 +92,9 @@ class Event(models.Model):
     # Participation
     max_participants = models.IntegerField(blank=True, null=True)
     min_participants = models.IntegerField(default=0)
+    # Pending plus approved registrations, kept by events.services so that
+    # registering needs no COUNT; shared by every worker process
+    claimed_places = models.PositiveIntegerField(default=0, editable=False)
     is_mandatory = models.BooleanField(default=False)
     required_rank = models.CharField(max_length=10, blank=True, null=True)
     
@@ -76,6 +110,8 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, related_name='created_events')
+
+    objects = EventQuerySet.as_manager()
     
     class Meta:
         db_table = 'events'
@@ -84,37 +120,67 @@ class Event(models.Model):
             models.Index(fields=['status', 'start_date']),
             models.Index(fields=['unit', 'status']),
             models.Index(fields=['event_type']),
+            models.Index(fields=['unit', 'start_date', 'created_at']),
         ]
     
     def save(self, *args, **kwargs):
-        # Generate unique slug
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            
-            # Check if slug exists, if yes, append number
-            while Event.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
         
-        super().save(*args, **kwargs)
-
+        # Another request can take the same slug between the lookup and the
+        # insert; the unique constraint catches that and we pick again
+        base_slug = self._base_slug()
+        for attempt in range(SLUG_RETRIES):
+            self.slug = self._next_slug(base_slug)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                taken = Event.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                self.slug = ''
+                if not taken or attempt == SLUG_RETRIES - 1:
+                    raise
+    
+    def _base_slug(self):
+        # Leave room for a numeric suffix within the column length
+        max_length = self._meta.get_field('slug').max_length - SLUG_SUFFIX_LENGTH
+        return slugify(self.title)[:max_length].strip('-') or 'event'
+    
+    @staticmethod
+    def _next_slug(base_slug):
+        """
+        Return base_slug, or base_slug-N with N one above the highest suffix in use
 
+        A single query returns the longest and then greatest matching slug,
+        which carries the highest suffix, however many events share the title.
+        """
+        latest = Event.objects.filter(
+            slug__startswith=base_slug,
+            slug__regex=rf'^{re.escape(base_slug)}(-[0-9]+)?$'
+        ).order_by(Length('slug').desc(), '-slug').values_list('slug', flat=True).first()
+        if latest is None:
+            return base_slug
+        suffix = latest[len(base_slug) + 1:]
+        return f"{base_slug}-{int(suffix) + 1 if suffix else 1}"
 
     def __str__(self):
         return self.title
     
     def get_registration_count(self):
-        return self.registrations.filter(status__in=['APPROVED', 'PENDING']).count()
+        # Annotated by Event.objects.with_registration_counts()
+        if hasattr(self, 'registration_count'):
+            return self.registration_count
+        return self.registrations.filter(status__in=ACTIVE_REGISTRATION_STATUSES).count()
     
     def get_approved_count(self):
+        if hasattr(self, 'approved_count'):
+            return self.approved_count
         return self.registrations.filter(status='APPROVED').count()
     
-    def can_register(self):
-        """Check if registration is currently open"""
+    def is_registration_open(self):
+        """Whether registration is open by status and dates, without counting registrations"""
         if self.status != 'REGISTRATION_OPEN':
             return False
         
@@ -126,8 +192,18 @@ class Event(models.Model):
         if self.registration_end_date and today > self.registration_end_date:
             return False
         
+        return True
+    
+    def can_register(self):
+        """Check if registration is currently open"""
+        if not self.is_registration_open():
+            return False
+        
         if self.max_participants:
-            if self.get_approved_count() >= self.max_participants:
+            # Pending registrations hold a place too; once all are taken, new
+            # registrations go on the waitlist. Uses the registration_count
+            # annotation when the event has one.
+            if self.get_registration_count() >= self.max_participants:
                 return False
         
         return True
@@ -0,0 +1,365 @@
+"""
+Write paths for event registrations shared by the views.
+
+Approving a registration is check-then-write: count the approved places,
+then approve if one is free. Two officers doing this at once could both
+see the last free place, so decisions run in a transaction that first
+locks the event row; the count is taken only once the lock is held.
+
+The same lock serializes waitlist promotion, so concurrent cancellations
+each see the places the others freed and no waitlisted cadet is promoted
+twice or past capacity.
+
+Registration itself takes no lock, as hundreds of cadets register within
+a minute when a popular camp opens. The (event, cadet) unique constraint
+rejects duplicates instead of a lookup beforehand, and a place is claimed
+with one conditional UPDATE of Event.claimed_places rather than a COUNT
+per request. Every other status change recounts that column under the
+event lock. The count only decides between PENDING and WAITLIST; the
+approval lock above still enforces capacity.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+from .models import ACTIVE_REGISTRATION_STATUSES, Event, EventParticipation, EventRegistration
+
+REGISTRATION_ACTIONS = ('approve', 'reject', 'waitlist')
+
+# Statuses a registration can be moved out of by an officer's decision
+DECIDABLE_STATUSES = ('PENDING', 'APPROVED', 'WAITLIST')
+
+# Statuses a cadet can cancel from
+CANCELLABLE_STATUSES = ('PENDING', 'APPROVED', 'WAITLIST')
+
+# Events whose waitlist is no longer promoted
+CLOSED_EVENT_STATUSES = ('COMPLETED', 'CANCELLED')
+
+
+class RegistrationDecision:
+    """Outcome of one approve/reject/waitlist request"""
+
+    def __init__(self, action):
+        self.action = action
+        self.updated = []
+        self.over_capacity = []
+        self.skipped = 0
+
+    def __repr__(self):
+        return (f"<RegistrationDecision {self.action}: {len(self.updated)} updated, "
+                f"{len(self.over_capacity)} over capacity, {self.skipped} skipped>")
+
+
+def lock_event(event_id):
+    """
+    Lock an event row until the end of the current transaction and return it
+
+    Uses SELECT ... FOR UPDATE where the database supports it. SQLite has no
+    row locks, so a no-op UPDATE takes its database write lock instead.
+    """
+    if connection.features.has_select_for_update:
+        return Event.objects.select_for_update().get(pk=event_id)
+    Event.objects.filter(pk=event_id).update(max_participants=F('max_participants'))
+    return Event.objects.get(pk=event_id)
+
+
+def refresh_claimed_places(event_ids):
+    """Recount Event.claimed_places of the given events from their registrations"""
+    claimed = EventRegistration.objects.filter(
+        event=OuterRef('pk'), status__in=ACTIVE_REGISTRATION_STATUSES
+    ).order_by().values('event').annotate(count=Count('id')).values('count')
+    Event.objects.filter(pk__in=event_ids).update(claimed_places=Coalesce(Subquery(claimed), 0))
+
+
+def register_cadet(event, cadet):
+    """
+    Register a cadet for an event, on the waitlist if its places are all claimed
+
+    The row is inserted first and only a new registration claims a place,
+    so repeated submits by one cadet cannot crowd others onto the waitlist.
+    The claim is a single UPDATE ... WHERE claimed_places < max_participants,
+    which cannot hand out more places than the event has.
+
+    Args:
+        event: Event with registration open
+        cadet: Cadet registering
+
+    Returns:
+        EventRegistration, or None if the cadet was already registered
+    """
+    try:
+        with transaction.atomic():
+            registration = EventRegistration.objects.create(
+                event=event, cadet=cadet, status='WAITLIST' if event.max_participants else 'PENDING'
+            )
+            if event.max_participants:
+                claimed = Event.objects.filter(
+                    pk=event.pk, claimed_places__lt=F('max_participants')
+                ).update(claimed_places=F('claimed_places') + 1)
+                if claimed:
+                    EventRegistration.objects.filter(pk=registration.pk).update(status='PENDING')
+                    registration.status = 'PENDING'
+    except IntegrityError:
+        return None
+    return registration
+
+
+def registration_status_counts(event):
+    """Return {'total': n, 'pending': n, 'approved': n, ...} for an event with one aggregate"""
+    counts = {
+        status.lower(): Count('id', filter=Q(status=status))
+        for status, _ in EventRegistration.REGISTRATION_STATUS_CHOICES
+    }
+    return EventRegistration.objects.filter(event=event).aggregate(total=Count('id'), **counts)
+
+
+def decide_registrations(event, registration_ids, action, officer=None, reason=''):
+    """
+    Approve, reject or waitlist registrations of an event
+
+    Registrations are approved oldest first until the event is full; the
+    rest are left unchanged and reported in ``over_capacity``. Registrations
+    of other events, or already cancelled or rejected, are skipped.
+
+    Args:
+        event: Event the registrations belong to
+        registration_ids: Ids of the registrations to decide
+        action: One of REGISTRATION_ACTIONS
+        officer: Officer recorded as approving
+        reason: Rejection reason
+
+    Returns:
+        RegistrationDecision
+    """
+    if action not in REGISTRATION_ACTIONS:
+        raise ValueError(f'Unknown registration action "{action}"')
+    registration_ids = {int(registration_id) for registration_id in registration_ids}
+    decision = RegistrationDecision(action)
+
+    with transaction.atomic():
+        event = lock_event(event.pk)
+        registrations = list(
+            EventRegistration.objects.filter(
+                event=event, id__in=registration_ids, status__in=DECIDABLE_STATUSES
+            ).select_related('cadet__user').order_by('registration_date', 'id')
+        )
+        decision.skipped = len(registration_ids) - len(registrations)
+
+        if action == 'approve':
+            registrations = [registration for registration in registrations if registration.status != 'APPROVED']
+            if event.max_participants:
+                approved = EventRegistration.objects.filter(event=event, status='APPROVED').count()
+                free = max(event.max_participants - approved, 0)
+                registrations, decision.over_capacity = registrations[:free], registrations[free:]
+            changes = {'status': 'APPROVED', 'approved_by': officer, 'approval_date': timezone.now()}
+        elif action == 'reject':
+            changes = {'status': 'REJECTED', 'rejection_reason': reason}
+        else:
+            changes = {'status': 'WAITLIST'}
+
+        # Rejecting a pending or approved cadet frees their place; moving them
+        # to the waitlist does not, or they would be promoted straight back
+        freed = action == 'reject' and any(
+            registration.status in ACTIVE_REGISTRATION_STATUSES for registration in registrations
+        )
+        if registrations:
+            EventRegistration.objects.filter(id__in=[registration.id for registration in registrations]).update(**changes)
+        for registration in registrations:
+            for field, value in changes.items():
+                setattr(registration, field, value)
+        decision.updated = registrations
+
+        if freed:
+            _promote_waitlist(event)
+        refresh_claimed_places([event.pk])
+
+    return decision
+
+
+def cancel_registration(registration):
+    """
+    Cancel a registration, promoting the waitlist if it held a place
+
+    Returns:
+        bool: False if the registration was no longer cancellable
+    """
+    with transaction.atomic():
+        event = lock_event(registration.event_id)
+        status = EventRegistration.objects.filter(pk=registration.pk).values_list('status', flat=True).first()
+        if status not in CANCELLABLE_STATUSES:
+            return False
+        EventRegistration.objects.filter(pk=registration.pk).update(status='CANCELLED')
+        registration.status = 'CANCELLED'
+        if status in ACTIVE_REGISTRATION_STATUSES:
+            refresh_claimed_places([event.pk])
+            _promote_waitlist(event)
+    return True
+
+
+def promote_waitlist(event):
+    """
+    Approve waitlisted registrations, oldest first, into the event's free places
+
+    Safe to call at any time, e.g. after the capacity was raised: when
+    there are no free places or nobody waiting, it changes nothing.
+    Promoted cadets are notified with one bulk insert.
+
+    Returns:
+        list: The promoted EventRegistration instances
+    """
+    with transaction.atomic():
+        return _promote_waitlist(lock_event(event.pk))
+
+
+def _promote_waitlist(event):
+    """promote_waitlist() for an event the caller has locked"""
+    if not event.max_participants or event.status in CLOSED_EVENT_STATUSES:
+        # Without a capacity, waitlisting is an officer's decision, not a queue
+        return []
+    # Pending registrations keep their claim on a place
+    claimed = EventRegistration.objects.filter(event=event, status__in=ACTIVE_REGISTRATION_STATUSES).count()
+    free = event.max_participants - claimed
+    if free <= 0:
+        return []
+
+    promoted = list(
+        EventRegistration.objects.filter(event=event, status='WAITLIST')
+        .select_related('cadet__user').order_by('registration_date', 'id')[:free]
+    )
+    if not promoted:
+        return []
+    now = timezone.now()
+    EventRegistration.objects.filter(
+        id__in=[registration.id for registration in promoted], status='WAITLIST'
+    ).update(status='APPROVED', approval_date=now)
+
+    url = reverse('event_detail', args=[event.slug])
+    notifications = []
+    for registration in promoted:
+        registration.status = 'APPROVED'
+        registration.approval_date = now
+        notifications.append(Notification(
+            title=f'Registration approved: {event.title}',
+            message=f'A place has opened up for "{event.title}" and your waitlisted registration has been approved.',
+            notification_type='REGISTRATION',
+            priority='HIGH',
+            recipient=registration.cadet.user,
+            event=event,
+            action_url=url,
+        ))
+    Notification.objects.bulk_create(notifications)
+    refresh_claimed_places([event.pk])
+    return promoted
+
+
+class ParticipationResult:
+    """Counts and per-row errors of one participation save"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def add_error(self, registration, message):
+        self.errors.append((registration, message))
+
+    def __repr__(self):
+        return f"<ParticipationResult {self.created} created, {self.updated} updated, {len(self.errors)} errors>"
+
+
+def _parse_participation(row):
+    """Return the EventParticipation field values of a submitted row, or raise ValueError"""
+    statuses = dict(EventParticipation.PARTICIPATION_STATUS_CHOICES)
+    if row['attendance'] not in statuses:
+        raise ValueError(f'Invalid attendance status "{row["attendance"]}"')
+    values = {'attendance_status': row['attendance']}
+
+    rating = row.get('rating', '').strip()
+    if rating:
+        if not rating.isdigit() or not 1 <= int(rating) <= 10:
+            raise ValueError(f'Rating must be a whole number from 1 to 10, not "{rating}"')
+        values['performance_rating'] = int(rating)
+
+    position = row.get('position', '').strip()
+    if position:
+        if not position.isdigit() or int(position) < 1:
+            raise ValueError(f'Position must be a positive whole number, not "{position}"')
+        values['position'] = int(position)
+
+    award = row.get('award', '').strip()
+    if award:
+        values['award'] = award[:EventParticipation._meta.get_field('award').max_length]
+    return values
+
+
+def save_participations(registrations, rows, evaluated_by=None):
+    """
+    Create or update the participation records of many registrations at once
+
+    Existing records are taken from registrations fetched with their
+    participation, or else read with one query, and the changes are written
+    with one bulk_create and one bulk_update in a single transaction. Rows
+    without an attendance status are left alone; rows that fail validation
+    are reported and skipped, and the others are still saved. Blank
+    optional values keep what is already recorded.
+
+    Args:
+        registrations: Approved registrations on the form
+        rows: {registration id: {'attendance': str, 'rating': str, 'position': str, 'award': str}}
+        evaluated_by: Officer recorded as the evaluator
+
+    Returns:
+        ParticipationResult
+    """
+    registrations = list(registrations)
+    result = ParticipationResult()
+    # Registrations fetched with select_related('participation') need no query
+    existing = {}
+    uncached = []
+    for registration in registrations:
+        if not EventRegistration.participation.is_cached(registration):
+            uncached.append(registration)
+            continue
+        try:
+            existing[registration.id] = registration.participation
+        except EventParticipation.DoesNotExist:
+            pass
+    if uncached:
+        existing.update(
+            (participation.registration_id, participation)
+            for participation in EventParticipation.objects.filter(registration__in=uncached)
+        )
+    now = timezone.now()
+
+    to_create, to_update, changed_fields = [], [], {'attendance_status'}
+    for registration in registrations:
+        row = rows.get(registration.id)
+        if not row or not row.get('attendance'):
+            continue
+        try:
+            values = _parse_participation(row)
+        except ValueError as e:
+            result.add_error(registration, str(e))
+            continue
+        if evaluated_by is not None:
+            values.update(evaluated_by=evaluated_by, evaluation_date=now)
+
+        participation = existing.get(registration.id)
+        if participation is None:
+            to_create.append(EventParticipation(registration=registration, **values))
+            continue
+        for field, value in values.items():
+            setattr(participation, field, value)
+        changed_fields.update(values)
+        to_update.append(participation)
+
+    with transaction.atomic():
+        EventParticipation.objects.bulk_create(to_create)
+        if to_update:
+            EventParticipation.objects.bulk_update(to_update, sorted(changed_fields))
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    return result
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import datetime
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.tests.helpers import make_cadet, make_officer, make_unit
+from notifications.models import Notification
+from units.models import Unit
+from .models import Event, EventParticipation, EventRegistration
+from .services import (
+    cancel_registration, decide_registrations, promote_waitlist, refresh_claimed_places, register_cadet,
+    registration_status_counts, save_participations,
+)
+
+
+class EventSlugTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(
+            name='Unit 1', wing='ARMY', unit_code='UNIT1', location='Test Location',
+            contact_email='unit1@example.com', contact_phone='1234567890'
+        )
+
+    def _event(self, title='Weekly Parade', **kwargs):
+        return Event(
+            title=title, description='Parade', event_type='PARADE', location='Parade Ground',
+            start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 1), unit=self.unit, **kwargs
+        )
+
+    def _create(self, title='Weekly Parade'):
+        event = self._event(title)
+        event.save()
+        return event
+
+    def test_suffixes(self):
+        self.assertEqual(self._create().slug, 'weekly-parade')
+        self.assertEqual(self._create().slug, 'weekly-parade-1')
+        self.assertEqual(self._create().slug, 'weekly-parade-2')
+        # Other titles sharing the prefix do not count
+        self.assertEqual(self._create('Weekly Parade Rehearsal').slug, 'weekly-parade-rehearsal')
+        self._event(slug='weekly-parade-10').save()
+        self.assertEqual(self._create().slug, 'weekly-parade-11')
+
+    def test_long_titles_fit_the_column(self):
+        title = 'Annual Training Camp ' * 5
+        first, second = self._create(title), self._create(title)
+        self.assertLessEqual(len(second.slug), Event._meta.get_field('slug').max_length)
+        self.assertEqual(second.slug, f'{first.slug}-1')
+
+    def test_query_count_does_not_grow_with_duplicates(self):
+        # One slug lookup, the savepoint-wrapped INSERT and the search index row,
+        # however many events share the title
+        for existing in (0, 30):
+            while Event.objects.count() < existing:
+                self._create()
+            with self.assertNumQueries(5):
+                event = self._create()
+            self.assertEqual(event.slug, f'weekly-parade-{existing}' if existing else 'weekly-parade')
+
+    def test_retries_when_a_concurrent_insert_takes_the_slug(self):
+        self._create()
+        real_next_slug = Event._next_slug
+        calls = []
+
+        def stale_next_slug(base_slug):
+            # The first lookup misses a row another request has just inserted
+            calls.append(base_slug)
+            if len(calls) == 1:
+                return 'weekly-parade'
+            return real_next_slug(base_slug)
+
+        with mock.patch.object(Event, '_next_slug', side_effect=stale_next_slug):
+            event = self._create()
+        self.assertEqual(event.slug, 'weekly-parade-1')
+        self.assertEqual(len(calls), 2)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        event = self._event()
+        event.unit_id = None
+        with self.assertRaises(IntegrityError):
+            event.save()
+        self.assertEqual(event.slug, '')
+
+
+class RegistrationCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        make_officer(cls.unit)
+        cls.cadet = make_cadet(cls.unit, 'NCC001')
+        cls.others = [make_cadet(cls.unit, f'NCC1{number:02d}') for number in range(5)]
+        cls.event = cls._event('Annual Camp', max_participants=3)
+        for cadet, status in zip(cls.others, ['APPROVED', 'APPROVED', 'PENDING', 'WAITLIST', 'CANCELLED']):
+            EventRegistration.objects.create(event=cls.event, cadet=cadet, status=status)
+
+    @classmethod
+    def _event(cls, title, **kwargs):
+        return Event.objects.create(
+            title=title, description='Camp', event_type='CAMP', location='Camp Site', status='REGISTRATION_OPEN',
+            start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 5), unit=cls.unit, **kwargs
+        )
+
+    def _add_events(self, count):
+        for number in range(count):
+            event = self._event(f'Drill {number}', max_participants=10)
+            EventRegistration.objects.create(event=event, cadet=self.others[number % 5], status='APPROVED')
+
+    def test_annotated_counts(self):
+        event = Event.objects.with_registration_counts().get(pk=self.event.pk)
+        self.assertEqual(
+            (event.approved_count, event.pending_count, event.waitlist_count,
+             event.cancelled_count, event.rejected_count, event.registration_count),
+            (2, 1, 1, 1, 0, 3)
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(event.get_approved_count(), 2)
+            self.assertEqual(event.get_registration_count(), 3)
+            # Approved and pending registrations take all three places
+            self.assertFalse(event.can_register())
+        # Unannotated events still count on demand
+        self.assertEqual(Event.objects.get(pk=self.event.pk).get_registration_count(), 3)
+
+    def test_rejecting_a_pending_registration_frees_a_place(self):
+        EventRegistration.objects.filter(event=self.event, status='PENDING').update(status='REJECTED')
+        event = Event.objects.with_registration_counts().get(pk=self.event.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(event.can_register())
+
+    def _assert_constant_queries(self, url_name, login):
+        self.client.login(username=login, password='testpass123')
+        url = reverse(url_name)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        self._add_events(8)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url)
+        self.assertEqual(len(after), len(before))
+        return response
+
+    def test_event_list_queries_do_not_grow_with_events(self):
+        response = self._assert_constant_queries('event_list', 'officer')
+        event = next(event for event in response.context['events'] if event.pk == self.event.pk)
+        self.assertEqual(event.registration_count, 3)
+
+    def test_cadet_events_queries_do_not_grow_with_events(self):
+        response = self._assert_constant_queries('cadet_events', 'ncc001')
+        self.assertEqual(len(response.context['available_events']), 9)
+        self.assertContains(response, '2\n')
+
+    def test_event_detail_reads_counts_from_the_event_query(self):
+        self.client.login(username='officer', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event_detail', args=[self.event.slug]))
+        self.assertFalse(response.context['can_register'])
+        self.assertTrue(response.context['registration_open'])
+        self.assertContains(response, '<strong>Approved:</strong> 2')
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT COUNT(')])
+
+
+class RegistrationApprovalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.event = Event.objects.create(
+            title='Annual Camp', description='Camp', event_type='CAMP', location='Camp Site',
+            status='REGISTRATION_OPEN', start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 5),
+            unit=cls.unit, max_participants=3
+        )
+        cls.registrations = [
+            EventRegistration.objects.create(event=cls.event, cadet=make_cadet(cls.unit, f'NCC{number:03d}'))
+            for number in range(5)
+        ]
+
+    def _ids(self, registrations):
+        return [registration.id for registration in registrations]
+
+    def test_bulk_approve_fills_up_to_capacity_oldest_first(self):
+        decision = decide_registrations(self.event, self._ids(self.registrations), 'approve', officer=self.officer)
+        self.assertEqual(self._ids(decision.updated), self._ids(self.registrations[:3]))
+        self.assertEqual(self._ids(decision.over_capacity), self._ids(self.registrations[3:]))
+        approved = EventRegistration.objects.filter(status='APPROVED')
+        self.assertEqual(approved.count(), 3)
+        self.assertFalse(approved.filter(approved_by__isnull=True).exists())
+        self.assertEqual(EventRegistration.objects.filter(status='PENDING').count(), 2)
+
+    def test_capacity_is_counted_under_the_lock(self):
+        # Both officers loaded the event while two places were free
+        first, second = Event.objects.get(pk=self.event.pk), Event.objects.get(pk=self.event.pk)
+        decide_registrations(first, self._ids(self.registrations[:2]), 'approve')
+        decision = decide_registrations(second, self._ids(self.registrations[2:4]), 'approve')
+        self.assertEqual(len(decision.updated), 1)
+        self.assertEqual(len(decision.over_capacity), 1)
+        self.assertEqual(EventRegistration.objects.filter(status='APPROVED').count(), 3)
+
+    def test_bulk_reject_skips_other_events_and_closed_registrations(self):
+        other_event = Event.objects.create(
+            title='Other', description='Other', event_type='CAMP', location='Camp Site',
+            start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 1), unit=self.unit
+        )
+        other = EventRegistration.objects.create(event=other_event, cadet=self.registrations[0].cadet)
+        EventRegistration.objects.filter(pk=self.registrations[1].pk).update(status='CANCELLED')
+        decision = decide_registrations(
+            self.event, self._ids(self.registrations[:3]) + [other.id], 'reject', reason='Medical'
+        )
+        self.assertEqual(self._ids(decision.updated), [self.registrations[0].id, self.registrations[2].id])
+        self.assertEqual(decision.skipped, 2)
+        self.assertEqual(
+            list(EventRegistration.objects.filter(status='REJECTED').values_list('rejection_reason', flat=True)),
+            ['Medical', 'Medical']
+        )
+
+    def test_status_counts_with_one_query(self):
+        decide_registrations(self.event, self._ids(self.registrations[:2]), 'approve')
+        decide_registrations(self.event, self._ids(self.registrations[2:3]), 'waitlist')
+        with self.assertNumQueries(1):
+            counts = registration_status_counts(self.event)
+        self.assertEqual(counts, {
+            'total': 5, 'pending': 2, 'approved': 2, 'rejected': 0, 'waitlist': 1, 'cancelled': 0
+        })
+
+    def test_view_approves_selected_registrations(self):
+        self.client.login(username='officer', password='testpass123')
+        url = reverse('event_registrations', args=[self.event.slug])
+        response = self.client.post(
+            url, {'action': 'approve', 'registration_ids': self._ids(self.registrations)}, follow=True
+        )
+        self.assertContains(response, 'Approved 3 registrations.')
+        self.assertContains(response, '2 registration(s) were not approved.')
+        self.assertEqual(response.context['stats']['approved'], 3)
+
+        response = self.client.post(url, {'action': 'reject', 'registration_id': self.registrations[4].id}, follow=True)
+        self.assertContains(response, 'Rejected registration for Cadet NCC004')
+
+        response = self.client.post(url, {'action': 'delete', 'registration_ids': self._ids(self.registrations)})
+        self.assertEqual(EventRegistration.objects.filter(status='PENDING').count(), 1)
+
+
+class WaitlistPromotionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        make_officer(cls.unit)
+        cls.event = Event.objects.create(
+            title='Annual Camp', description='Camp', event_type='CAMP', location='Camp Site',
+            status='REGISTRATION_OPEN', start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 5),
+            unit=cls.unit, max_participants=2
+        )
+        cls.approved = [
+            EventRegistration.objects.create(
+                event=cls.event, cadet=make_cadet(cls.unit, f'NCC00{number}'), status='APPROVED'
+            )
+            for number in range(2)
+        ]
+        cls.waitlist = [
+            EventRegistration.objects.create(
+                event=cls.event, cadet=make_cadet(cls.unit, f'NCC10{number}'), status='WAITLIST'
+            )
+            for number in range(3)
+        ]
+
+    def _statuses(self, registrations):
+        return [EventRegistration.objects.get(pk=registration.pk).status for registration in registrations]
+
+    def test_cancellation_promotes_oldest_waitlisted(self):
+        self.assertTrue(cancel_registration(self.approved[0]))
+        self.assertEqual(self._statuses(self.waitlist), ['APPROVED', 'WAITLIST', 'WAITLIST'])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.waitlist[0].cadet.user)
+        self.assertEqual((notification.notification_type, notification.event), ('REGISTRATION', self.event))
+
+    def test_repeated_cancellation_and_promotion_change_nothing(self):
+        cancel_registration(self.approved[0])
+        self.assertFalse(cancel_registration(EventRegistration.objects.get(pk=self.approved[0].pk)))
+        self.assertEqual(promote_waitlist(self.event), [])
+        self.assertEqual(EventRegistration.objects.filter(status='APPROVED').count(), 2)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_cancelling_a_waitlisted_registration_promotes_nobody(self):
+        cancel_registration(self.waitlist[0])
+        self.assertEqual(self._statuses(self.waitlist), ['CANCELLED', 'WAITLIST', 'WAITLIST'])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_capacity_growth_promotes_in_order_with_one_notification_insert(self):
+        Event.objects.filter(pk=self.event.pk).update(max_participants=4)
+        with CaptureQueriesContext(connection) as queries:
+            promoted = promote_waitlist(self.event)
+        self.assertEqual([registration.pk for registration in promoted], [self.waitlist[0].pk, self.waitlist[1].pk])
+        self.assertEqual(len([query for query in queries if 'INSERT INTO "notifications"' in query['sql']]), 1)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_rejecting_an_approved_registration_promotes(self):
+        decide_registrations(self.event, [self.approved[1].pk], 'reject')
+        self.assertEqual(self._statuses(self.waitlist), ['APPROVED', 'WAITLIST', 'WAITLIST'])
+        # Waitlisting an approved cadet does not free a place for someone else
+        decide_registrations(self.event, [self.approved[0].pk], 'waitlist')
+        self.assertEqual(self._statuses(self.approved + self.waitlist[:1]), ['WAITLIST', 'REJECTED', 'APPROVED'])
+
+    def test_closed_events_are_not_promoted(self):
+        Event.objects.filter(pk=self.event.pk).update(status='COMPLETED')
+        cancel_registration(self.approved[0])
+        self.assertEqual(self._statuses(self.waitlist), ['WAITLIST'] * 3)
+
+    def test_cadet_cancellation_view_promotes(self):
+        self.client.login(username='ncc000', password='testpass123')
+        url = reverse('event_cancel_registration', args=[self.approved[0].pk])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(self._statuses(self.approved[:1] + self.waitlist), ['CANCELLED', 'APPROVED', 'WAITLIST', 'WAITLIST'])
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class ParticipationSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.officer = make_officer(cls.unit)
+        cls.event = Event.objects.create(
+            title='Annual Camp', description='Camp', event_type='CAMP', location='Camp Site',
+            status='ONGOING', start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 5), unit=cls.unit
+        )
+        cls.registrations = [
+            EventRegistration.objects.create(
+                event=cls.event, cadet=make_cadet(cls.unit, f'NCC{number:03d}'), status='APPROVED'
+            )
+            for number in range(6)
+        ]
+        cls.url = reverse('event_manage_participation', args=[cls.event.slug])
+
+    def _form(self, rows):
+        data = {}
+        for registration, (attendance, rating, position, award) in zip(self.registrations, rows):
+            data.update({
+                f'attendance_{registration.id}': attendance, f'rating_{registration.id}': rating,
+                f'position_{registration.id}': position, f'award_{registration.id}': award,
+            })
+        return data
+
+    def test_rows_are_saved_in_bulk(self):
+        EventParticipation.objects.create(registration=self.registrations[0], attendance_status='ABSENT', award='Best Cadet')
+        self.client.login(username='officer', password='testpass123')
+        rows = [('ATTENDED', '9', '1', ''), ('ATTENDED', '', '', 'Gold'), ('PARTIAL', '5', '', '')] * 2
+        # Session, user, event, registrations with their participations,
+        # bulk_create, bulk_update and the savepoint pair, however many rows are submitted
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, self._form(rows))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+        participations = EventParticipation.objects.order_by('registration_id')
+        self.assertEqual(participations.count(), 6)
+        first = participations[0]
+        self.assertEqual((first.attendance_status, first.performance_rating, first.position, first.award),
+                         ('ATTENDED', 9, 1, 'Best Cadet'))
+        self.assertEqual(first.evaluated_by, self.officer)
+        self.assertFalse(participations.filter(evaluation_date__isnull=True).exists())
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = [
+            {'attendance': 'ATTENDED', 'rating': '11'},
+            {'attendance': 'LATE'},
+            {'attendance': 'ABSENT', 'position': '-1'},
+            {'attendance': ''},
+            {'attendance': 'ATTENDED', 'rating': '7', 'position': '2', 'award': 'Silver'},
+        ]
+        result = save_participations(
+            self.registrations, {registration.id: row for registration, row in zip(self.registrations, rows)}
+        )
+        self.assertEqual((result.created, result.updated), (1, 0))
+        self.assertEqual([registration.id for registration, _ in result.errors], [reg.id for reg in self.registrations[:3]])
+        self.assertIn('from 1 to 10', result.errors[0][1])
+        self.assertEqual(EventParticipation.objects.get().registration, self.registrations[4])
+
+    def test_view_shows_row_errors(self):
+        self.client.login(username='officer', password='testpass123')
+        rows = [('ATTENDED', 'ten', '', ''), ('ABSENT', '', '', '')]
+        response = self.client.post(self.url, self._form(rows), follow=True)
+        self.assertContains(response, 'NCC000: Rating must be a whole number')
+        self.assertContains(response, 'Saved 1 participation records; 1 rows were not saved.')
+
+    def test_page_shows_saved_values(self):
+        EventParticipation.objects.create(registration=self.registrations[0], attendance_status='ATTENDED', award='Best Cadet')
+        self.client.login(username='officer', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'value="Best Cadet"')
+        self.assertContains(response, 'NCC005')
+
+
+class EventRegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = make_unit()
+        cls.event = Event.objects.create(
+            title='Annual Camp', description='Camp', event_type='CAMP', location='Camp Site',
+            status='REGISTRATION_OPEN', start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 5),
+            unit=cls.unit, max_participants=2
+        )
+        cls.cadets = [make_cadet(cls.unit, f'NCC{number:03d}') for number in range(4)]
+
+    def _claimed_places(self):
+        return Event.objects.values_list('claimed_places', flat=True).get(pk=self.event.pk)
+
+    def test_overflow_is_waitlisted(self):
+        statuses = [register_cadet(self.event, cadet).status for cadet in self.cadets]
+        self.assertEqual(statuses, ['PENDING', 'PENDING', 'WAITLIST', 'WAITLIST'])
+        self.assertEqual(self._claimed_places(), 2)
+
+    def test_repeat_registration_is_rejected_by_the_constraint(self):
+        register_cadet(self.event, self.cadets[0])
+        # The failed INSERT and its savepoint, with no lookup and no claim
+        with self.assertNumQueries(4):
+            self.assertIsNone(register_cadet(self.event, self.cadets[0]))
+        self.assertEqual(register_cadet(self.event, self.cadets[1]).status, 'PENDING')
+
+    def test_places_are_claimed_without_counting(self):
+        register_cadet(self.event, self.cadets[0])
+        # Savepoint, INSERT, the claim on the event row, the update to PENDING
+        # and release; no COUNT
+        with self.assertNumQueries(5):
+            register_cadet(self.event, self.cadets[1])
+        self.assertEqual(self._claimed_places(), 2)
+
+    def test_cancelling_a_pending_registration_frees_its_place(self):
+        registrations = [register_cadet(self.event, cadet) for cadet in self.cadets[:3]]
+        cancel_registration(registrations[0])
+        # The waitlisted cadet takes the freed place
+        self.assertEqual(EventRegistration.objects.get(pk=registrations[2].pk).status, 'APPROVED')
+        self.assertEqual(self._claimed_places(), 2)
+        self.assertEqual(register_cadet(self.event, self.cadets[3]).status, 'WAITLIST')
+
+    def test_officer_decisions_recount_places(self):
+        registrations = [register_cadet(self.event, cadet) for cadet in self.cadets[:2]]
+        decide_registrations(self.event, [registrations[0].pk], 'reject')
+        self.assertEqual(self._claimed_places(), 1)
+        self.assertEqual(register_cadet(self.event, self.cadets[2]).status, 'PENDING')
+        # Places taken outside the services are picked up by a recount
+        EventRegistration.objects.filter(pk=registrations[1].pk).update(status='CANCELLED')
+        refresh_claimed_places([self.event.pk])
+        self.assertEqual(self._claimed_places(), 1)
+
+    def test_view(self):
+        self.client.login(username='ncc000', password='testpass123')
+        url = reverse('event_register', args=[self.event.slug])
+        response = self.client.get(url, follow=True)
+        self.assertContains(response, 'Awaiting approval.')
+        response = self.client.get(url, follow=True)
+        self.assertContains(response, 'You are already registered for this event.')
+
+        for cadet in self.cadets[1:3]:
+            register_cadet(self.event, cadet)
+        self.client.login(username='ncc003', password='testpass123')
+        response = self.client.get(reverse('event_detail', args=[self.event.slug]))
+        self.assertContains(response, 'Join Waitlist')
+        response = self.client.get(url, follow=True)
+        self.assertContains(response, 'You have been added to the waitlist.')
+
+
+class ConcurrentRegistrationTests(TransactionTestCase):
+    CADETS = 60
+    CAPACITY = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'in-memory SQLite fails concurrent writers at once; '
+                'run with --settings=ncc_automation.settings_file_db'
+            )
+        unit = make_unit()
+        self.event = Event.objects.create(
+            title='Annual Camp', description='Camp', event_type='CAMP', location='Camp Site',
+            status='REGISTRATION_OPEN', start_date=datetime.date(2099, 1, 1), end_date=datetime.date(2099, 1, 5),
+            unit=unit, max_participants=self.CAPACITY
+        )
+        self.cadets = [make_cadet(unit, f'NCC{number:03d}') for number in range(self.CADETS)]
+
+    def test_registration_rush(self):
+        # Every cadet registers twice, all at once
+        attempts = self.cadets * 2
+        barrier = threading.Barrier(len(attempts))
+        results, errors = [], []
+
+        def register(cadet):
+            try:
+                barrier.wait()
+                results.append(register_cadet(self.event, cadet))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=register, args=[cadet]) for cadet in attempts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len([result for result in results if result is not None]), self.CADETS)
+        self.assertEqual(EventRegistration.objects.count(), self.CADETS)
+        self.assertEqual(EventRegistration.objects.filter(status='PENDING').count(), self.CAPACITY)
+        self.assertEqual(EventRegistration.objects.filter(status='WAITLIST').count(), self.CADETS - self.CAPACITY)
@@ -2,13 +2,23 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Count, Q
 from accounts.decorators import officer_required
 from accounts.models import Cadet
+from ncc_automation.pagination import KeysetPaginator
+from search.services import search as search_objects
 from .models import Event, EventRegistration, EventParticipation, EventResource, EventAnnouncement
+from .services import (
+    REGISTRATION_ACTIONS, cancel_registration, decide_registrations, promote_waitlist, register_cadet,
+    registration_status_counts, save_participations,
+)
 from .forms import EventForm, EventResourceForm,EventAnnouncementForm, EventParticipationForm
 from events.forms import EventForm
 
+# Per-row inputs of the participation form, named "<field>_<registration id>"
+PARTICIPATION_FORM_FIELDS = ('attendance', 'rating', 'position', 'award')
+MAX_PARTICIPATION_ERRORS_SHOWN = 20
+
 
 @login_required
 def event_list(request):
@@ -39,20 +49,19 @@ def event_list(request):
     if status:
         events = events.filter(status=status)
     
+    ordering = ('-start_date', '-created_at', '-id')
     if search:
-        events = events.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search) |
-            Q(location__icontains=search)
-        )
+        # Best matches first
+        events = search_objects(events, search)
+        ordering = ('search_rank',) + ordering
     
-    # Annotate with registration count
-    events = events.select_related('unit', 'organizer__user').annotate(
-        registration_count=Count('registrations')
-    )
+    # Registration counts for every event on the page come from the same query
+    events = events.select_related('unit', 'organizer__user').with_registration_counts()
+    page = KeysetPaginator(events, ordering).get_page(request.GET.get('cursor'))
     
     context = {
-        'events': events,
+        'events': page,
+        'page': page,
         'event_types': Event.EVENT_TYPE_CHOICES,
         'statuses': Event.STATUS_CHOICES,
         'selected_type': event_type,
@@ -66,7 +75,7 @@ def event_list(request):
 @login_required
 def event_detail(request, slug):
     """Event detail view with registration option for cadets"""
-    event = get_object_or_404(Event, slug=slug)
+    event = get_object_or_404(Event.objects.with_registration_counts(), slug=slug)
     
     is_registered = False
     registration = None
@@ -99,6 +108,7 @@ def event_detail(request, slug):
         'resources': resources,
         'announcements': announcements,
         'can_register': event.can_register(),
+        'registration_open': event.is_registration_open(),
     }
     
     return render(request, 'events/event_detail.html', context)
@@ -175,10 +185,15 @@ def event_update(request, slug):
                 return redirect('event_list')
     
     if request.method == 'POST':
+        old_capacity = event.max_participants
         form = EventForm(request.POST, request.FILES, instance=event)
         if form.is_valid():
             event = form.save()
             messages.success(request, f'Event "{event.title}" updated successfully!')
+            if event.max_participants and (old_capacity is None or event.max_participants > old_capacity):
+                promoted = promote_waitlist(event)
+                if promoted:
+                    messages.info(request, f'{len(promoted)} waitlisted registration(s) were approved.')
             return redirect('event_detail', slug=event.slug)
     else:
         form = EventForm(instance=event)
@@ -215,42 +230,36 @@ def event_registrations(request, slug):
     """Manage event registrations"""
     event = get_object_or_404(Event, slug=slug)
     
-    # Handle approval/rejection
+    # Handle approval/rejection of one or many registrations
     if request.method == 'POST':
-        registration_id = request.POST.get('registration_id')
         action = request.POST.get('action')
+        registration_ids = [
+            value for value in request.POST.getlist('registration_ids') + request.POST.getlist('registration_id')
+            if value.isdigit()
+        ]
+        if action not in REGISTRATION_ACTIONS:
+            messages.error(request, 'Invalid action.')
+            return redirect('event_registrations', slug=slug)
+        if not registration_ids:
+            messages.error(request, 'Select at least one registration.')
+            return redirect('event_registrations', slug=slug)
         
-        try:
-            registration = EventRegistration.objects.get(id=registration_id, event=event)
-            
-            if action == 'approve':
-                # Check if event is full
-                if event.max_participants:
-                    approved_count = event.registrations.filter(status='APPROVED').count()
-                    if approved_count >= event.max_participants:
-                        messages.warning(request, 'Event has reached maximum participants!')
-                        return redirect('event_registrations', slug=slug)
-                
-                registration.status = 'APPROVED'
-                if hasattr(request.user, 'officer_profile'):
-                    registration.approved_by = request.user.officer_profile
-                registration.approval_date = timezone.now()
-                registration.save()
-                messages.success(request, f'Approved registration for {registration.cadet.user.get_full_name()}')
-            
-            elif action == 'reject':
-                reason = request.POST.get('reason', '')
-                registration.status = 'REJECTED'
-                registration.rejection_reason = reason
-                registration.save()
-                messages.success(request, f'Rejected registration for {registration.cadet.user.get_full_name()}')
-            
-            elif action == 'waitlist':
-                registration.status = 'WAITLIST'
-                registration.save()
-                messages.success(request, f'Moved {registration.cadet.user.get_full_name()} to waitlist')
+        officer = request.user.officer_profile if hasattr(request.user, 'officer_profile') else None
+        decision = decide_registrations(
+            event, registration_ids, action, officer=officer, reason=request.POST.get('reason', '')
+        )
         
-        except EventRegistration.DoesNotExist:
+        verb = {'approve': 'Approved', 'reject': 'Rejected', 'waitlist': 'Waitlisted'}[action]
+        if len(decision.updated) == 1:
+            messages.success(request, f'{verb} registration for {decision.updated[0].cadet.user.get_full_name()}')
+        elif decision.updated:
+            messages.success(request, f'{verb} {len(decision.updated)} registrations.')
+        if decision.over_capacity:
+            messages.warning(
+                request,
+                f'Event has reached maximum participants! {len(decision.over_capacity)} registration(s) were not approved.'
+            )
+        if not decision.updated and not decision.over_capacity:
             messages.error(request, 'Registration not found!')
         
         return redirect('event_registrations', slug=slug)
@@ -258,15 +267,8 @@ def event_registrations(request, slug):
     # Get all registrations
     registrations = event.registrations.all().select_related('cadet__user', 'cadet__unit')
     
-    # Statistics
-    stats = {
-        'total': registrations.count(),
-        'pending': registrations.filter(status='PENDING').count(),
-        'approved': registrations.filter(status='APPROVED').count(),
-        'rejected': registrations.filter(status='REJECTED').count(),
-        'waitlist': registrations.filter(status='WAITLIST').count(),
-        'cancelled': registrations.filter(status='CANCELLED').count(),
-    }
+    # Statistics, from one aggregate
+    stats = registration_status_counts(event)
     
     return render(request, 'events/event_registrations.html', {
         'event': event,
@@ -285,24 +287,21 @@ def event_register(request, slug):
     event = get_object_or_404(Event, slug=slug)
     cadet = request.user.cadet_profile
     
-    # Check if registration is allowed
-    if not event.can_register():
+    # Check if registration is allowed; a full event still takes waitlist registrations
+    if not event.is_registration_open():
         messages.error(request, 'Registration is not open for this event.')
         return redirect('event_detail', slug=slug)
     
-    # Check if already registered
-    if EventRegistration.objects.filter(event=event, cadet=cadet).exists():
+    # The unique (event, cadet) constraint catches repeat registrations
+    registration = register_cadet(event, cadet)
+    if registration is None:
         messages.warning(request, 'You are already registered for this event.')
         return redirect('event_detail', slug=slug)
     
-    # Create registration
-    registration = EventRegistration.objects.create(
-        event=event,
-        cadet=cadet,
-        status='PENDING'
-    )
-    
-    messages.success(request, f'Successfully registered for "{event.title}"! Awaiting approval.')
+    if registration.status == 'WAITLIST':
+        messages.info(request, f'"{event.title}" is full. You have been added to the waitlist.')
+    else:
+        messages.success(request, f'Successfully registered for "{event.title}"! Awaiting approval.')
     return redirect('cadet_events')
 
 
@@ -327,9 +326,11 @@ def event_cancel_registration(request, registration_id):
     
     if request.method == 'POST':
         event_title = registration.event.title
-        registration.status = 'CANCELLED'
-        registration.save()
-        messages.success(request, f'Registration for "{event_title}" cancelled successfully!')
+        # Frees the place for the first cadet on the waitlist
+        if cancel_registration(registration):
+            messages.success(request, f'Registration for "{event_title}" cancelled successfully!')
+        else:
+            messages.error(request, 'Cannot cancel this registration.')
         return redirect('cadet_events')
     
     return render(request, 'events/cancel_registration.html', {'registration': registration})
@@ -349,8 +350,12 @@ def cadet_events_view(request):
     ).select_related('event').order_by('-registration_date')
     
     # Calculate counts
-    approved_count = registrations.filter(status='APPROVED').count()
-    pending_count = registrations.filter(status='PENDING').count()
+    counts = registrations.aggregate(
+        approved=Count('id', filter=Q(status='APPROVED')),
+        pending=Count('id', filter=Q(status='PENDING')),
+    )
+    approved_count = counts['approved']
+    pending_count = counts['pending']
     
     # Get available events
     available_events = Event.objects.filter(
@@ -358,7 +363,7 @@ def cadet_events_view(request):
         status='REGISTRATION_OPEN'
     ).exclude(
         registrations__cadet=cadet
-    ).order_by('start_date')[:10]
+    ).with_registration_counts().order_by('start_date')[:10]
     
     # Get upcoming approved events
     from django.utils import timezone
@@ -383,65 +388,33 @@ def event_manage_participation(request, slug):
     """Manage event participation and attendance"""
     event = get_object_or_404(Event, slug=slug)
     
-    # Get approved registrations only
-    registrations = event.registrations.filter(status='APPROVED').select_related('cadet__user', 'cadet__unit')
+    # Get approved registrations only, with their participation records
+    registrations = event.registrations.filter(status='APPROVED').select_related(
+        'cadet__user', 'cadet__unit', 'participation'
+    )
     
     if request.method == 'POST':
-        # Bulk update participation
-        for reg in registrations:
-            attendance_status = request.POST.get(f'attendance_{reg.id}')
-            
-            if attendance_status:
-                # Get or create participation record
-                from .models import EventParticipation
-                participation, created = EventParticipation.objects.get_or_create(
-                    registration=reg,
-                    defaults={'attendance_status': attendance_status}
-                )
-                
-                if not created:
-                    participation.attendance_status = attendance_status
-                
-                # Update optional fields
-                rating = request.POST.get(f'rating_{reg.id}')
-                if rating:
-                    try:
-                        participation.performance_rating = int(rating)
-                    except (ValueError, TypeError):
-                        pass
-                
-                position = request.POST.get(f'position_{reg.id}')
-                if position:
-                    try:
-                        participation.position = int(position)
-                    except (ValueError, TypeError):
-                        pass
-                
-                award = request.POST.get(f'award_{reg.id}')
-                if award:
-                    participation.award = award
-                
-                # Set evaluator
-                if hasattr(request.user, 'officer_profile'):
-                    participation.evaluated_by = request.user.officer_profile
-                    from django.utils import timezone
-                    participation.evaluation_date = timezone.now()
-                
-                participation.save()
+        rows = {
+            reg.id: {field: request.POST.get(f'{field}_{reg.id}', '') for field in PARTICIPATION_FORM_FIELDS}
+            for reg in registrations
+        }
+        officer = request.user.officer_profile if hasattr(request.user, 'officer_profile') else None
+        result = save_participations(registrations, rows, evaluated_by=officer)
         
-        messages.success(request, 'Participation data saved successfully!')
+        for reg, error in result.errors[:MAX_PARTICIPATION_ERRORS_SHOWN]:
+            messages.error(request, f'{reg.cadet.enrollment_number}: {error}')
+        if len(result.errors) > MAX_PARTICIPATION_ERRORS_SHOWN:
+            messages.error(request, f'... and {len(result.errors) - MAX_PARTICIPATION_ERRORS_SHOWN} more rows with errors.')
+        if result.errors:
+            messages.warning(request, f'Saved {result.created + result.updated} participation records; '
+                                      f'{len(result.errors)} rows were not saved.')
+        else:
+            messages.success(request, 'Participation data saved successfully!')
         return redirect('event_manage_participation', slug=slug)
     
-    # Get existing participations
-    participations = {}
-    from .models import EventParticipation
-    for part in EventParticipation.objects.filter(registration__in=registrations):
-        participations[part.registration_id] = part
-    
     context = {
         'event': event,
         'registrations': registrations,
-        'participations': participations,
     }
     
     return render(request, 'events/event_participation.html', context)
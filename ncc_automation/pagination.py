@@ -0,0 +1,196 @@
+"""
+Keyset (seek) pagination shared by the list views.
+
+Instead of OFFSET, each page continues from the sort key of the last row
+shown: ``WHERE (date, start_time, id) < (:date, :start_time, :id)``,
+spelled out as OR-ed comparisons so it works on every backend. With an
+index on the ordering, page 500 costs the same as page 1, and rows added
+while someone is paging do not shift later pages.
+
+The position is passed between requests as an opaque ``cursor`` query
+parameter. The ordering must end in a unique field (normally ``id``) so
+that every row has a distinct key.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+PER_PAGE = 50
+
+_NEXT = 'n'
+_PREVIOUS = 'p'
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder truncates datetimes to milliseconds
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Cannot use {type(value).__name__} in a cursor')
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token cannot be decoded for this ordering"""
+    pass
+
+
+class KeysetPage:
+    """One page of rows with cursors for its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} rows>"
+
+
+class _Key:
+    """One column of the ordering"""
+
+    def __init__(self, queryset, spec):
+        self.descending = spec.startswith('-')
+        self.name = spec.lstrip('-')
+        if self.name in queryset.query.annotations:
+            # e.g. a search rank; annotations are compared through their output field
+            self.field = queryset.query.annotations[self.name].output_field
+        else:
+            self.field = queryset.model._meta.get_field(self.name)
+            if self.field.is_relation:
+                raise ValueError(f'Keyset ordering must use concrete columns, not relation "{self.name}"')
+        # NULLs always sort after every value, whichever the direction
+        self.nullable = self.field.null
+
+    def order_by(self, reverse):
+        descending = self.descending != reverse
+        if not self.nullable:
+            return f"{'-' if descending else ''}{self.name}"
+        # Reversed pages walk the same order backwards, so their NULLs come first
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        expression = F(self.name)
+        return expression.desc(**nulls) if descending else expression.asc(**nulls)
+
+    def after(self, value, reverse):
+        """Rows strictly after ``value`` on this column"""
+        nulls_last = not reverse
+        if value is None:
+            return Q(pk__in=[]) if nulls_last else Q(**{f'{self.name}__isnull': False})
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        condition = Q(**{f'{self.name}__{lookup}': value})
+        if self.nullable and nulls_last:
+            condition |= Q(**{f'{self.name}__isnull': True})
+        return condition
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.name}__isnull': True})
+        return Q(**{self.name: value})
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its sort key
+
+    Args:
+        queryset: Rows to paginate; its own ordering is replaced
+        ordering: Field or annotation names as for order_by(), ending in a unique field
+        per_page: Rows per page
+    """
+
+    def __init__(self, queryset, ordering, per_page=PER_PAGE):
+        self.queryset = queryset
+        self.keys = [_Key(queryset, spec) for spec in ordering]
+        if not self.keys[-1].field.unique:
+            raise ValueError('Keyset ordering must end in a unique field')
+        self.per_page = per_page
+
+    def _encode(self, direction, row):
+        values = [getattr(row, key.name) for key in self.keys]
+        payload = json.dumps([direction, values], default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in (_NEXT, _PREVIOUS) or len(values) != len(self.keys):
+                raise ValueError(cursor)
+            return direction, [
+                None if value is None else key.field.to_python(value)
+                for key, value in zip(self.keys, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError) as e:
+            raise InvalidCursor(str(e))
+
+    def _seek(self, values, reverse):
+        """Rows after the key ``values`` in the (possibly reversed) ordering"""
+        conditions = []
+        prefix = Q()
+        for key, value in zip(self.keys, values):
+            conditions.append(prefix & key.after(value, reverse))
+            prefix &= key.equal(value)
+        return reduce(operator.or_, conditions)
+
+    def page(self, cursor=None):
+        """
+        Return the page a cursor points to, or the first page
+
+        Raises:
+            InvalidCursor: If the cursor was not produced by this ordering
+        """
+        direction, values = self._decode(cursor) if cursor else (_NEXT, None)
+        reverse = direction == _PREVIOUS
+
+        rows = self.queryset.order_by(*(key.order_by(reverse) for key in self.keys))
+        if values is not None:
+            rows = rows.filter(self._seek(values, reverse))
+        rows = list(rows[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        # Coming back from a later page means there is always a next page
+        has_next = more if not reverse else True
+        has_previous = values is not None if not reverse else more
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(_NEXT, rows[-1]) if has_next else None,
+            previous_cursor=self._encode(_PREVIOUS, rows[0]) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Like page(), but falls back to the first page for a bad cursor"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'certificates',
     'achievements',
     'notifications',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -62,6 +63,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Writers queue for the lock instead of failing with "database is
+            # locked" when many requests write at once (e.g. registration rushes)
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -97,5 +104,20 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
+# Month in which the academic year starts; cadet attendance summaries are kept per academic year
+ACADEMIC_YEAR_START_MONTH = 7
+
 # Debugging flag for face recognition: enable simulated matches when True
-FACE_RECOG_SIMULATE = False
\ No newline at end of file
+FACE_RECOG_SIMULATE = False
+
+# Probe DeepFace in a background thread at startup instead of on the first face request
+FACE_RECOG_PROBE_AT_STARTUP = False
+
+# Face recognition attempts are logged through an in-memory buffer written in bulk
+FACE_LOG_BUFFER_ENABLED = True
+FACE_LOG_BUFFER_SIZE = 1000  # queued rows before writes fall back to synchronous
+FACE_LOG_FLUSH_SIZE = 100
+FACE_LOG_FLUSH_INTERVAL = 2.0  # seconds
+
+# Repeat recognitions of a cadet within this many seconds are not written again
+FACE_RECOG_COOLDOWN_SECONDS = 300
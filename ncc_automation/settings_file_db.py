@@ -0,0 +1,13 @@
+"""
+Settings for running the tests against a file-backed SQLite database.
+
+The default in-memory test database uses SQLite's shared cache, where
+concurrent writers fail at once instead of waiting for the lock, so the
+concurrency tests skip themselves there. Run them with:
+
+    python manage.py test --settings=ncc_automation.settings_file_db
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_bulknotification_notification_action_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at'], name='notificatio_recipie_2c3905_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.utils import timezone
 from django.db.models import Q
 from accounts.decorators import officer_required
 from accounts.models import User, Cadet
+from ncc_automation.pagination import KeysetPaginator
 from .models import Notification, BulkNotification
 
 @login_required
@@ -25,9 +26,11 @@ def notification_list(request):
         notifications = notifications.filter(is_read=True)
     
     unread_count = notifications.filter(is_read=False).count()
+    page = KeysetPaginator(notifications, ('-created_at', '-id')).get_page(request.GET.get('cursor'))
     
     context = {
-        'notifications': notifications,
+        'notifications': page,
+        'page': page,
         'unread_count': unread_count,
         'notification_types': Notification.NOTIFICATION_TYPE_CHOICES,
     }
@@ -159,7 +162,9 @@ def bulk_notification_history(request):
     if request.user.role == 'OFFICER':
         bulk_notifications = bulk_notifications.filter(sent_by=request.user)
     
+    page = KeysetPaginator(bulk_notifications.select_related('sent_by'), ('-sent_at', '-id')).get_page(request.GET.get('cursor'))
     return render(request, 'notifications/bulk_history.html', {
-        'bulk_notifications': bulk_notifications
+        'bulk_notifications': page,
+        'page': page
     })
 
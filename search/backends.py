@@ -0,0 +1,196 @@
+"""
+Storage and query backends for the full-text indexes.
+
+Every registered model gets its own index table, keyed by the object's
+primary key so single documents are replaced and deleted by key:
+
+* SQLite: an FTS5 virtual table whose rowid is the object id, ranked
+  with bm25() using per-column weights.
+* PostgreSQL: a table of weighted tsvector documents with a GIN index,
+  ranked with ts_rank().
+* Anything else, or SQLite built without FTS5: no index table, and
+  queries fall back to icontains over the indexed fields.
+
+Queries are annotated with ``search_rank``, where lower is better on
+every backend.
+"""
+import functools
+import sqlite3
+
+from django.db import connection as default_connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# bm25() column weights for the A-D field weights
+BM25_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 2.0, 'D': 1.0}
+
+# Text search configuration for PostgreSQL; 'simple' does not stem, which
+# suits names, enrollment numbers and prefix matching
+PG_SEARCH_CONFIG = 'simple'
+
+
+@functools.lru_cache(maxsize=None)
+def sqlite_has_fts5():
+    """Whether the SQLite library Python links against was built with FTS5"""
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(content)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+
+
+class FallbackBackend:
+    """Unindexed search with icontains, for databases without a full-text engine"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def outer_pk(self, model):
+        return f'{self.quote(model._meta.db_table)}.{self.quote(model._meta.pk.column)}'
+
+    def create(self, table, columns):
+        pass
+
+    def drop(self, table):
+        pass
+
+    def clear(self, table):
+        pass
+
+    def write(self, table, columns, weights, rows, replace=True):
+        pass
+
+    def delete(self, table, pks):
+        pass
+
+    def filter(self, queryset, index, terms):
+        condition = Q()
+        for term in terms:
+            matches_term = Q()
+            for path in index.paths:
+                matches_term |= Q(**{f'{path}__icontains': term})
+            condition &= matches_term
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTS5Backend(FallbackBackend):
+    def create(self, table, columns):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.quote(table)} USING fts5("
+                f"{', '.join(self.quote(column) for column in columns)}, "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+
+    def drop(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.quote(table)}')
+
+    def clear(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.quote(table)}')
+
+    def write(self, table, columns, weights, rows, replace=True):
+        rows = [(row[0], *(value or '' for value in row[1:])) for row in rows]
+        if not rows:
+            return
+        if replace:
+            # FTS5 tables have no upsert; new objects have nothing to replace
+            self.delete(table, [row[0] for row in rows])
+        names = ', '.join(['rowid', *(self.quote(column) for column in columns)])
+        placeholders = ', '.join(['%s'] * (len(columns) + 1))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {self.quote(table)} ({names}) VALUES ({placeholders})', rows)
+
+    def delete(self, table, pks):
+        pks = list(pks)
+        if not pks:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.quote(table)} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+
+    def filter(self, queryset, index, terms):
+        table = self.quote(index.table)
+        # Each term is quoted, so FTS5 operators in the input are matched as text
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(BM25_WEIGHTS[weight]) for weight in index.weights)
+        matching = RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match])
+        rank = RawSQL(
+            f'SELECT bm25({table}, {weights}) FROM {table} '
+            f'WHERE {table} MATCH %s AND {table}.rowid = {self.outer_pk(queryset.model)}',
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matching).annotate(search_rank=rank)
+
+
+class PostgresBackend(FallbackBackend):
+    def create(self, table, columns):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.quote(table)} '
+                f'(object_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.quote(table + "_document")} '
+                f'ON {self.quote(table)} USING GIN (document)'
+            )
+
+    def drop(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.quote(table)}')
+
+    def clear(self, table):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.quote(table)}')
+
+    def write(self, table, columns, weights, rows, replace=True):
+        rows = [(row[0], *(value or '' for value in row[1:])) for row in rows]
+        if not rows:
+            return
+        document = ' || '.join(
+            f"setweight(to_tsvector('{PG_SEARCH_CONFIG}', %s), '{weight}')" for weight in weights
+        )
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.quote(table)} (object_id, document) VALUES (%s, {document}) '
+                f'ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def delete(self, table, pks):
+        pks = list(pks)
+        if not pks:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.quote(table)} WHERE object_id = ANY(%s)', [pks])
+
+    def filter(self, queryset, index, terms):
+        table = self.quote(index.table)
+        # Terms are word characters only, so they cannot carry tsquery operators
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        query = f"to_tsquery('{PG_SEARCH_CONFIG}', %s)"
+        matching = RawSQL(f'SELECT object_id FROM {table} WHERE document @@ {query}', [tsquery])
+        rank = RawSQL(
+            f'SELECT -ts_rank(document, {query}) FROM {table} '
+            f'WHERE object_id = {self.outer_pk(queryset.model)}',
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matching).annotate(search_rank=rank)
+
+
+def get_backend(connection=None):
+    """Return the search backend for a database connection (the default one if None)"""
+    connection = connection or default_connection
+    if connection.vendor == 'sqlite' and sqlite_has_fts5():
+        return SQLiteFTS5Backend(connection)
+    if connection.vendor == 'postgresql':
+        return PostgresBackend(connection)
+    return FallbackBackend(connection)
@@ -0,0 +1,15 @@
+"""The searchable models; imported by SearchConfig.ready()"""
+from accounts.models import Cadet, User
+from events.models import Event
+from training.models import Training
+from .registry import register
+
+register(Event, [('title', 'A'), ('location', 'B'), ('description', 'C')])
+
+register(Training, [('title', 'A'), ('location', 'B'), ('description', 'C')])
+
+register(
+    Cadet,
+    [('enrollment_number', 'A'), ('user__first_name', 'A'), ('user__last_name', 'A'), ('college_name', 'C')],
+    related={User: 'user'},
+)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from search.services import CHUNK_SIZE, rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                          help=f'Documents written per batch (default: {CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        for label, count in rebuild_all(options['chunk_size']).items():
+            self.stdout.write(f'{label}: {count} documents')
+        self.stdout.write(self.style.SUCCESS('Search indexes rebuilt'))
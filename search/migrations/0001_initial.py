@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from search.backends import get_backend
+
+# (table, app label, model, ((field path, weight), ...)) as registered in search.indexes
+INDEXES = (
+    ('search_events', 'events', 'Event', (('title', 'A'), ('location', 'B'), ('description', 'C'))),
+    ('search_trainings', 'training', 'Training', (('title', 'A'), ('location', 'B'), ('description', 'C'))),
+    ('search_cadets', 'accounts', 'Cadet', (
+        ('enrollment_number', 'A'), ('user__first_name', 'A'), ('user__last_name', 'A'), ('college_name', 'C'),
+    )),
+)
+
+
+def create_indexes(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    for table, app_label, model_name, fields in INDEXES:
+        columns = [path.replace('__', '_') for path, _ in fields]
+        weights = [weight for _, weight in fields]
+        backend.create(table, columns)
+        rows = apps.get_model(app_label, model_name).objects.order_by().values_list(
+            'pk', *(path for path, _ in fields)
+        )
+        backend.write(table, columns, weights, list(rows))
+
+
+def drop_indexes(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    for table, *_ in INDEXES:
+        backend.drop(table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_options'),
+        ('events', '0003_keyset_indexes'),
+        ('training', '0002_alter_trainingenrollment_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
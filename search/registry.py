@@ -0,0 +1,80 @@
+"""
+Registry of the models that have a full-text index.
+
+Each index lists the field paths that make up a model's search document,
+with a weight from A (most important) to D, and the related models whose
+changes alter that document (e.g. a cadet's name lives on their User).
+"""
+WEIGHTS = ('A', 'B', 'C', 'D')
+
+_registry = {}
+
+
+class NotRegistered(LookupError):
+    """Raised when searching a model that has no index"""
+    pass
+
+
+class SearchIndex:
+    def __init__(self, model, fields, related=None):
+        """
+        Args:
+            model: Model class to index
+            fields: ((field path, weight), ...) in the order of the index columns
+            related: {model class: lookup from the indexed model to it}
+        """
+        for path, weight in fields:
+            if weight not in WEIGHTS:
+                raise ValueError(f'Invalid weight {weight!r} for {path}')
+        self.model = model
+        self.fields = tuple(fields)
+        self.related = dict(related or {})
+
+    @property
+    def table(self):
+        return f'search_{self.model._meta.db_table}'
+
+    @property
+    def paths(self):
+        return tuple(path for path, _ in self.fields)
+
+    @property
+    def columns(self):
+        return tuple(path.replace('__', '_') for path in self.paths)
+
+    @property
+    def weights(self):
+        return tuple(weight for _, weight in self.fields)
+
+    def documents(self, pks=None, chunk_size=2000):
+        """Yield (pk, text, ...) rows for the given objects, or for every object"""
+        objects = self.model._default_manager.order_by()
+        if pks is not None:
+            objects = objects.filter(pk__in=pks)
+        return objects.values_list('pk', *self.paths).iterator(chunk_size=chunk_size)
+
+    def document(self, instance):
+        """The (pk, text, ...) row of a saved instance, or None if a field lives on a related model"""
+        if any('__' in path for path in self.paths):
+            return None
+        return (instance.pk, *(getattr(instance, path) for path in self.paths))
+
+    def __repr__(self):
+        return f"<SearchIndex {self.model._meta.label}>"
+
+
+def register(model, fields, related=None):
+    index = SearchIndex(model, fields, related)
+    _registry[model] = index
+    return index
+
+
+def get_index(model):
+    try:
+        return _registry[model]
+    except KeyError:
+        raise NotRegistered(f'{model._meta.label} has no search index')
+
+
+def all_indexes():
+    return list(_registry.values())
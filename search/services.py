@@ -0,0 +1,84 @@
+"""
+Full-text search over the registered models.
+
+search() filters a queryset to the objects matching every word of the
+query, each as a prefix ("para" finds "Parade"), and annotates
+``search_rank`` for ordering the best matches first. The index tables
+are kept current by the signal handlers in search.signals; writes that
+bypass signals, such as QuerySet.update(), need rebuild_search_index.
+"""
+import re
+
+from django.db.models import FloatField, Value
+
+from .backends import get_backend
+from .registry import all_indexes, get_index
+
+MAX_TERMS = 8
+CHUNK_SIZE = 2000
+
+_TERM = re.compile(r'\w+')
+
+
+def parse_terms(text):
+    """Split user input into lowercase word terms"""
+    return _TERM.findall((text or '').lower())[:MAX_TERMS]
+
+
+def search(queryset, text):
+    """
+    Filter ``queryset`` to objects matching ``text`` and annotate ``search_rank``
+
+    Order by ``search_rank`` (ascending) to put the best matches first.
+    Input without any words matches nothing.
+    """
+    terms = parse_terms(text)
+    if not terms:
+        # Still annotated, so callers can order by search_rank either way
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return get_backend().filter(queryset, get_index(queryset.model), terms)
+
+
+def update_index(index, pks):
+    """Rewrite the index documents of the given objects, dropping deleted ones"""
+    pks = set(pks)
+    if not pks:
+        return
+    backend = get_backend()
+    rows = list(index.documents(pks))
+    backend.write(index.table, index.columns, index.weights, rows)
+    backend.delete(index.table, pks - {row[0] for row in rows})
+
+
+def index_object(index, instance, created=False):
+    """Write the document of one saved object, from the instance itself where possible"""
+    row = index.document(instance)
+    if row is None:
+        update_index(index, [instance.pk])
+        return
+    get_backend().write(index.table, index.columns, index.weights, [row], replace=not created)
+
+
+def remove_from_index(index, pks):
+    get_backend().delete(index.table, pks)
+
+
+def rebuild_index(index, chunk_size=CHUNK_SIZE):
+    """Recreate a model's index from scratch; returns the number of documents written"""
+    backend = get_backend()
+    backend.create(index.table, index.columns)
+    backend.clear(index.table)
+    written = 0
+    chunk = []
+    for row in index.documents(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            backend.write(index.table, index.columns, index.weights, chunk)
+            written += len(chunk)
+            chunk = []
+    backend.write(index.table, index.columns, index.weights, chunk)
+    return written + len(chunk)
+
+
+def rebuild_all(chunk_size=CHUNK_SIZE):
+    return {index.model._meta.label: rebuild_index(index, chunk_size) for index in all_indexes()}
@@ -0,0 +1,43 @@
+"""Keep the search indexes in step with saves and deletes of indexed objects"""
+from django.db.models.signals import post_delete, post_save
+
+from .registry import all_indexes
+from .services import index_object, remove_from_index, update_index
+
+
+def _on_save(index):
+    def handler(sender, instance, created=False, raw=False, **kwargs):
+        if not raw:
+            index_object(index, instance, created)
+    return handler
+
+
+def _on_delete(index):
+    def handler(sender, instance, **kwargs):
+        remove_from_index(index, [instance.pk])
+    return handler
+
+
+def _on_related_save(index, model, lookup):
+    # Only the fields the document reads from the related model matter
+    prefix = f'{lookup}__'
+    fields = {path[len(prefix):].split('__')[0] for path in index.paths if path.startswith(prefix)}
+
+    def handler(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and not fields.intersection(update_fields)):
+            return
+        pks = index.model._default_manager.filter(**{lookup: instance}).values_list('pk', flat=True)
+        update_index(index, pks)
+    return handler
+
+
+def connect_signals():
+    for index in all_indexes():
+        label = index.model._meta.label
+        post_save.connect(_on_save(index), sender=index.model, weak=False, dispatch_uid=f'search-save-{label}')
+        post_delete.connect(_on_delete(index), sender=index.model, weak=False, dispatch_uid=f'search-delete-{label}')
+        for model, lookup in index.related.items():
+            post_save.connect(
+                _on_related_save(index, model, lookup), sender=model, weak=False,
+                dispatch_uid=f'search-related-{label}-{model._meta.label}'
+            )
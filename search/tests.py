@@ -0,0 +1,131 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Cadet, Officer, User
+from events.models import Event
+from ncc_automation.pagination import KeysetPaginator
+from training.models import Training
+from units.models import Unit
+from .backends import SQLiteFTS5Backend, get_backend
+from .registry import get_index
+from .services import parse_terms, rebuild_index, search
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(
+            name='Unit 1', wing='ARMY', unit_code='UNIT1', location='Test Location',
+            contact_email='unit1@example.com', contact_phone='1234567890'
+        )
+        user = User.objects.create_user(username='officer', password='testpass123', role='OFFICER')
+        cls.officer = Officer.objects.create(
+            user=user, rank='LT', unit=cls.unit, employee_id='EMP1', joining_date='2020-01-01'
+        )
+        cls.parade = cls._event('Republic Day Parade', 'Ceremonial march past')
+        cls.drill = cls._event('Drill practice', 'Rehearsal for the Republic Day parade')
+        cls.camp = cls._event('Annual Training Camp', 'Ten days under canvas')
+        cls.cadet = cls._cadet('NCC2024001', 'Aarav', 'Sharma')
+        cls._cadet('NCC2024002', 'Priya', 'Verma')
+
+    @classmethod
+    def _event(cls, title, description):
+        return Event.objects.create(
+            title=title, description=description, event_type='PARADE', location='Stadium',
+            start_date=datetime.date(2024, 1, 26), end_date=datetime.date(2024, 1, 26), unit=cls.unit
+        )
+
+    @classmethod
+    def _cadet(cls, enrollment_number, first_name, last_name):
+        user = User.objects.create(
+            username=enrollment_number.lower(), first_name=first_name, last_name=last_name, role='CADET'
+        )
+        return Cadet.objects.create(
+            user=user, unit=cls.unit, enrollment_number=enrollment_number, enrollment_date='2023-01-01',
+            college_name='Test College', course='B.Tech', year_of_study=2, roll_number=enrollment_number,
+            parent_name='Parent', parent_phone='1234567890', emergency_contact='0987654321'
+        )
+
+    def _titles(self, text):
+        return [event.title for event in search(Event.objects.all(), text).order_by('search_rank', 'id')]
+
+    def test_parse_terms(self):
+        self.assertEqual(parse_terms('  Republic "Day" OR pa* '), ['republic', 'day', 'or', 'pa'])
+        self.assertEqual(parse_terms('!!!'), [])
+
+    def test_ranked_prefix_search(self):
+        # A title match outranks a description match
+        self.assertEqual(self._titles('parad'), ['Republic Day Parade', 'Drill practice'])
+        self.assertEqual(self._titles('repub day'), ['Republic Day Parade', 'Drill practice'])
+        self.assertEqual(self._titles('canvas'), ['Annual Training Camp'])
+        self.assertEqual(self._titles('nothing'), [])
+        self.assertEqual(self._titles('***'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.camp.description = 'Ten days of adventure'
+        self.camp.save()
+        self.assertEqual(self._titles('canvas'), [])
+        self.assertEqual(self._titles('adventure'), ['Annual Training Camp'])
+        self.camp.delete()
+        self.assertEqual(self._titles('adventure'), [])
+
+    def test_cadet_index_follows_user_changes(self):
+        cadets = lambda text: [cadet.enrollment_number for cadet in search(Cadet.objects.all(), text)]
+        self.assertEqual(sorted(cadets('ncc2024')), ['NCC2024001', 'NCC2024002'])
+        self.assertEqual(cadets('aar sha'), ['NCC2024001'])
+        user = self.cadet.user
+        user.last_name = 'Kapoor'
+        user.save()
+        self.assertEqual(cadets('sharma'), [])
+        self.assertEqual(cadets('kapoor'), ['NCC2024001'])
+
+    def test_login_does_not_reindex(self):
+        user = self.cadet.user
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['last_login'])
+        self.assertEqual(len(queries), 1)
+
+    def test_rebuild(self):
+        index = get_index(Event)
+        get_backend().clear(index.table)
+        self.assertEqual(self._titles('parade'), [])
+        self.assertEqual(rebuild_index(index), 3)
+        self.assertEqual(len(self._titles('parade')), 2)
+
+    def test_uses_fts5_on_sqlite(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertIsInstance(get_backend(), SQLiteFTS5Backend)
+        sql = str(search(Event.objects.all(), 'parade').query)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_search_results_paginate_by_rank(self):
+        results = search(Event.objects.all(), 'parade')
+        paginator = KeysetPaginator(results, ('search_rank', '-id'), per_page=1)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual([event.title for event in first], ['Republic Day Parade'])
+        self.assertEqual([event.title for event in second], ['Drill practice'])
+        self.assertFalse(second.has_next)
+
+    def test_list_views_search(self):
+        Training.objects.create(
+            title='Map Reading', description='Compass and grid references', training_type='MAP',
+            duration_hours=4, start_date=datetime.date(2024, 2, 1), end_date=datetime.date(2024, 2, 1),
+            unit=self.unit, location='Classroom'
+        )
+        self.client.login(username='officer', password='testpass123')
+
+        response = self.client.get(reverse('event_list'), {'search': 'parad'})
+        self.assertEqual([event.title for event in response.context['events']], ['Republic Day Parade', 'Drill practice'])
+
+        response = self.client.get(reverse('training_list'), {'search': 'compass'})
+        self.assertEqual([training.title for training in response.context['trainings']], ['Map Reading'])
+
+        response = self.client.get(reverse('cadet_list'), {'search': 'verm'})
+        self.assertEqual([cadet.enrollment_number for cadet in response.context['cadets']], ['NCC2024002'])
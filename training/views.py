@@ -5,6 +5,7 @@ from django.db.models import Count, Avg
 from accounts.decorators import officer_required
 from accounts.models import Cadet
 from .models import Training, TrainingEnrollment
+from search.services import search
 from .forms import TrainingForm, TrainingAssessmentForm
 
 @login_required
@@ -24,6 +25,7 @@ def training_list(request):
     # Filters
     training_type = request.GET.get('type')
     status = request.GET.get('status')
+    search_query = request.GET.get('search', '')
     
     if training_type:
         trainings = trainings.filter(training_type=training_type)
@@ -33,11 +35,14 @@ def training_list(request):
     trainings = trainings.select_related('unit', 'instructor__user').annotate(
         enrollment_count=Count('enrollments')
     )
+    if search_query:
+        trainings = search(trainings, search_query).order_by('search_rank', '-start_date')
     
     context = {
         'trainings': trainings,
         'training_types': Training.TRAINING_TYPE_CHOICES,
         'statuses': Training.STATUS_CHOICES,
+        'search_query': search_query,
     }
     
     return render(request, 'training/training_list.html', context)